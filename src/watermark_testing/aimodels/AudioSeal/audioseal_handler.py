@@ -1,6 +1,41 @@
+import os
 import torch
 import librosa
-from audioseal import AudioSeal
+from functools import lru_cache
+
+# Model-Card-Name oder Pfad zu einem lokalen Checkpoint (offline, ohne Download)
+AUDIOSEAL_GENERATOR = os.environ.get('AUDIOSEAL_GENERATOR', 'audioseal_wm_16bits')
+AUDIOSEAL_DETECTOR = os.environ.get('AUDIOSEAL_DETECTOR', 'audioseal_detector_16bits')
+
+
+@lru_cache(maxsize=None)
+def get_generator():
+    """Lädt den AudioSeal-Generator einmalig pro Prozess (wird danach wiederverwendet)"""
+    from aimodels.stand_in import use_stand_in, StandInAudioSealGenerator
+    if use_stand_in('audioseal'):
+        return StandInAudioSealGenerator()
+    
+    from audioseal import AudioSeal
+    return AudioSeal.load_generator(AUDIOSEAL_GENERATOR)
+
+
+@lru_cache(maxsize=None)
+def get_detector():
+    """Lädt den AudioSeal-Detector einmalig pro Prozess (wird danach wiederverwendet)"""
+    from aimodels.stand_in import use_stand_in, StandInAudioSealDetector
+    if use_stand_in('audioseal'):
+        return StandInAudioSealDetector()
+    
+    from audioseal import AudioSeal
+    return AudioSeal.load_detector(AUDIOSEAL_DETECTOR)
+
+
+def model_version():
+    """Kennung der verwendeten Modelle (Stand-in oder Checkpoint-Namen)"""
+    from aimodels.stand_in import use_stand_in, STAND_IN_VERSION
+    if use_stand_in('audioseal'):
+        return STAND_IN_VERSION
+    return f"{os.path.basename(AUDIOSEAL_GENERATOR)}/{os.path.basename(AUDIOSEAL_DETECTOR)}"
 
 
 def prepare_audio(audio_path):
@@ -12,13 +47,33 @@ def prepare_audio(audio_path):
 
 
 def detect_watermark(audio_tensor, sample_rate):
-    detector = AudioSeal.load_detector("audioseal_detector_16bits")
+    detector = get_detector()
     result, message = detector.detect_watermark(audio_tensor, sample_rate)
     return result, message
 
 
+def detect_watermark_batch(audio_batch, sample_rate, threshold=0.5):
+    """
+    Detection für mehrere gleich lange Clips in einem Forward-Pass.
+    detector.detect_watermark mittelt über den ganzen Batch, daher hier
+    die Auswertung der Frame-Wahrscheinlichkeiten pro Clip.
+    
+    Args:
+        audio_batch: Tensor [B, 1, samples]
+        
+    Returns:
+        tuple: (confidences [B], messages [B, 16])
+    """
+    detector = get_detector()
+    with torch.inference_mode():
+        frame_probs, message_probs = detector(audio_batch, sample_rate)
+    confidences = torch.gt(frame_probs[:, 1, :], threshold).float().mean(dim=-1)
+    messages = torch.gt(message_probs, threshold).int()
+    return confidences, messages
+
+
 def embed_watermark(audio_tensor, sample_rate):
-    generator = AudioSeal.load_generator("audioseal_wm_16bits")
+    generator = get_generator()
     watermark = generator.get_watermark(audio_tensor, sample_rate)
     watermarked_audio = audio_tensor + watermark
     return watermarked_audio
@@ -90,4 +145,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Als Skript gestartet: src/watermark_testing für "aimodels.*"-Imports in den Path
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent.parent))
+    main()
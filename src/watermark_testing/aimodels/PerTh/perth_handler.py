@@ -1,9 +1,36 @@
-import perth
 import librosa
 import soundfile as sf
 import numpy as np
-from perth.utils import calculate_audio_metrics, plot_audio_comparison
-from perth.perth_net.perth_net_implicit.perth_watermarker import PerthImplicitWatermarker
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_watermarker():
+    """Erstellt den PerTh-Watermarker einmalig pro Prozess (wird danach wiederverwendet)"""
+    from aimodels.stand_in import use_stand_in, StandInPerthWatermarker
+    if use_stand_in('perth'):
+        return StandInPerthWatermarker()
+    
+    from perth.perth_net.perth_net_implicit.perth_watermarker import PerthImplicitWatermarker
+    return PerthImplicitWatermarker()
+
+
+def model_version():
+    """Kennung des verwendeten Modells"""
+    from aimodels.stand_in import use_stand_in, STAND_IN_VERSION
+    return STAND_IN_VERSION if use_stand_in('perth') else "perth_implicit"
+
+
+def load_audio(input_path):
+    """Load audio file at its native sample rate"""
+    return librosa.load(input_path, sr=None)
+
+
+def embed_perth_array(wav, sr):
+    """Apply PerTh watermark to an audio array (returns the watermarked array)"""
+    # Initialize watermarker (implicit, cached)
+    watermarker = get_watermarker()
+    return watermarker.apply_watermark(wav, watermark=None, sample_rate=sr)
 
 
 def embed_perth_watermark(input_path, output_path):
@@ -15,36 +42,25 @@ def embed_perth_watermark(input_path, output_path):
         output_path: Path to save watermarked audio
     """
     # Load audio file
-    wav, sr = librosa.load(input_path, sr=None)
-
-    # Initialize watermarker (implicit)
-    watermarker = PerthImplicitWatermarker()
+    wav, sr = load_audio(input_path)
    
     # Apply watermark
-    watermarked_audio = watermarker.apply_watermark(wav, watermark=None, sample_rate=sr)
+    watermarked_audio = embed_perth_array(wav, sr)
 
     # Save watermarked audio
     sf.write(output_path, watermarked_audio, sr)
     return output_path
 
 
-def detect_perth_watermark(input_path):
+def detect_perth_array(watermarked_audio, sr):
     """
-    Detect and extract PerTh watermark from audio file
+    Detect and extract PerTh watermark from an audio array
     
-    Args:
-        input_path: Path to watermarked audio file
-        
     Returns:
-        tuple: (watermark, detected)
-            - watermark: Extracted watermark value (converted to JSON-serializable format)
-            - detected: Boolean - True if watermark found (value > threshold), False otherwise
+        tuple: (watermark, detected), see detect_perth_watermark
     """
-    # Load the watermarked audio
-    watermarked_audio, sr = librosa.load(input_path, sr=None)
-
-    # Initialize watermarker (same as used for embedding)
-    watermarker = PerthImplicitWatermarker()
+    # Initialize watermarker (same as used for embedding, cached)
+    watermarker = get_watermarker()
 
     try:
         # Extract watermark
@@ -53,9 +69,8 @@ def detect_perth_watermark(input_path):
         # Convert watermark to JSON-serializable format
         if isinstance(watermark, np.ndarray):
             watermark_serializable = watermark.tolist()
-            # Bei Arrays: Prüfe ob mindestens ein Wert > Schwellenwert
-            watermark_array = np.array(watermark)
-            detected = np.any(np.abs(watermark_array) > 0.5)  # Schwellenwert 0.5
+            # Bei Arrays: Prüfe ob mindestens ein Wert > Schwellenwert (ohne Kopie des Arrays)
+            detected = bool(np.any(np.abs(watermark) > 0.5))  # Schwellenwert 0.5
         elif isinstance(watermark, (float, np.floating)):
             watermark_serializable = float(watermark)
             # Bei einzelnem Wert: Watermark erkannt wenn Wert nahe 1.0
@@ -78,6 +93,23 @@ def detect_perth_watermark(input_path):
         return None, False
 
 
+def detect_perth_watermark(input_path):
+    """
+    Detect and extract PerTh watermark from audio file
+    
+    Args:
+        input_path: Path to watermarked audio file
+        
+    Returns:
+        tuple: (watermark, detected)
+            - watermark: Extracted watermark value (converted to JSON-serializable format)
+            - detected: Boolean - True if watermark found (value > threshold), False otherwise
+    """
+    # Load the watermarked audio
+    watermarked_audio, sr = load_audio(input_path)
+    return detect_perth_array(watermarked_audio, sr)
+
+
 def apply_watermark(input_path, output_path):
     """Load audio file, apply watermark, and save (compatibility wrapper)"""
     return embed_perth_watermark(input_path, output_path)
@@ -93,6 +125,8 @@ def extract_watermark(input_path):
 
 def evaluate_watermark(original_path, watermarked_path):
     """Evaluate quality metrics between original and watermarked audio"""
+    from perth.utils import calculate_audio_metrics, plot_audio_comparison
+    
     # Load original and watermarked audio
     original, sr = librosa.load(original_path, sr=None)
     watermarked, _ = librosa.load(watermarked_path, sr=None)
@@ -173,4 +207,8 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Als Skript gestartet: src/watermark_testing für "aimodels.*"-Imports in den Path
+    import sys
+    from pathlib import Path
+    sys.path.append(str(Path(__file__).parent.parent.parent))
+    main()
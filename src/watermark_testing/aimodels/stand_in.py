@@ -0,0 +1,95 @@
+"""
+Deterministische Stand-in-Modelle für Benchmarks und Lasttests ohne Checkpoints.
+
+Die Stand-ins haben dieselbe Schnittstelle wie die echten Modelle und einen
+Rechenaufwand proportional zur Signallänge (Faltung bzw. STFT), erkennen aber
+keine echten Watermarks. Ergebnisse sind reproduzierbar (feste Seeds).
+
+Aktivierung über WATERMARK_STAND_IN_MODELS:
+    '1'     immer Stand-ins verwenden
+    'auto'  Stand-in nur, wenn das Modell-Paket (audioseal / perth) fehlt
+    '0'     nie (Standard)
+"""
+import importlib.util
+import os
+
+import numpy as np
+import torch
+from scipy import signal
+
+STAND_IN_VERSION = "stand-in-v1"
+
+# Parameter der Stand-ins
+_KERNEL_SIZE = 31
+_NBITS = 16
+_STRENGTH = 1e-3
+
+
+def use_stand_in(package: str) -> bool:
+    """
+    Entscheidet, ob statt des echten Modells ein Stand-in geladen wird.
+
+    Args:
+        package: Import-Name des Modell-Pakets, z.B. 'audioseal'
+    """
+    mode = os.environ.get('WATERMARK_STAND_IN_MODELS', '0')
+    if mode == 'auto':
+        return importlib.util.find_spec(package) is None
+    return mode == '1'
+
+
+def _kernel() -> torch.Tensor:
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn(1, 1, _KERNEL_SIZE, generator=generator) / _KERNEL_SIZE
+
+
+class StandInAudioSealGenerator:
+    """Wie AudioSeal-Generator: get_watermark(x [B,1,T], sr) -> Watermark [B,1,T]"""
+
+    def __init__(self):
+        self.kernel = _kernel()
+
+    def get_watermark(self, x: torch.Tensor, sample_rate: int) -> torch.Tensor:
+        with torch.inference_mode():
+            return torch.nn.functional.conv1d(x, self.kernel, padding=_KERNEL_SIZE // 2) * _STRENGTH
+
+
+class StandInAudioSealDetector:
+    """Wie AudioSeal-Detector: Aufruf -> (Frame-Wahrscheinlichkeiten [B,2,T], Bits [B,16])"""
+
+    def __init__(self):
+        self.kernel = _kernel()
+
+    def __call__(self, x: torch.Tensor, sample_rate: int):
+        with torch.inference_mode():
+            response = torch.nn.functional.conv1d(x, self.kernel, padding=_KERNEL_SIZE // 2)
+            positive = torch.sigmoid(response / _STRENGTH)[:, 0, :]
+            frame_probs = torch.stack([1 - positive, positive], dim=1)
+            # Bits aus Mittelwerten über 16 gleich große Abschnitte
+            chunks = positive[:, : positive.shape[-1] // _NBITS * _NBITS].reshape(x.shape[0], _NBITS, -1)
+            message_probs = chunks.mean(dim=-1)
+        return frame_probs, message_probs
+
+    def detect_watermark(self, x: torch.Tensor, sample_rate: int):
+        frame_probs, message_probs = self(x, sample_rate)
+        confidence = torch.gt(frame_probs[:, 1, :], 0.5).float().mean().item()
+        return confidence, torch.gt(message_probs, 0.5).int()
+
+
+class StandInPerthWatermarker:
+    """Wie PerthImplicitWatermarker: arbeitet im STFT-Bereich"""
+
+    N_FFT = 1024
+
+    def apply_watermark(self, wav: np.ndarray, watermark=None, sample_rate: int = 44100) -> np.ndarray:
+        _, _, spectrum = signal.stft(wav, nperseg=self.N_FFT)
+        spectrum[:, :] *= 1 + _STRENGTH  # deterministische Mini-Änderung
+        _, watermarked = signal.istft(spectrum, nperseg=self.N_FFT)
+        return watermarked[: len(wav)].astype(np.float32)
+
+    def get_watermark(self, wav: np.ndarray, sample_rate: int = 44100) -> float:
+        _, _, spectrum = signal.stft(wav, nperseg=self.N_FFT)
+        magnitude = np.abs(spectrum)
+        # Anteil Energie in der oberen Hälfte des Spektrums als "Score" (0 - 1)
+        upper = magnitude[magnitude.shape[0] // 2:].sum()
+        return float(upper / (magnitude.sum() + 1e-12))
@@ -1,8 +1,15 @@
 from contextlib import contextmanager
-from flask import Flask, jsonify, request, send_file, render_template
+from flask import Flask, jsonify, request, send_file, send_from_directory, render_template, Response, stream_with_context, g
 from flask_cors import CORS
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.http import dump_options_header
+from urllib.parse import quote
+import io
 import os
 import sys
+import time
+import unicodedata
 from pathlib import Path
 
 # Füge den Parent-Ordner zum Path hinzu
@@ -10,11 +17,16 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 # Imports
 from database.database import init_db, get_db
-from database.repositories import UserRepository, AudioFileRepository, ManipulatedAudioFileRepository
-from services.audio_service import AudioService
+from database.repositories import (
+    UserRepository, AudioFileRepository, ManipulatedAudioFileRepository,
+    DetectionResultRepository, UploadSessionRepository, DEFAULT_PAGE_SIZE
+)
+from services.audio_service import AudioService, BatchTooLarge
+from services.chunked_upload_service import ChunkedUploadService, ChunkedUploadError
 from services.watermark_business_service import WatermarkBusinessService
 from services.watermark_strategy import WatermarkStrategyFactory
-from services.audio_manipulation_service import AudioManipulationService
+from services import runtime_config, storage_reconciler, metrics, profiling, readiness, capacity, admission, upload_stream, idempotency, storage_tier, waveform
+from datetime import datetime
 import json
 import uuid
 
@@ -24,12 +36,302 @@ app = Flask(__name__)
 CORS(app)
 
 # Upload-Ordner erstellen
-UPLOAD_FOLDER = '/app/uploads'
+UPLOAD_FOLDER = storage_reconciler.UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Audio-Uploads beim Parsen direkt in den Upload-Ordner streamen (Magic Bytes,
+# Größenlimit und SHA-256 pro Block, siehe services/upload_stream.py)
+app.request_class = upload_stream.StreamingRequest
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+
+# Endpoints mit genau einer Audio-Datei: Content-Length vor dem Lesen prüfen
+SINGLE_UPLOAD_ENDPOINTS = {'upload_audio', 'embed', 'detect', 'apply_manipulation'}
+
+# Port des Listen-Sockets (für die Accept-Queue in /ready)
+LISTEN_PORT = int(os.environ.get('PORT', 5000))
+
+# Optional: Dateiauslieferung an einen vorgeschalteten Webserver (nginx/Apache) abgeben
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+
 # Datenbank initialisieren beim Start
 init_db()
 
+# ==========================================
+# HELPER
+# ==========================================
+
+def send_audio_file(file_path: str, download_name: str):
+    """
+    Sendet eine Audio-Datei mit HTTP-Caching und Range-Support.
+    - Starkes ETag aus dem SHA-256 des Inhalts -> 304 bei If-None-Match
+    - Range/If-Range -> 206 Partial Content (Seeking, fortsetzbare Downloads)
+    - Ohne Range nutzt Gunicorn sendfile() (zero-copy)
+    - Als FLAC gespeicherte Dateien (services/storage_tier.py): Format per
+      ?format=wav|flac oder Accept, sonst das Format von download_name.
+      WAV wird beim Senden dekodiert (ETag mit Suffix; Range springt zum
+      passenden Frame, siehe storage_tier.WavStream).
+    """
+    stored = storage_tier.stored_format(file_path)
+    default = storage_tier.stored_format(download_name)
+    audio_format = storage_tier.negotiate_format(
+        request.args.get('format'), request.accept_mimetypes,
+        default if default in storage_tier.MIMETYPES else 'flac'
+    )
+    
+    if stored != 'flac':
+        # Unkomprimiert gespeichert (z.B. Float-WAV, MP3): wie hochgeladen
+        response = send_file(
+            file_path,
+            as_attachment=True,
+            download_name=download_name,
+            etag=AudioService.content_hash(file_path),
+            conditional=True
+        )
+        if response.status_code == 200:
+            storage_tier.count_download(stored, response.content_length or 0)
+        return response
+    
+    download_name = str(Path(download_name).with_suffix(f'.{audio_format}'))
+    
+    if audio_format == 'flac':
+        response = send_file(
+            file_path,
+            mimetype=storage_tier.MIMETYPES['flac'],
+            as_attachment=True,
+            download_name=download_name,
+            etag=AudioService.content_hash(file_path),
+            conditional=True
+        )
+        if response.status_code == 200:
+            storage_tier.count_download('flac', response.content_length or 0, storage_tier.wav_size(file_path))
+    else:
+        length, chunks = storage_tier.wav_stream(file_path)
+        response = Response(chunks, mimetype=storage_tier.MIMETYPES['wav'], direct_passthrough=True)
+        response.content_length = length
+        response.headers['Content-Disposition'] = _content_disposition(download_name)
+        response.set_etag(f"{AudioService.content_hash(file_path)}.wav")
+        response.make_conditional(request, accept_ranges=True, complete_length=length)
+        if response.status_code == 200:
+            storage_tier.count_download('wav', length)
+    
+    response.vary.add('Accept')
+    return response
+
+
+def _content_disposition(filename: str) -> str:
+    """Content-Disposition wie bei send_file (ASCII-Fallback plus filename* für Unicode)"""
+    try:
+        filename.encode('ascii')
+        return dump_options_header('attachment', {'filename': filename})
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return dump_options_header('attachment', {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='')}"})
+
+
+def admit(route: str, method: str, source) -> None:
+    """
+    Admission Control für rechenintensive Routes (siehe services/admission.py).
+    Wartet auf einen freien Platz; das Ticket gibt release_admission() im
+    Teardown frei, bei gestreamten Antworten also erst nach dem Stream.
+    Vor dem try-Block der Route aufrufen (oder AdmissionRejected dort
+    weiterreichen), damit der Errorhandler mit 429/503 antwortet.
+
+    Args:
+        route: 'embed' oder 'detect'
+        method: Watermarking-Methode (Kostenfaktor)
+        source: Upload-Stream, Dateipfad oder Größe in Bytes (für die Audiodauer)
+    """
+    g.admission_ticket = admission.acquire(route, admission.request_cost(method, source))
+
+
+def idempotent(endpoint: str, file, **fields):
+    """
+    Idempotency-Key aus dem Header auswerten (siehe services/idempotency.py).
+    Vor admit() und dem try-Block der Route aufrufen: Wiederholungen belegen
+    keinen Platz in der Admission Control, IdempotencyError wird zu 400/409/422.
+    Die Reservierung gibt release_idempotency() im Teardown frei, falls die
+    Route kein Ergebnis mit remember_result() gespeichert hat.
+
+    Args:
+        endpoint: 'embed' oder 'manipulation'
+        file: Hochgeladene Datei (FileStorage)
+        fields: Weitere Parameter des Requests für den Payload-Hash
+
+    Returns:
+        Antwort mit dem gespeicherten Ergebnis oder None (Route rechnet selbst)
+    """
+    key = request.headers.get(idempotency.IDEMPOTENCY_HEADER)
+    if key is None:
+        return None
+
+    user_id = 1  # TODO: Aus Session holen
+    claim = idempotency.claim(
+        endpoint, idempotency.validate_key(key), idempotency.payload_hash(file, **fields), user_id
+    )
+    if claim.result is None:
+        g.idempotency_claim = claim
+        return None
+
+    response = send_audio_file(claim.result.path, claim.result.download_name)
+    response.headers['Idempotent-Replayed'] = 'true'
+    if endpoint == 'embed' and claim.result.resource_id is not None:
+        response.headers['X-Audio-Id'] = str(claim.result.resource_id)
+    return response
+
+
+def remember_result(path: str, download_name: str, resource_id: int) -> None:
+    """Speichert das Ergebnis zum Idempotency-Key des Requests (falls vorhanden)"""
+    claim = g.pop('idempotency_claim', None)
+    if claim is not None:
+        claim.complete(path, download_name, resource_id)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.before_request
+def check_upload_size():
+    # 413, bevor der Body gelesen wird; ohne Content-Length greift das Limit beim Schreiben
+    if request.endpoint in SINGLE_UPLOAD_ENDPOINTS and (request.content_length or 0) > upload_stream.max_request_size():
+        max_mb = AudioService.MAX_FILE_SIZE / (1024 * 1024)
+        raise RequestEntityTooLarge(f"Datei zu groß. Maximum: {max_mb}MB")
+    if request.endpoint == 'detect_batch':
+        # Body des Batches höchstens MAX_BATCH_SIZE: 413 per Content-Length vorab, ohne Content-Length beim Lesen
+        request.max_content_length = AudioService.MAX_BATCH_SIZE + upload_stream.MULTIPART_OVERHEAD
+
+
+@app.before_request
+def track_in_flight():
+    # Probes zählen nicht als Arbeit, sonst meldet sich /ready selbst als Last
+    if request.endpoint and request.endpoint not in capacity.PROBE_ENDPOINTS:
+        g.in_flight_key = request.endpoint
+        capacity.in_flight.enter(request.endpoint)
+
+
+@app.before_request
+def start_memory_report():
+    # Speicher pro Stage im Debug-Modus in die Antwort übernehmen
+    if app.debug and metrics.MEMORY_TRACKING:
+        g.memory_report, g.memory_report_token = metrics.begin_memory_report()
+
+
+@app.before_request
+def start_profiler():
+    # Opt-in: Header X-Profile oder PROFILE_SAMPLE_RATE (siehe services/profiling.py)
+    profiler = profiling.RequestProfiler.for_request(
+        request.headers.get('X-Profile'), request.headers.get('X-Profile-Mode')
+    )
+    if profiler and profiler.start():
+        g.profiler = profiler
+
+
+@app.after_request
+def record_request_duration(response):
+    # Route-Template statt URL, damit IDs keine eigenen Serien erzeugen
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    
+    start = g.get('request_start')
+    if start is not None:
+        metrics.observe_request(endpoint, request.method, response.status_code, time.perf_counter() - start)
+    
+    report = g.get('memory_report')
+    if report:
+        response.headers['X-Memory-Report'] = json.dumps(report)
+        if response.is_json and not response.is_streamed:
+            body = response.get_json(silent=True)
+            if isinstance(body, dict):
+                body['memory'] = report
+                response.set_data(json.dumps(body))
+    
+    profiler = g.pop('profiler', None)
+    if profiler:
+        # Profil-ID vom Server: eine wiederholte X-Request-ID überschreibt kein Profil
+        request_id = request.headers.get('X-Request-ID')
+        profile_id = profiling.new_profile_id(request_id)
+        profiler.stop()  # auch wenn das Speichern scheitert
+        try:
+            profiler.save(profile_id, {
+                'request_id': request_id,
+                'endpoint': endpoint,
+                'path': request.path,
+                'http_method': request.method,
+                'status': response.status_code
+            })
+            response.headers['X-Profile-Id'] = profile_id
+        except Exception:
+            # Profiling darf den profilierten Request nie scheitern lassen
+            # (PROFILE_FOLDER nicht beschreibbar, Platte voll, ID schon vergeben, ...)
+            app.logger.exception("Profil %s konnte nicht gespeichert werden", profile_id)
+    return response
+
+
+@app.teardown_request
+def stop_profiler(exc):
+    # Falls after_request nicht erreicht wurde
+    profiler = g.pop('profiler', None)
+    if profiler:
+        profiler.stop()
+    
+    token = g.pop('memory_report_token', None)
+    if token is not None:
+        metrics.end_memory_report(token)
+
+
+@app.teardown_request
+def release_in_flight(exc):
+    # Läuft auch bei Fehlern und erst nach dem Ende gestreamter Antworten
+    key = g.pop('in_flight_key', None)
+    if key is not None:
+        capacity.in_flight.exit(key)
+
+
+@app.teardown_request
+def release_admission(exc):
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        ticket.release()
+
+
+@app.teardown_request
+def release_idempotency(exc):
+    # Ohne gespeichertes Ergebnis (Fehler) darf die nächste Wiederholung neu rechnen
+    claim = g.pop('idempotency_claim', None)
+    if claim is not None:
+        claim.release()
+
+
+@app.errorhandler(RequestEntityTooLarge)
+@app.errorhandler(UnsupportedMediaType)
+def upload_rejected(e):
+    # Dev-Server schließt daraufhin die Verbindung, statt den Rest des Bodys zu
+    # lesen; Gunicorn verwirft den Rest beim Weiterlesen, ohne ihn zu speichern
+    return jsonify({'error': e.description}), e.code, {'Connection': 'close'}
+
+
+@app.errorhandler(ChunkedUploadError)
+def chunked_upload_failed(e: ChunkedUploadError):
+    return jsonify({'error': str(e), **e.details}), e.status
+
+
+@app.errorhandler(admission.AdmissionRejected)
+def admission_rejected(e: admission.AdmissionRejected):
+    message = 'Zu viele Anfragen, bitte später erneut versuchen' if e.status == 429 \
+        else 'Server ausgelastet, bitte später erneut versuchen'
+    return jsonify({
+        'error': message,
+        'reason': e.reason,
+        'retry_after_s': e.retry_after
+    }), e.status, {'Retry-After': str(e.retry_after)}
+
+
+@app.errorhandler(idempotency.IdempotencyError)
+def idempotency_failed(e: idempotency.IdempotencyError):
+    headers = {'Retry-After': str(e.retry_after)} if e.retry_after else {}
+    return jsonify({'error': str(e)}), e.status, headers
+
+
 # ==========================================
 # ROUTES
 # ==========================================
@@ -41,7 +343,29 @@ def home():
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    return jsonify({
+        'status': 'ok',
+        'runtime': runtime_config.effective_settings()
+    }), 200
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness für den Load-Balancer: 200, wenn die Instanz Arbeit annehmen kann,
+    sonst 503 (Modelle noch nicht warm, Worker ausgelastet, Platte voll, DB weg).
+    Enthält alle Checks, den Modell-Status pro Methode und die geladenen Module.
+    """
+    status = readiness.status(UPLOAD_FOLDER, LISTEN_PORT)
+    if status['ready']:
+        return jsonify(status), 200
+    return jsonify(status), 503, {'Retry-After': '5'}
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage- und Request-Latenzen im Prometheus-Textformat"""
+    return Response(metrics.render_all(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 
 # ==========================================
@@ -92,6 +416,115 @@ def upload_audio():
         return jsonify({'error': f'Interner Serverfehler: {str(e)}'}), 500
 
 
+# ==========================================
+# SCHNITTSTELLE 1b: Resumable Upload in Chunks
+# ==========================================
+@app.route('/upload/sessions', methods=['POST'])
+def create_upload_session():
+    """
+    Startet einen Upload in Chunks (für große Dateien, fortsetzbar).
+    
+    JSON-Body:
+        filename: Dateiname mit Audio-Endung
+        size: Dateigröße in Bytes
+        sha256: Optional Hash der ganzen Datei (wird beim Abschluss geprüft)
+    
+    Danach: PUT /upload/sessions/<upload_id>/chunks?offset=<n> mit den rohen
+    Bytes (optional Header X-Chunk-SHA256), parallel möglich, dann
+    POST /upload/sessions/<upload_id>/finalize.
+    """
+    body = request.get_json(silent=True) or {}
+    
+    try:
+        with get_db() as db:
+            chunked = ChunkedUploadService(UploadSessionRepository(db))
+            user_id = 1  # TODO: Aus Session holen
+            
+            session = chunked.create_session(
+                filename=body.get('filename'),
+                total_size=body.get('size'),
+                user_id=user_id,
+                upload_folder=UPLOAD_FOLDER,
+                sha256=body.get('sha256')
+            )
+        
+        return jsonify(session), 201
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/upload/sessions/<upload_id>', methods=['GET'])
+def upload_session_status(upload_id: str):
+    """Empfangene und fehlende Chunks (zum Fortsetzen nach Abbruch)"""
+    with get_db() as db:
+        user_id = 1  # TODO: Aus Session holen
+        return jsonify(ChunkedUploadService(UploadSessionRepository(db)).status(upload_id, user_id)), 200
+
+
+@app.route('/upload/sessions/<upload_id>/chunks', methods=['PUT'])
+def upload_chunk(upload_id: str):
+    """
+    Schreibt einen Chunk an seinen Offset (Query-Parameter 'offset').
+    Der Body wird blockweise gelesen und direkt in die Teil-Datei geschrieben.
+    """
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Parameter offset fehlt'}), 400
+    
+    with get_db() as db:
+        user_id = 1  # TODO: Aus Session holen
+        result = ChunkedUploadService(UploadSessionRepository(db)).write_chunk(
+            session_id=upload_id,
+            user_id=user_id,
+            offset=offset,
+            stream=request.stream,
+            content_length=request.content_length,
+            sha256=request.headers.get('X-Chunk-SHA256')
+        )
+    
+    return jsonify(result), 200
+
+
+@app.route('/upload/sessions/<upload_id>/finalize', methods=['POST'])
+def finalize_upload_session(upload_id: str):
+    """
+    Schließt den Upload ab: prüft Vollständigkeit und registriert die Datei
+    über den normalen Upload-Workflow. Antwort wie POST /upload.
+    """
+    try:
+        with get_db() as db:
+            user_id = 1  # TODO: Aus Session holen
+            
+            chunked = ChunkedUploadService(UploadSessionRepository(db))
+            result = chunked.finalize(
+                session_id=upload_id,
+                user_id=user_id,
+                business_service=WatermarkBusinessService(AudioFileRepository(db)),
+                upload_folder=UPLOAD_FOLDER
+            )
+        
+        return jsonify({
+            'message': 'Datei erfolgreich hochgeladen',
+            'audio_id': result['audio_id'],
+            'filename': result['filename'],
+            'metadata': result['metadata']
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/upload/sessions/<upload_id>', methods=['DELETE'])
+def abort_upload_session(upload_id: str):
+    """Bricht einen Upload ab und löscht die Teil-Datei"""
+    with get_db() as db:
+        user_id = 1  # TODO: Aus Session holen
+        ChunkedUploadService(UploadSessionRepository(db)).abort(upload_id, user_id)
+    
+    return jsonify({'message': 'Upload abgebrochen'}), 200
+
+
 # ==========================================
 # SCHNITTSTELLE 2: Watermark Embedding + DB-Update
 # ==========================================
@@ -119,9 +552,15 @@ def embed():
             'error': f'Ungültige Methode. Verfügbar: {", ".join(available_methods)}'
         }), 400
     
+    replay = idempotent('embed', file, method=method)
+    if replay is not None:
+        return replay
+    
+    admit('embed', method, file.stream)
+    
     try:
         # Business Logic via Service
-        with get_db() as db:
+        with get_db() as db, metrics.labels(method=method):
             audio_repo = AudioFileRepository(db)
             business_service = WatermarkBusinessService(audio_repo)
             
@@ -134,12 +573,14 @@ def embed():
                 user_id=user_id
             )
         
-        # Datei zum Download senden
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=metadata['output_filename']
-        )
+        # Ergebnis für Wiederholungen mit demselben Idempotency-Key
+        remember_result(output_path, metadata['output_filename'], metadata['watermarked_id'])
+        
+        # Datei zum Download senden; IDs für die Waveform-Vorschau der UI
+        response = send_audio_file(output_path, metadata['output_filename'])
+        response.headers['X-Audio-Id'] = str(metadata['watermarked_id'])
+        response.headers['X-Original-Audio-Id'] = str(metadata['original_id'])
+        return response
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -157,6 +598,7 @@ def detect():
     Detect Watermark in Audio.
     - Upload + Detection (AudioSeal oder PerTh)
     - Speichert Detection-Ergebnis in DB
+    - Optional 'expected_message' (Bits, z.B. "0101...") -> bit_accuracy
     """
     # Validierung
     if 'audio' not in request.files:
@@ -164,6 +606,7 @@ def detect():
     
     file = request.files['audio']
     method = request.form.get('method', 'audioseal')
+    expected_message = request.form.get('expected_message') or None
     
     if file.filename == '':
         return jsonify({'error': 'Keine Datei ausgewählt'}), 400
@@ -175,9 +618,11 @@ def detect():
             'error': f'Ungültige Methode. Verfügbar: {", ".join(available_methods)}'
         }), 400
     
+    admit('detect', method, file.stream)
+    
     try:
         # Business Logic via Service
-        with get_db() as db:
+        with get_db() as db, metrics.labels(method=method):
             audio_repo = AudioFileRepository(db)
             business_service = WatermarkBusinessService(audio_repo)
             
@@ -187,7 +632,8 @@ def detect():
                 file=file,
                 method=method,
                 upload_folder=UPLOAD_FOLDER,
-                user_id=user_id
+                user_id=user_id,
+                expected_message=expected_message
             )
         
         return jsonify(detection_result), 200
@@ -199,6 +645,134 @@ def detect():
         return jsonify({'error': f'Interner Serverfehler: {str(e)}'}), 500
 
 
+# ==========================================
+# SCHNITTSTELLE 3b: Batch-Detection (mehrere Dateien / Archiv)
+# ==========================================
+@app.route('/watermark/detect/batch', methods=['POST'])
+def detect_batch():
+    """
+    Detect Watermark in vielen Audio-Dateien mit einem Request.
+    - Mehrere Dateien im Feld 'audio' und/oder ein ZIP/TAR im Feld 'archive'
+    - Archiv-Einträge werden einzeln gestreamt, nicht komplett entpackt
+    - Uploads plus entpackte Archiv-Einträge höchstens AudioService.MAX_BATCH_SIZE,
+      sonst 413 (ZIP und Uploads vor dem Start, TAR beim Lesen)
+    - Speichert die Ergebnisse batchweise in DB (ein Commit pro Batch)
+    - Antwort: ein JSON-Report, oder NDJSON pro Datei bei
+      'Accept: application/x-ndjson' bzw. ?stream=1
+    """
+    files = [f for f in request.files.getlist('audio') if f.filename]
+    archive = request.files.get('archive')
+    method = request.form.get('method', 'audioseal')
+    
+    if not files and not (archive and archive.filename):
+        return jsonify({'error': 'Keine Dateien oder Archiv gefunden'}), 400
+    
+    if archive and archive.filename and not AudioService.is_archive(archive.filename):
+        allowed = ', '.join(AudioService.ARCHIVE_EXTENSIONS)
+        return jsonify({'error': f'Ungültiges Archiv-Format. Erlaubt: {allowed}'}), 400
+    
+    if len(files) > AudioService.MAX_BATCH_FILES:
+        return jsonify({'error': f'Zu viele Dateien. Maximum: {AudioService.MAX_BATCH_FILES}'}), 400
+    
+    # Methoden-Validierung
+    available_methods = WatermarkStrategyFactory.available_methods()
+    if method not in available_methods:
+        return jsonify({
+            'error': f'Ungültige Methode. Verfügbar: {", ".join(available_methods)}'
+        }), 400
+    
+    # Gesamtgröße vor der Arbeit prüfen: Uploads liegen schon vor, ZIP hat ein Inhaltsverzeichnis
+    upload_size = sum(_stream_size(f.stream) for f in files)
+    try:
+        archive_size = AudioService.declared_archive_size(archive) if archive and archive.filename else 0
+        AudioService.validate_batch_size(upload_size + archive_size)
+    except BatchTooLarge as e:
+        raise RequestEntityTooLarge(str(e))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    user_id = 1  # TODO: Aus Session holen
+    
+    # Ein Platz für den ganzen Batch, Kosten aus der Request-Größe
+    admit('detect', method, request.content_length or 0)
+    
+    # Flask schließt beim Verlassen der View alle Uploads, eine gestreamte
+    # Antwort liest sie aber erst danach -> Streams vom Request lösen
+    uploads = [FileStorage(_detach_stream(f), f.filename) for f in files]
+    if archive and archive.filename:
+        archive = FileStorage(_detach_stream(archive), archive.filename)
+    else:
+        archive = None
+    
+    def entries():
+        try:
+            for f in uploads:
+                yield f.filename, f.stream
+            if archive:
+                yield from AudioService.iter_archive_entries(archive, used_size=upload_size)
+        finally:
+            for f in uploads + ([archive] if archive else []):
+                f.close()
+    
+    def run_batch():
+        with get_db() as db, metrics.labels(method=method):
+            audio_repo = AudioFileRepository(db)
+            business_service = WatermarkBusinessService(audio_repo)
+            yield from business_service.detect_batch_workflow(
+                entries=entries(),
+                method=method,
+                upload_folder=UPLOAD_FOLDER,
+                user_id=user_id
+            )
+    
+    # NDJSON: jede Zeile ein Ergebnis, sobald der jeweilige Batch fertig ist
+    if request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        def generate():
+            try:
+                for result in run_batch():
+                    yield json.dumps(result) + '\n'
+            except Exception as e:
+                yield json.dumps({'error': str(e)}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        results = list(run_batch())
+        
+        return jsonify({
+            'method': method,
+            'count': len(results),
+            'detected_count': sum(1 for r in results if r.get('detected')),
+            'error_count': sum(1 for r in results if 'error' in r),
+            'results': results
+        }), 200
+        
+    except BatchTooLarge as e:
+        # TAR: erst beim Lesen erkannt, bereits verarbeitete Teil-Batches bleiben gespeichert
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        # TODO: Proper logging
+        return jsonify({'error': f'Interner Serverfehler: {str(e)}'}), 500
+
+
+def _stream_size(stream) -> int:
+    """Größe eines Upload-Streams (Position bleibt erhalten)"""
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+
+def _detach_stream(file: FileStorage):
+    """Löst den Stream eines Uploads vom Request, damit request.close() ihn nicht schließt"""
+    stream = file.stream
+    file.stream = io.BytesIO()
+    return stream
+
+
 # ==========================================
 # SCHNITTSTELLE 4: File Download aus DB
 # ==========================================
@@ -223,12 +797,50 @@ def download_audio(audio_id: int):
             if not os.path.exists(audio_file.file_path):
                 return jsonify({'error': 'Datei im Filesystem nicht gefunden'}), 404
             
-            return send_file(
-                audio_file.file_path,
-                as_attachment=True,
-                download_name=audio_file.filename
-            )
+            return send_audio_file(audio_file.file_path, audio_file.filename)
+        
+    except ValueError as e:
+        # Ungültiges ?format=
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/audio/<int:audio_id>/peaks', methods=['GET'])
+def audio_peaks(audio_id: int):
+    """
+    Min/Max-Werte für die Waveform-Vorschau (siehe services/waveform.py).
+    Die Pyramide wird beim ersten Aufruf berechnet, danach kostet jeder
+    Ausschnitt nur O(width).
+    
+    Query-Parameter:
+        track: 'audio' (Standard) oder 'residual' (Watermarked − Original,
+               nur für Dateien aus /watermark/embed)
+        start / end: Ausschnitt in Sekunden (Standard: ganze Datei)
+        width: Anzahl Pixel (Standard 1000, max. waveform.MAX_WIDTH)
+    """
+    try:
+        track = request.args.get('track', 'audio')
+        start = request.args.get('start', 0.0, type=float)
+        end = request.args.get('end', type=float)
+        width = request.args.get('width', 1000, type=int)
+        
+        with get_db() as db:
+            audio_file = AudioFileRepository(db).get_by_id(audio_id)
+            if not audio_file:
+                return jsonify({'error': 'Datei nicht gefunden'}), 404
+            file_path = audio_file.file_path
         
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'Datei im Filesystem nicht gefunden'}), 404
+        
+        peaks = waveform.read_peaks(file_path, track, start, end, width)
+        return jsonify({'audio_id': audio_id, **peaks}), 200
+    
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -239,17 +851,30 @@ def download_audio(audio_id: int):
 @app.route('/files', methods=['GET'])
 def list_user_files():
     """
-    Gibt alle Audio-Dateien eines Users zurück.
+    Gibt die Audio-Dateien eines Users seitenweise zurück (neueste zuerst).
+    
+    Query-Parameter:
+        limit: Einträge pro Seite (Standard 50, max. 200)
+        cursor: next_cursor der vorherigen Seite
+        watermark_type: Filter, z.B. AudioSeal
+        from / to: Zeitraum (ISO-8601), 'to' exklusiv
     """
     try:
+        page_args = _pagination_args()
+        
         with get_db() as db:
             audio_repo = AudioFileRepository(db)
             user_id = 1  # TODO: Aus Session
             
-            files = audio_repo.get_by_user(user_id)
+            files, next_cursor = audio_repo.list_page(
+                user_id,
+                watermark_type=request.args.get('watermark_type'),
+                **page_args
+            )
             
             return jsonify({
                 'count': len(files),
+                'next_cursor': next_cursor,
                 'files': [
                     {
                         'id': f.id,
@@ -262,7 +887,9 @@ def list_user_files():
                     for f in files
                 ]
             }), 200
-        
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -291,10 +918,11 @@ def delete_audio_file(audio_id: int):
             # if audio_file.user_id != current_user_id:
             #     return jsonify({'error': 'Keine Berechtigung'}), 403
             
-            # Datei aus Filesystem löschen (falls vorhanden)
+            # Datei aus Filesystem löschen (falls vorhanden), samt Waveform-Pyramiden
             if os.path.exists(audio_file.file_path):
                 try:
                     os.remove(audio_file.file_path)
+                    waveform.remove_sidecars(audio_file.file_path)
                 except Exception as e:
                     print(f"Warnung: Konnte Datei nicht löschen: {e}")
             
@@ -334,6 +962,10 @@ def apply_manipulation():
     if not manipulation_type:
         return jsonify({'error': 'Manipulation-Typ fehlt'}), 400
     
+    replay = idempotent('manipulation', file, manipulation_type=manipulation_type, parameters=parameters_json)
+    if replay is not None:
+        return replay
+    
     try:
         # Parameter parsen
         parameters = json.loads(parameters_json)
@@ -342,28 +974,36 @@ def apply_manipulation():
         AudioService.validate_audio_file(file)
         temp_filename = f"temp_{uuid.uuid4().hex}_{file.filename}"
         temp_path = os.path.join(UPLOAD_FOLDER, temp_filename)
-        file.save(temp_path)
+        AudioService.store_upload(file, temp_path)
         
         # Output-Dateiname
         output_filename = f"manipulated_{manipulation_type}_{file.filename}"
         output_path = os.path.join(UPLOAD_FOLDER, output_filename)
         
-        # Manipulation anwenden
-        metadata = AudioManipulationService.apply_manipulation(
-            manipulation_type=manipulation_type,
-            audio_path=temp_path,
-            output_path=output_path,
-            parameters=parameters
-        )
-        
-        # Metadaten ergänzen
-        file_size = os.path.getsize(output_path)
+        # Manipulation anwenden (Temp-Datei wird auch bei Fehlern gelöscht);
+        # librosa/scipy erst hier laden statt beim App-Start
+        from services.audio_manipulation_service import AudioManipulationService
+        try:
+            with metrics.labels(manipulation_type=manipulation_type):
+                metadata = AudioManipulationService.apply_manipulation(
+                    manipulation_type=manipulation_type,
+                    audio_path=temp_path,
+                    output_path=output_path,
+                    parameters=parameters
+                )
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
         
         # In Datenbank speichern
-        with get_db() as db:
+        with get_db() as db, metrics.labels(manipulation_type=manipulation_type):
             manipulated_repo = ManipulatedAudioFileRepository(db)
             user_id = 1  # TODO: Aus Session
             
+            # Als FLAC ablegen; ein älterer Eintrag mit gleichem Namen behält sein WAV
+            output_path = storage_tier.compress(output_path, keep_source=manipulated_repo.path_in_use(output_path))
+            file_size = os.path.getsize(output_path)
+            
             manipulated_audio = manipulated_repo.create(
                 user_id=user_id,
                 filename=output_filename,
@@ -375,16 +1015,10 @@ def apply_manipulation():
                 manipulation_parameters=parameters
             )
         
-        # Temp-Datei löschen
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        remember_result(output_path, output_filename, manipulated_audio.id)
         
         # Manipulierte Datei zum Download senden
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=output_filename
-        )
+        return send_audio_file(output_path, output_filename)
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -398,36 +1032,230 @@ def apply_manipulation():
 @app.route('/manipulation/list', methods=['GET'])
 def list_manipulated_files():
     """
-    Gibt alle manipulierten Audio-Dateien eines Users zurück.
+    Gibt die manipulierten Audio-Dateien eines Users seitenweise zurück (neueste zuerst).
+    
+    Query-Parameter:
+        limit: Einträge pro Seite (Standard 50, max. 200)
+        cursor: next_cursor der vorherigen Seite
+        manipulation_type: Filter, z.B. noise
+        watermark_type: Filter, z.B. AudioSeal
+        from / to: Zeitraum (ISO-8601), 'to' exklusiv
+        include_parameters: '0' lässt die Manipulations-Parameter weg
     """
     try:
+        page_args = _pagination_args()
+        include_parameters = request.args.get('include_parameters', '1') != '0'
+        
         with get_db() as db:
             manipulated_repo = ManipulatedAudioFileRepository(db)
             user_id = 1  # TODO: Aus Session
             
-            files = manipulated_repo.get_by_user(user_id)
+            files, next_cursor = manipulated_repo.list_page(
+                user_id,
+                manipulation_type=request.args.get('manipulation_type'),
+                watermark_type=request.args.get('watermark_type'),
+                include_parameters=include_parameters,
+                **page_args
+            )
+            
+            items = []
+            for f in files:
+                item = {
+                    'id': f.id,
+                    'filename': f.filename,
+                    'file_size': f.file_size,
+                    'duration': f.duration,
+                    'manipulation_type': f.manipulation_type,
+                    'created_at': f.created_at.isoformat()
+                }
+                if include_parameters:
+                    item['parameters'] = json.loads(f.manipulation_parameters or '{}')
+                items.append(item)
             
             return jsonify({
-                'count': len(files),
-                'files': [
-                    {
-                        'id': f.id,
-                        'filename': f.filename,
-                        'file_size': f.file_size,
-                        'duration': f.duration,
-                        'manipulation_type': f.manipulation_type,
-                        'parameters': json.loads(f.manipulation_parameters),
-                        'created_at': f.created_at.isoformat()
-                    }
-                    for f in files
-                ]
+                'count': len(items),
+                'next_cursor': next_cursor,
+                'files': items
             }), 200
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ==========================================
+# SCHNITTSTELLE 9: Detection auf manipulierter Datei
+# ==========================================
+@app.route('/manipulation/<int:manipulated_id>/detect', methods=['POST'])
+def detect_manipulated(manipulated_id: int):
+    """
+    Führt die Detection auf einer gespeicherten manipulierten Datei aus
+    und speichert das Ergebnis verknüpft mit dieser Datei.
+    
+    Parameter (Form oder Query):
+        method: 'audioseal' oder 'perth' (Standard: audioseal)
+        expected_message: Optional eingebettete Bits -> bit_accuracy
+    """
+    method = request.values.get('method', 'audioseal')
+    
+    available_methods = WatermarkStrategyFactory.available_methods()
+    if method not in available_methods:
+        return jsonify({
+            'error': f'Ungültige Methode. Verfügbar: {", ".join(available_methods)}'
+        }), 400
+    
+    try:
+        with get_db() as db, metrics.labels(method=method):
+            manipulated_repo = ManipulatedAudioFileRepository(db)
+            user_id = 1  # TODO: Aus Session
+            
+            manipulated = manipulated_repo.get_by_id(manipulated_id)
+            if not manipulated:
+                return jsonify({'error': 'Datei nicht gefunden'}), 404
+            if manipulated.user_id != user_id:
+                return jsonify({'error': 'Keine Berechtigung'}), 403
+            if not os.path.exists(manipulated.file_path):
+                return jsonify({'error': 'Datei existiert nicht mehr auf dem Server'}), 404
+            
+            admit('detect', method, manipulated.file_path)
+            
+            business_service = WatermarkBusinessService(AudioFileRepository(db))
+            detection_result = business_service.detect_stored_workflow(
+                file_path=manipulated.file_path,
+                method=method,
+                user_id=user_id,
+                manipulated_audio_id=manipulated.id,
+                expected_message=request.values.get('expected_message') or None
+            )
+        
+        detection_result['manipulated_id'] = manipulated_id
+        return jsonify(detection_result), 200
+    
+    except admission.AdmissionRejected:
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Interner Serverfehler: {str(e)}'}), 500
+
+
+# ==========================================
+# SCHNITTSTELLE 10: Robustheits-Statistik
+# ==========================================
+@app.route('/detection/stats', methods=['GET'])
+def detection_stats():
+    """
+    Detection-Rate und Mittelwerte pro (Methode, Manipulation, Parameter),
+    in der Datenbank aggregiert.
+    
+    Query-Parameter:
+        method: Filter, z.B. audioseal
+        manipulation_type: Filter, z.B. noise
+    """
+    method = request.args.get('method')
+    
+    try:
+        if method:
+            # Gespeichert wird der Anzeigename der Strategy (z.B. "AudioSeal")
+            method = WatermarkStrategyFactory.get_strategy(method).name
+        
+        with get_db() as db:
+            detection_repo = DetectionResultRepository(db)
+            user_id = 1  # TODO: Aus Session
+            
+            rows = detection_repo.robustness_stats(
+                user_id,
+                method=method,
+                manipulation_type=request.args.get('manipulation_type')
+            )
+            
+            stats = [{
+                'method': row.method,
+                'manipulation_type': row.manipulation_type,
+                'parameters': json.loads(row.manipulation_parameters) if row.manipulation_parameters else None,
+                'count': row.count,
+                'detection_rate': row.detection_rate,
+                'mean_confidence': row.mean_confidence,
+                'mean_bit_accuracy': row.mean_bit_accuracy,
+                'mean_latency_ms': row.mean_latency_ms
+            } for row in rows]
+            
+            return jsonify({'count': len(stats), 'stats': stats}), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==========================================
+# SCHNITTSTELLE 11: Admin - Request-Profile
+# ==========================================
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """
+    Listet gespeicherte Request-Profile (neueste zuerst).
+    Erfordert Header X-Admin-Token.
+    """
+    if not profiling.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Keine Berechtigung'}), 403
+    
+    profiles = profiling.list_profiles()
+    return jsonify({'count': len(profiles), 'profiles': profiles}), 200
+
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id: str):
+    """
+    Lädt ein Profil herunter (.prof für pstats/snakeviz, .speedscope.json für speedscope).
+    Erfordert Header X-Admin-Token.
+    """
+    if not profiling.is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({'error': 'Keine Berechtigung'}), 403
+    
+    filename = profiling.profile_file(profile_id)
+    if not filename:
+        return jsonify({'error': 'Profil nicht gefunden'}), 404
+    
+    return send_from_directory(profiling.PROFILE_FOLDER, filename, as_attachment=True)
+
+
+def _pagination_args() -> dict:
+    """
+    Liest limit/cursor/from/to aus den Query-Parametern.
+    
+    Raises:
+        ValueError: Bei ungültigen Werten
+    """
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("Ungültiger Wert für 'limit'")
+    
+    def parse_date(name):
+        value = request.args.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Ungültiges Datum für '{name}' (ISO-8601 erwartet)")
+    
+    return {
+        'limit': limit,
+        'cursor': request.args.get('cursor') or None,
+        'created_from': parse_date('from'),
+        'created_to': parse_date('to')
+    }
+
+
 # App starten
 if __name__ == '__main__':
+    # torch-Threads setzt dann das Warm-up im Hintergrund (statt torch hier synchron zu laden)
+    runtime_config.RuntimeConfig.from_env(workers=1).apply(defer_torch=readiness.PRELOAD_MODELS != '0')
+    # Mit Reloader läuft die App im Kindprozess (WERKZEUG_RUN_MAIN) - nur dort aufwärmen
+    if readiness.PRELOAD_MODELS != '0' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        readiness.start_background_warm_up()
     app.run(debug=True, host='0.0.0.0', port=5000)
     #Localhost sonst 0.0.0.0 für Docker
\ No newline at end of file
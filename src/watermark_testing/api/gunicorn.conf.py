@@ -0,0 +1,82 @@
+"""
+Gunicorn-Konfiguration für den Production-Betrieb.
+
+Umgebungsvariablen:
+    PORT               Port (Standard: 5000)
+    WEB_CONCURRENCY    Anzahl Worker-Prozesse (Standard: CPU-Kerne / 2)
+    GUNICORN_THREADS   Request-Threads pro Worker (Standard: 2)
+    PRELOAD_MODELS     '1' Modelle im Master vorladen, 'background' pro Worker im
+                       Hintergrund, '0' gar nicht (siehe services/readiness.py)
+
+Threads und Kern-Pinning pro Worker: siehe services/runtime_config.py
+(TORCH_NUM_THREADS, TORCH_INTEROP_THREADS, BLAS_NUM_THREADS, WORKER_CPU_SETS)
+"""
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.runtime_config import RuntimeConfig
+
+_cpu_count = multiprocessing.cpu_count()
+
+# ==========================================
+# SERVER
+# ==========================================
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+pythonpath = str(Path(__file__).parent)
+wsgi_app = 'wsgi:app'
+
+# App (und damit die Modelle) im Master laden, dann forken
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', max(1, _cpu_count // 2)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+# Für die Auslastungs-Prüfung in /ready (services/capacity.py)
+os.environ.setdefault('GUNICORN_THREADS', str(threads))
+
+# Inferenz auf langen Dateien kann dauern
+timeout = 300
+graceful_timeout = 30
+
+accesslog = '-'
+
+# Downloads ohne Range-Header per sendfile() direkt aus dem Page-Cache (zero-copy)
+sendfile = True
+
+# Thread-Konfiguration pro Worker; BLAS-Variablen müssen vor dem
+# Import von numpy/torch im Master gesetzt sein
+runtime_config = RuntimeConfig.from_env(workers=workers)
+runtime_config.configure_environment()
+
+
+# ==========================================
+# HOOKS
+# ==========================================
+def pre_fork(server, worker):
+    """Läuft im Master: vergibt den kleinsten freien Worker-Slot (für Kern-Pinning)"""
+    used_slots = {getattr(w, 'slot', None) for w in server.WORKERS.values()}
+    worker.slot = next(slot for slot in range(len(used_slots) + 1) if slot not in used_slots)
+
+
+def post_fork(server, worker):
+    """Läuft im Worker direkt nach dem Fork"""
+    from database.database import engine
+
+    # Vom Master geerbte DB-Verbindungen nicht weiterverwenden
+    engine.dispose(close=False)
+
+    from services import readiness
+
+    background = readiness.PRELOAD_MODELS == 'background'
+    settings = runtime_config.apply(worker.slot, defer_torch=background)
+    server.log.info(f"Worker {worker.pid} (Slot {worker.slot}): {settings}")
+    if settings.get('torch_inter_op', {}).get('applied') is False:
+        server.log.warning(f"Worker {worker.pid}: inter-op Threads nicht gesetzt: {settings['torch_inter_op']}")
+
+    if background:
+        # Worker nimmt sofort Requests an; /ready meldet 200 nach dem Warm-up
+        readiness.start_background_warm_up()
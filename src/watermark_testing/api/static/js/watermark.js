@@ -15,6 +15,9 @@ function embedWatermark() {
     const methodName = method === 'audioseal' ? 'AudioSeal' : 'PerTh';
     showResult(`⏳ Watermark wird mit ${methodName} eingebettet...`, false, 'embedResult');
 
+    // IDs der gespeicherten Dateien für die Waveform-Vorschau
+    let previewIds = null;
+
     fetch('/watermark/embed', {
         method: 'POST',
         body: formData
@@ -23,6 +26,10 @@ function embedWatermark() {
         if (!response.ok) {
             return response.json().then(err => { throw new Error(err.error || 'Unbekannter Fehler'); });
         }
+        previewIds = {
+            watermarked: response.headers.get('X-Audio-Id'),
+            original: response.headers.get('X-Original-Audio-Id')
+        };
         return response.blob();
     })
     .then(blob => {
@@ -35,6 +42,7 @@ function embedWatermark() {
         a.remove();
         
         showResult(`✅ Watermark erfolgreich mit ${methodName} eingebettet! Download startet...`, false, 'embedResult');
+        showEmbedWaveforms(previewIds);
     })
     .catch(error => {
         showResult('❌ Fehler: ' + error.message, true, 'embedResult');
@@ -51,6 +59,12 @@ function detectWatermark() {
         return;
     }
 
+    // Mehrere Dateien oder Archiv -> Batch-Route
+    if (fileInput.files.length > 1 || isArchive(fileInput.files[0].name)) {
+        detectWatermarkBatch(fileInput.files, method);
+        return;
+    }
+
     const formData = new FormData();
     formData.append('audio', fileInput.files[0]);
     formData.append('method', method);
@@ -119,12 +133,238 @@ function detectWatermark() {
     });
 }
 
+/**
+ * Prüft ob eine Datei ein unterstütztes Archiv ist
+ */
+function isArchive(filename) {
+    return /\.(zip|tar|tgz|tar\.gz|tar\.bz2)$/i.test(filename);
+}
+
+/**
+ * Batch-Detection: schickt alle Dateien in einem Request und zeigt
+ * die Ergebnisse zeilenweise an, sobald der Server sie liefert (NDJSON)
+ */
+function detectWatermarkBatch(files, method) {
+    const formData = new FormData();
+    for (const file of files) {
+        formData.append(isArchive(file.name) ? 'archive' : 'audio', file);
+    }
+    formData.append('method', method);
+
+    const methodName = method === 'audioseal' ? 'AudioSeal' : 'PerTh';
+    document.getElementById('detectResult').innerHTML = `
+        <div class="mt-4">
+            <h6 class="text-center">📊 Batch-Analyse (${methodName}): <span id="batchProgress">0</span> Dateien</h6>
+            <ul id="batchResults" class="list-group mt-3"></ul>
+        </div>
+    `;
+    const list = document.getElementById('batchResults');
+    const progress = document.getElementById('batchProgress');
+    let count = 0;
+
+    const renderLine = line => {
+        if (!line.trim()) return;
+        const item = JSON.parse(line);
+        count += 1;
+        progress.textContent = count;
+
+        let status;
+        if (item.error) {
+            status = `<span class="badge bg-danger">❌ ${escapeHtml(item.error)}</span>`;
+        } else {
+            const confidence = item.confidence !== undefined ? ` (${item.confidence.toFixed(2)}%)` : '';
+            status = item.detected
+                ? `<span class="badge bg-success">✅ Watermark${confidence}</span>`
+                : `<span class="badge bg-warning text-dark">⚠️ Kein Watermark${confidence}</span>`;
+        }
+        list.insertAdjacentHTML('beforeend', `
+            <li class="list-group-item d-flex justify-content-between align-items-center">
+                <span>${escapeHtml(item.filename || 'Batch')}</span>${status}
+            </li>
+        `);
+    };
+
+    fetch('/watermark/detect/batch', {
+        method: 'POST',
+        headers: { 'Accept': 'application/x-ndjson' },
+        body: formData
+    })
+    .then(async response => {
+        if (!response.ok) {
+            const err = await response.json();
+            throw new Error(err.error || 'Unbekannter Fehler');
+        }
+
+        // Antwort zeilenweise lesen
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.forEach(renderLine);
+        }
+        renderLine(buffer);
+    })
+    .catch(error => {
+        showResult('❌ Fehler: ' + error.message, true, 'detectResult');
+    });
+}
+
+// ==========================================
+// RESUMABLE UPLOAD (Chunks)
+// ==========================================
+
+// Chunks gleichzeitig in der Luft und Versuche pro Chunk
+const UPLOAD_PARALLEL_CHUNKS = 4;
+const UPLOAD_CHUNK_ATTEMPTS = 3;
+
+/**
+ * Lädt die gewählte Datei in Chunks hoch. Bricht die Verbindung ab, setzt
+ * ein erneuter Klick mit derselben Datei dort fort, wo der Server steht.
+ */
+function uploadLargeFile() {
+    const file = document.getElementById('uploadFile').files[0];
+    if (!file) {
+        showResult('❌ Bitte wähle eine Audio-Datei aus!', true, 'uploadResult');
+        return;
+    }
+
+    const progress = document.getElementById('uploadProgress');
+    const bar = document.getElementById('uploadProgressBar');
+    progress.style.display = 'flex';
+    document.getElementById('uploadResult').innerHTML = '';
+
+    resumableUpload(file, (sent, total) => {
+        const percent = Math.round(100 * sent / total);
+        bar.style.width = `${percent}%`;
+        bar.textContent = `${percent}%`;
+    })
+    .then(data => {
+        showResult(`✅ ${escapeHtml(data.filename)} hochgeladen (${data.metadata.duration.toFixed(1)} s)`, false, 'uploadResult');
+        loadFiles();
+    })
+    .catch(error => {
+        showResult('❌ Fehler: ' + error.message + ' - erneut klicken zum Fortsetzen', true, 'uploadResult');
+    })
+    .finally(() => {
+        progress.style.display = 'none';
+    });
+}
+
+/**
+ * Session anlegen (oder fortsetzen), fehlende Chunks parallel senden, abschließen
+ */
+async function resumableUpload(file, onProgress) {
+    const session = await openUploadSession(file);
+    const queue = session.missing_chunks.slice();
+    let sent = session.received_bytes;
+    onProgress(sent, file.size);
+
+    // Feste Anzahl Worker, jeder holt sich den nächsten fehlenden Chunk
+    const worker = async () => {
+        while (queue.length) {
+            const index = queue.shift();
+            sent += await uploadChunk(session, file, index);
+            onProgress(sent, file.size);
+        }
+    };
+    await Promise.all(Array.from({ length: Math.min(UPLOAD_PARALLEL_CHUNKS, queue.length) }, worker));
+
+    const data = await fetchJson(`/upload/sessions/${session.upload_id}/finalize`, { method: 'POST' });
+    localStorage.removeItem(uploadSessionKey(file));
+    return data;
+}
+
+function uploadSessionKey(file) {
+    return `upload:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+/**
+ * Offene Session derselben Datei fortsetzen, sonst eine neue anlegen
+ */
+async function openUploadSession(file) {
+    const key = uploadSessionKey(file);
+    const previous = localStorage.getItem(key);
+    if (previous) {
+        const response = await fetch(`/upload/sessions/${previous}`);
+        if (response.ok) {
+            const status = await response.json();
+            if (status.status === 'open') return status;
+        }
+        localStorage.removeItem(key);
+    }
+
+    const session = await fetchJson('/upload/sessions', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    localStorage.setItem(key, session.upload_id);
+    session.missing_chunks = Array.from({ length: session.chunk_count }, (_, i) => i);
+    session.received_bytes = 0;
+    return session;
+}
+
+/**
+ * Sendet einen Chunk mit SHA-256 (wenn crypto.subtle verfügbar ist, d.h. HTTPS
+ * oder localhost). Netzwerk- und Serverfehler werden mit Pause wiederholt.
+ *
+ * @returns {Promise<number>} gesendete Bytes
+ */
+async function uploadChunk(session, file, index) {
+    const offset = index * session.chunk_size;
+    const chunk = file.slice(offset, offset + session.chunk_size);
+    const headers = { 'Content-Type': 'application/octet-stream' };
+    if (window.crypto && crypto.subtle) {
+        const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+        headers['X-Chunk-SHA256'] = Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    for (let attempt = 1; ; attempt++) {
+        let retry = true;
+        try {
+            const response = await fetch(`/upload/sessions/${session.upload_id}/chunks?offset=${offset}`, {
+                method: 'PUT',
+                headers: headers,
+                body: chunk
+            });
+            if (response.ok) return chunk.size;
+
+            const err = await response.json().catch(() => ({}));
+            // 422 = Prüfsumme (Übertragungsfehler), 429/5xx = Server ausgelastet
+            retry = response.status === 422 || response.status === 429 || response.status >= 500;
+            throw new Error(err.error || `HTTP ${response.status}`);
+        } catch (error) {
+            if (!retry || attempt >= UPLOAD_CHUNK_ATTEMPTS) throw error;
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+    }
+}
+
+async function fetchJson(url, options) {
+    const response = await fetch(url, options);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || 'Unbekannter Fehler');
+    }
+    return data;
+}
+
 // ==========================================
 // FILES MANAGEMENT
 // ==========================================
 
+// Seitenweises Laden der Dateiliste (Keyset-Cursor vom Server)
+const FILES_PAGE_SIZE = 50;
+let loadedFiles = [];
+let filesNextCursor = null;
+
 /**
- * Lädt alle Dateien vom Server und zeigt sie an
+ * Lädt die erste Seite der Dateien vom Server und zeigt sie an
  */
 function loadFiles() {
     const loadingDiv = document.getElementById('filesLoading');
@@ -136,7 +376,7 @@ function loadFiles() {
     containerDiv.style.display = 'none';
     errorDiv.style.display = 'none';
     
-    fetch('/files', {
+    fetch(`/files?limit=${FILES_PAGE_SIZE}`, {
         method: 'GET'
     })
     .then(response => response.json())
@@ -145,7 +385,9 @@ function loadFiles() {
             throw new Error(data.error);
         }
         
-        displayFiles(data.files, data.count);
+        loadedFiles = data.files;
+        filesNextCursor = data.next_cursor;
+        displayFiles(loadedFiles, filesNextCursor !== null);
         
         // Container anzeigen
         loadingDiv.style.display = 'none';
@@ -158,16 +400,43 @@ function loadFiles() {
     });
 }
 
+/**
+ * Lädt die nächste Seite und hängt sie an die Liste an
+ */
+function loadMoreFiles() {
+    if (!filesNextCursor) return;
+    
+    fetch(`/files?limit=${FILES_PAGE_SIZE}&cursor=${encodeURIComponent(filesNextCursor)}`, {
+        method: 'GET'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.error) {
+            throw new Error(data.error);
+        }
+        
+        loadedFiles = loadedFiles.concat(data.files);
+        filesNextCursor = data.next_cursor;
+        displayFiles(loadedFiles, filesNextCursor !== null);
+    })
+    .catch(error => {
+        showAlert('danger', '❌ Fehler beim Laden der Dateien: ' + error.message);
+    });
+}
+
 /**
  * Zeigt die Dateiliste an
  */
-function displayFiles(files, count) {
+function displayFiles(files, hasMore) {
     const filesList = document.getElementById('filesList');
     const fileCount = document.getElementById('fileCount');
     const noFilesMessage = document.getElementById('noFilesMessage');
+    const loadMoreButton = document.getElementById('loadMoreFiles');
     
-    // Counter aktualisieren
-    fileCount.textContent = `${count} ${count === 1 ? 'File' : 'Files'}`;
+    // Counter aktualisieren ("50+" wenn weitere Seiten existieren)
+    const count = files.length;
+    fileCount.textContent = `${count}${hasMore ? '+' : ''} ${count === 1 ? 'File' : 'Files'}`;
+    loadMoreButton.style.display = hasMore ? 'block' : 'none';
     
     // Wenn keine Dateien vorhanden
     if (files.length === 0) {
@@ -213,6 +482,9 @@ function displayFiles(files, count) {
                         </div>
                     </div>
                     <div class="file-actions">
+                        <button class="btn btn-sm btn-outline-secondary" data-file-id="${file.id}" data-filename="${escapeHtml(file.filename)}" data-action="waveform">
+                            〰️ Waveform
+                        </button>
                         <button class="btn btn-sm btn-outline-primary" data-file-id="${file.id}" data-action="download">
                             ⬇️ Download
                         </button>
@@ -241,6 +513,8 @@ function handleFileAction(event) {
     
     if (action === 'download') {
         downloadFile(fileId);
+    } else if (action === 'waveform') {
+        showFileWaveform(fileId, button.dataset.filename);
     } else if (action === 'delete') {
         const filename = button.dataset.filename;
         deleteFile(fileId, filename);
@@ -553,4 +827,198 @@ function updatePitchDisplay(value) {
     }
     
     displayEl.textContent = displayText;
-}
\ No newline at end of file
+}
+
+// ==========================================
+// WAVEFORM
+// ==========================================
+
+// Min/Max-Werte kommen vom Server (/audio/<id>/peaks), pro Ausschnitt nur so
+// viele wie Pixel. Alle Spuren einer Vorschau teilen Zoom und Position:
+// Mausrad zoomt um den Mauszeiger, Ziehen verschiebt den Ausschnitt.
+const WAVEFORM_HEIGHT = 80;
+const WAVEFORM_FETCH_DELAY_MS = 120;
+const WAVEFORM_MIN_SPAN_S = 0.005;
+const WAVEFORM_COLORS = { audio: '#2563eb', residual: '#dc2626' };
+
+// Container-ID -> { tracks, duration, start, end, timer }
+const waveformViews = new Map();
+
+/**
+ * Vorschau nach dem Embedding: Original, Watermarked und Residuum
+ */
+function showEmbedWaveforms(ids) {
+    if (!ids || !ids.watermarked) return;
+
+    const tracks = [];
+    if (ids.original) {
+        tracks.push({ audioId: ids.original, track: 'audio', label: 'Original' });
+    }
+    tracks.push({ audioId: ids.watermarked, track: 'audio', label: 'Watermarked' });
+    tracks.push({ audioId: ids.watermarked, track: 'residual', label: 'Residual (Watermarked − Original)' });
+    showWaveforms('embedWaveform', tracks);
+}
+
+/**
+ * Vorschau einer Datei aus dem Files-Tab (mit Residuum, falls vorhanden)
+ */
+function showFileWaveform(fileId, filename) {
+    document.getElementById('fileWaveformTitle').textContent = filename;
+    showWaveforms('fileWaveform', [
+        { audioId: fileId, track: 'audio', label: 'Audio' },
+        { audioId: fileId, track: 'residual', label: 'Residual (Watermarked − Original)' }
+    ]);
+    document.getElementById('fileWaveformPanel').scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+}
+
+/**
+ * Legt pro Spur ein Canvas an und lädt die ganze Datei
+ */
+function showWaveforms(containerId, tracks) {
+    const container = document.getElementById(containerId);
+    const panel = container.closest('.waveform-panel');
+    if (panel) panel.style.display = 'block';
+
+    const previous = waveformViews.get(containerId);
+    if (previous) clearTimeout(previous.timer);
+
+    container.innerHTML = tracks.map((track, index) => `
+        <div class="waveform-track" data-index="${index}">
+            <div class="waveform-label">
+                <span>${escapeHtml(track.label)}</span>
+                <span class="waveform-scale"></span>
+            </div>
+            <canvas height="${WAVEFORM_HEIGHT}"></canvas>
+        </div>
+    `).join('');
+
+    const view = {
+        tracks: tracks.map((track, index) => ({
+            ...track,
+            element: container.querySelector(`.waveform-track[data-index="${index}"]`),
+            request: 0
+        })),
+        duration: null,
+        start: 0,
+        end: null,
+        timer: null
+    };
+    waveformViews.set(containerId, view);
+
+    container.onwheel = event => zoomWaveform(event, view);
+    container.onmousedown = event => panWaveform(event, view);
+    container.ondblclick = () => {
+        view.start = 0;
+        view.end = view.duration;
+        fetchWaveforms(view);
+    };
+
+    fetchWaveforms(view);
+}
+
+/**
+ * Lädt den aktuellen Ausschnitt aller Spuren (veraltete Antworten werden verworfen)
+ */
+function fetchWaveforms(view) {
+    view.tracks.forEach(track => {
+        const canvas = track.element.querySelector('canvas');
+        const width = Math.max(1, Math.round(canvas.clientWidth * (window.devicePixelRatio || 1)));
+        const params = new URLSearchParams({ track: track.track, start: view.start, width: width });
+        if (view.end !== null) params.set('end', view.end);
+
+        const request = ++track.request;
+        fetch(`/audio/${track.audioId}/peaks?${params}`)
+        .then(response => {
+            if (response.status === 404 && track.track === 'residual') {
+                // Kein Residuum (z.B. Original oder Upload): Spur ausblenden
+                track.element.style.display = 'none';
+                return null;
+            }
+            return response.json().then(data => {
+                if (!response.ok) throw new Error(data.error || 'Unbekannter Fehler');
+                return data;
+            });
+        })
+        .then(data => {
+            if (!data || request !== track.request) return;
+            if (view.duration === null) {
+                view.duration = data.duration;
+                view.end = data.duration;
+            }
+            track.element.style.display = 'block';
+            drawWaveform(canvas, data, WAVEFORM_COLORS[track.track]);
+            const scale = track.element.querySelector('.waveform-scale');
+            scale.textContent = track.track === 'residual'
+                ? `peak ${(20 * Math.log10(data.scale || 1e-9)).toFixed(1)} dBFS`
+                : `${data.start.toFixed(2)}–${data.end.toFixed(2)} s`;
+        })
+        .catch(error => {
+            track.element.querySelector('.waveform-scale').textContent = '❌ ' + error.message;
+        });
+    });
+}
+
+/**
+ * Zeichnet je Pixel eine Linie von min bis max (int16, 32767 = Vollaussteuerung bzw. scale)
+ */
+function drawWaveform(canvas, data, color) {
+    const ratio = window.devicePixelRatio || 1;
+    canvas.width = Math.max(1, Math.round(canvas.clientWidth * ratio));
+    canvas.height = WAVEFORM_HEIGHT * ratio;
+
+    const ctx = canvas.getContext('2d');
+    const middle = canvas.height / 2;
+    const step = canvas.width / Math.max(1, data.min.length);
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.fillStyle = color;
+
+    for (let i = 0; i < data.min.length; i++) {
+        const top = middle - (data.max[i] / 32767) * middle;
+        const bottom = middle - (data.min[i] / 32767) * middle;
+        ctx.fillRect(Math.floor(i * step), top, Math.max(1, Math.ceil(step)), Math.max(1, bottom - top));
+    }
+}
+
+/**
+ * Neu laden, sobald Zoom/Verschieben kurz ruht
+ */
+function scheduleWaveformFetch(view) {
+    clearTimeout(view.timer);
+    view.timer = setTimeout(() => fetchWaveforms(view), WAVEFORM_FETCH_DELAY_MS);
+}
+
+function zoomWaveform(event, view) {
+    if (view.duration === null) return;
+    event.preventDefault();
+
+    const rect = event.currentTarget.getBoundingClientRect();
+    const anchor = view.start + (view.end - view.start) * ((event.clientX - rect.left) / rect.width);
+    const factor = event.deltaY > 0 ? 1.25 : 0.8;
+    const span = Math.min(view.duration, Math.max(WAVEFORM_MIN_SPAN_S, (view.end - view.start) * factor));
+
+    view.start = Math.min(Math.max(0, anchor - (anchor - view.start) * span / (view.end - view.start)), view.duration - span);
+    view.end = view.start + span;
+    scheduleWaveformFetch(view);
+}
+
+function panWaveform(event, view) {
+    if (view.duration === null) return;
+    event.preventDefault();
+
+    const width = event.currentTarget.getBoundingClientRect().width;
+    const origin = { x: event.clientX, start: view.start, end: view.end };
+
+    const move = moveEvent => {
+        const span = origin.end - origin.start;
+        const shift = (origin.x - moveEvent.clientX) / width * span;
+        view.start = Math.min(Math.max(0, origin.start + shift), view.duration - span);
+        view.end = view.start + span;
+        scheduleWaveformFetch(view);
+    };
+    const stop = () => {
+        document.removeEventListener('mousemove', move);
+        document.removeEventListener('mouseup', stop);
+    };
+    document.addEventListener('mousemove', move);
+    document.addEventListener('mouseup', stop);
+}
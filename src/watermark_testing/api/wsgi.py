@@ -0,0 +1,46 @@
+"""
+Production-Einstiegspunkt für den Preforking-Server (Gunicorn).
+
+Wird dank preload_app=True genau einmal im Master-Prozess importiert:
+1. torch importieren, im Master auf einen Thread begrenzen und die inter-op
+   Threads setzen (nur vor der ersten parallelen Operation möglich, die
+   Worker erben den Wert)
+2. Flask-App laden (inkl. DB-Initialisierung)
+3. AudioSeal- und PerTh-Modelle vorladen
+4. Danach forkt Gunicorn die Worker, die sich die Gewichte copy-on-write teilen
+
+Schritte 1 und 3 nur mit PRELOAD_MODELS=1 (Standard). Bei 'background' lädt
+jeder Worker nach dem Fork im Hintergrund (siehe services/readiness.py und
+post_fork in gunicorn.conf.py), bei '0' erst der erste Request.
+
+Start:
+    gunicorn -c src/watermark_testing/api/gunicorn.conf.py
+"""
+import gc
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import readiness, runtime_config
+
+if readiness.PRELOAD_MODELS == '1':
+    import torch
+
+    # Im Master keinen OpenMP-Threadpool starten: der Pool ist nach fork()
+    # nicht nutzbar. Die Worker setzen ihre Thread-Anzahl im post_fork-Hook.
+    torch.set_num_threads(1)
+    # inter-op dagegen nur hier: nach dem Warm-up lehnt torch das ab, auch in den Workern
+    if not runtime_config.RuntimeConfig.from_env().apply_interop_threads():
+        print(f"⚠️ inter-op Threads nicht gesetzt: {runtime_config.effective_settings()['torch_inter_op']}")
+
+from app import app
+
+
+if readiness.PRELOAD_MODELS == '1':
+    model_status = readiness.warm_up()
+    print(f"✓ Modelle im Master vorgeladen: {model_status}")
+
+# Alle bisher erzeugten Objekte aus der Garbage Collection nehmen,
+# damit GC-Läufe in den Workern die geteilten Seiten nicht anfassen (CoW).
+gc.freeze()
@@ -0,0 +1,6 @@
+"""
+Benchmarks für die Watermark-Testanwendung.
+Alle Skripte laufen aus dem Ordner src/watermark_testing:
+
+    python -m benchmarks.<modul> --help
+"""
@@ -0,0 +1,188 @@
+"""
+Gemeinsame Hilfsfunktionen für Benchmarks:
+Test-Audio erzeugen, HTTP-Requests ohne Zusatz-Abhängigkeiten,
+Server-Prozesse starten und Speicher pro Prozess auslesen.
+"""
+import http.client
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Ordner src/watermark_testing (Basis für alle absoluten Imports)
+PACKAGE_ROOT = Path(__file__).parent.parent
+API_DIR = PACKAGE_ROOT / 'api'
+
+
+# ==========================================
+# TEST-AUDIO
+# ==========================================
+def make_test_wav(duration: float = 3.0, sample_rate: int = 16000, seed: int = 0) -> bytes:
+    """
+    Erzeugt ein 16-bit Mono-WAV mit Ton + leisem Rauschen.
+
+    Args:
+        duration: Länge in Sekunden
+        sample_rate: Sample-Rate in Hz
+        seed: Seed für reproduzierbares Rauschen
+
+    Returns:
+        WAV-Datei als Bytes
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.01 * rng.standard_normal(t.shape)
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype('<i2')
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+# ==========================================
+# HTTP
+# ==========================================
+def encode_multipart(fields: Dict[str, str], files: Dict[str, Tuple[str, bytes]]) -> Tuple[bytes, str]:
+    """
+    Baut einen multipart/form-data Body.
+
+    Args:
+        fields: Formularfelder (Name -> Wert)
+        files: Dateien (Feldname -> (Dateiname, Inhalt))
+
+    Returns:
+        Tuple (body, content_type)
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def http_request(url: str, method: str = 'GET', body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None, timeout: float = 600) -> Tuple[int, bytes]:
+    """
+    Führt einen HTTP-Request aus.
+
+    Returns:
+        Tuple (status_code, response_body) - Status 0 bei Verbindungsfehler
+    """
+    req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+    except (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError):
+        return 0, b''
+
+
+def wait_for_server(base_url: str, timeout: float = 300) -> None:
+    """Wartet bis /health antwortet"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status, _ = http_request(f'{base_url}/health', timeout=2)
+        if status == 200:
+            return
+        time.sleep(0.5)
+    raise TimeoutError(f'Server unter {base_url} nicht erreichbar')
+
+
+# ==========================================
+# SERVER-PROZESSE
+# ==========================================
+def start_server(mode: str, port: int, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """
+    Startet die API als Subprozess.
+
+    Args:
+        mode: 'dev' (Flask-Dev-Server) oder 'prod' (Gunicorn, Preforking)
+        port: Port
+        env: Zusätzliche Umgebungsvariablen
+    """
+    process_env = {**os.environ, 'PORT': str(port), 'PYTHONUNBUFFERED': '1', **(env or {})}
+
+    if mode == 'dev':
+        # Wie `python app.py`: Modelle im Hintergrund aufwärmen (außer PRELOAD_MODELS=0)
+        cmd = [sys.executable, '-c',
+               'from app import app; from services import readiness; '
+               'readiness.PRELOAD_MODELS == "0" or readiness.start_background_warm_up(); '
+               f'app.run(host="127.0.0.1", port={port}, threaded=True)']
+    elif mode == 'prod':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', str(API_DIR / 'gunicorn.conf.py')]
+    else:
+        raise ValueError(f"Unbekannter Server-Modus: '{mode}'")
+
+    return subprocess.Popen(cmd, cwd=API_DIR, env=process_env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Beendet den Server-Prozess (inkl. Worker)"""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direkte Kindprozesse (Linux, /proc)"""
+    children = []
+    task_dir = Path(f'/proc/{pid}/task')
+    for task in task_dir.glob('*'):
+        try:
+            children.extend(int(c) for c in (task / 'children').read_text().split())
+        except OSError:
+            continue
+    return children
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    """
+    Speicher eines Prozesses in Bytes (Linux).
+    RSS zählt geteilte Seiten voll, PSS anteilig - PSS zeigt daher
+    den Effekt der copy-on-write geteilten Modellgewichte.
+    """
+    memory = {'rss_bytes': 0, 'pss_bytes': 0}
+    try:
+        for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines():
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                memory[f'{key.lower()}_bytes'] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return memory
+
+
+def write_results(results, output: Optional[str]) -> None:
+    """Gibt Ergebnisse als JSON aus (stdout oder Datei)"""
+    text = json.dumps(results, indent=2)
+    if output:
+        Path(output).write_text(text)
+        print(f'✓ Ergebnisse gespeichert: {output}')
+    else:
+        print(text)
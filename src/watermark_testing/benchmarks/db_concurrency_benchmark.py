@@ -0,0 +1,138 @@
+"""
+Concurrent-Write-Benchmark für die DB-Profile.
+
+Mehrere Prozesse (wie Gunicorn-Worker) schreiben gleichzeitig Zeilen mit
+je einem Commit pro Zeile, parallel liest ein Prozess Listen-Seiten.
+Gemessen werden Zeilen/s, Lese-Queries/s und Lock-Fehler.
+
+Profile:
+    sqlite_default  SQLite mit Standard-Journaling (Rollback-Journal)
+    sqlite_wal      SQLite mit WAL/synchronous=NORMAL/busy_timeout
+    postgresql      nur mit --postgresql-url
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.db_concurrency_benchmark --writers 4 --rows 500
+    python -m benchmarks.db_concurrency_benchmark --postgresql-url postgresql+psycopg2://user:pw@localhost/bench
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import write_results
+from database.database import create_db_engine
+from database.models import Base
+from database.repositories import AudioFileRepository
+
+
+def writer(url: str, sqlite_tuning: bool, rows: int, worker: int, results) -> None:
+    """Schreibt `rows` Zeilen mit je einem Commit"""
+    engine = create_db_engine(url, sqlite_tuning=sqlite_tuning)
+    db = sessionmaker(bind=engine, expire_on_commit=False)()
+    repo = AudioFileRepository(db)
+    errors = 0
+    for i in range(rows):
+        try:
+            repo.create(user_id=1, filename=f'w{worker}_{i}.wav', file_path=f'/tmp/w{worker}_{i}.wav',
+                        file_size=1000, sample_rate=44100, duration=3.0)
+        except Exception:
+            db.rollback()
+            errors += 1
+    db.close()
+    engine.dispose()
+    results.put(('write', rows - errors, errors))
+
+
+def reader(url: str, sqlite_tuning: bool, stop, results) -> None:
+    """Liest Listen-Seiten bis zum Stop-Signal"""
+    engine = create_db_engine(url, sqlite_tuning=sqlite_tuning)
+    db = sessionmaker(bind=engine)()
+    repo = AudioFileRepository(db)
+    queries = errors = 0
+    while not stop.is_set():
+        try:
+            repo.list_page(1, limit=50)
+            queries += 1
+        except Exception:
+            db.rollback()
+            errors += 1
+        db.rollback()  # Snapshot freigeben
+    db.close()
+    engine.dispose()
+    results.put(('read', queries, errors))
+
+
+def run_profile(name: str, url: str, sqlite_tuning: bool, args) -> dict:
+    engine = create_db_engine(url, sqlite_tuning=sqlite_tuning)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    read_process = multiprocessing.Process(target=reader, args=(url, sqlite_tuning, stop, results))
+    writers = [
+        multiprocessing.Process(target=writer, args=(url, sqlite_tuning, args.rows, w, results))
+        for w in range(args.writers)
+    ]
+
+    read_process.start()
+    start = time.perf_counter()
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    read_process.join()
+
+    totals = {'write': [0, 0], 'read': [0, 0]}
+    for _ in range(args.writers + 1):
+        kind, ok, errors = results.get()
+        totals[kind][0] += ok
+        totals[kind][1] += errors
+
+    return {
+        'profile': name,
+        'writers': args.writers,
+        'elapsed_s': elapsed,
+        'rows_written': totals['write'][0],
+        'write_errors': totals['write'][1],
+        'rows_per_s': totals['write'][0] / elapsed,
+        'read_queries_per_s': totals['read'][0] / elapsed,
+        'read_errors': totals['read'][1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=4, help='Parallele Schreib-Prozesse')
+    parser.add_argument('--rows', type=int, default=500, help='Zeilen pro Schreib-Prozess')
+    parser.add_argument('--postgresql-url', help='Zusätzlich gegen diese PostgreSQL-DB messen')
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        profiles = [
+            ('sqlite_default', f"sqlite:///{os.path.join(tmp, 'default.db')}", False),
+            ('sqlite_wal', f"sqlite:///{os.path.join(tmp, 'wal.db')}", True),
+        ]
+        if args.postgresql_url:
+            profiles.append(('postgresql', args.postgresql_url, True))
+
+        for name, url, sqlite_tuning in profiles:
+            result = run_profile(name, url, sqlite_tuning, args)
+            results.append(result)
+            print(f"{name:15s} {result['rows_per_s']:8.0f} rows/s  "
+                  f"{result['read_queries_per_s']:8.0f} reads/s  "
+                  f"Fehler: {result['write_errors'] + result['read_errors']}")
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Misst Insert-Durchsatz (Zeilen/s) der Repositories auf einer temporären DB.
+
+Varianten:
+    commit_refresh  alter Stand: commit() + refresh() pro Zeile
+    create          create() pro Zeile (commit, ohne refresh)
+    unit_of_work    create() pro Zeile innerhalb einer Unit of Work (ein Commit)
+    create_many     create_many() in Batches
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.db_insert_benchmark --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import write_results
+from database.models import Base, AudioFile
+from database.repositories import AudioFileRepository
+from database.unit_of_work import unit_of_work
+
+
+def row(i: int) -> dict:
+    return {
+        'user_id': 1, 'filename': f'file{i}.wav', 'file_path': f'/app/uploads/file{i}.wav',
+        'file_size': 1000, 'sample_rate': 44100, 'duration': 3.0,
+        'has_watermark': False, 'watermark_type': None
+    }
+
+
+def insert_commit_refresh(db, rows: int, batch_size: int) -> None:
+    for i in range(rows):
+        audio = AudioFile(**row(i))
+        db.add(audio)
+        db.commit()
+        db.refresh(audio)
+
+
+def insert_create(db, rows: int, batch_size: int) -> None:
+    repo = AudioFileRepository(db)
+    for i in range(rows):
+        repo.create(**row(i))
+
+
+def insert_unit_of_work(db, rows: int, batch_size: int) -> None:
+    repo = AudioFileRepository(db)
+    with unit_of_work(db):
+        for i in range(rows):
+            repo.create(**row(i))
+
+
+def insert_create_many(db, rows: int, batch_size: int) -> None:
+    repo = AudioFileRepository(db)
+    for offset in range(0, rows, batch_size):
+        repo.create_many([row(i) for i in range(offset, min(rows, offset + batch_size))])
+
+
+VARIANTS = {
+    'commit_refresh': insert_commit_refresh,
+    'create': insert_create,
+    'unit_of_work': insert_unit_of_work,
+    'create_many': insert_create_many,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--database-url', help='Ziel-DB (Standard: temporäre SQLite-Datei)')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.variants:
+            url = args.database_url or f"sqlite:///{os.path.join(tmp, f'{name}.db')}"
+            engine = create_engine(url)
+            Base.metadata.drop_all(bind=engine)
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(bind=engine, expire_on_commit=False)()
+
+            start = time.perf_counter()
+            try:
+                VARIANTS[name](db, args.rows, args.batch_size)
+            finally:
+                db.close()
+            elapsed = time.perf_counter() - start
+
+            results.append({'variant': name, 'rows': args.rows, 'elapsed_s': elapsed,
+                            'rows_per_s': args.rows / elapsed})
+            print(f"{name:15s} {args.rows / elapsed:10.0f} rows/s")
+            engine.dispose()
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Lasttest der API mit einem Mix aus Endpoints und Clip-Längen.
+
+Startet einen lokalen Server (Standard: Gunicorn mit Stand-in-Modellen, eigene
+SQLite-DB und Upload-Ordner im Temp-Verzeichnis - kein Netzwerk, keine GPU)
+oder testet gegen --url. Last in Stufen:
+
+    closed  feste Anzahl paralleler Clients, jeder schickt Request auf Request
+            (--concurrency 1 4 8)
+    open    Poisson-Ankünfte mit fester Rate, unabhängig von den Antworten
+            (--rates 2 5 10). Die Latenz zählt ab dem geplanten Sendezeitpunkt,
+            Wartezeit bei Überlast geht also mit ein (kein coordinated omission).
+
+Pro Stufe: Durchsatz, Fehlerrate und p50/p95/p99-Latenz gesamt, pro Endpoint und
+pro Clip-Länge (zeigt, ob kurze Clips unter gemischter Last schnell bleiben).
+Die Stufen zusammen ergeben die Durchsatzkurve (Latenz über Last).
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.load_test --load open --rates 2 5 10 --step-seconds 30
+    python -m benchmarks.load_test --mix upload=1 embed=1 detect=3 manipulate=1 \\
+        --clips 1:0.6 10:0.3 60:0.1 --concurrency 1 4 8 --output load.json
+"""
+import argparse
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import soundfile as sf
+
+from benchmarks.common import encode_multipart, http_request, start_server, stop_server, wait_for_server, write_results
+from benchmarks.signals import speech_like
+
+# Parameter für /manipulation/apply (wie vom Frontend gesendet)
+MANIPULATIONS = {
+    'noise': {'snr': 20},
+    'gain': {'gain_db': 6},
+    'lowpass': {'cutoff': 3000},
+    'timestretch': {'rate': 1.2},
+}
+
+ENDPOINTS = {
+    'upload': '/upload',
+    'embed': '/watermark/embed',
+    'detect': '/watermark/detect',
+    'manipulate': '/manipulation/apply',
+}
+
+
+# ==========================================
+# REQUEST-MIX
+# ==========================================
+def parse_weights(items: List[str], cast=str) -> Dict:
+    """'name=gewicht' bzw. 'name:gewicht' -> {name: gewicht}"""
+    weights = {}
+    for item in items:
+        name, _, weight = item.replace(':', '=').partition('=')
+        weights[cast(name)] = float(weight or 1)
+    return weights
+
+
+def speech_wav(duration: float, sample_rate: int) -> bytes:
+    """Sprachähnliches 16-bit-WAV als Bytes"""
+    buffer = io.BytesIO()
+    sf.write(buffer, speech_like(duration, sample_rate), sample_rate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+class RequestMix:
+    """Zieht zufällige Requests (Endpoint, Clip-Länge) nach Gewichten; Bodies werden vorab erzeugt"""
+
+    def __init__(self, endpoints: Dict[str, float], clips: Dict[float, float], method: str,
+                 manipulations: List[str], sample_rate: int, seed: int = 0):
+        self.endpoints = endpoints
+        self.clips = clips
+        self.method = method
+        self.manipulations = manipulations
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self.audio = {duration: speech_wav(duration, sample_rate) for duration in clips}
+
+    def next(self) -> Tuple[str, float, str, bytes, Dict[str, str]]:
+        """
+        Gibt (endpoint, clip_sekunden, pfad, body, headers) zurück.
+        Jeder Request bekommt einen eigenen Dateinamen - die API legt Uploads
+        unter dem Client-Dateinamen ab, gleichnamige parallele Uploads würden
+        sich gegenseitig überschreiben.
+        """
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+            endpoint = self.random.choices(list(self.endpoints), weights=list(self.endpoints.values()))[0]
+            duration = self.random.choices(list(self.clips), weights=list(self.clips.values()))[0]
+            manipulation = self.random.choice(self.manipulations)
+
+        fields = {'method': self.method}
+        if endpoint == 'manipulate':
+            fields = {'manipulation_type': manipulation, 'parameters': json.dumps(MANIPULATIONS[manipulation])}
+        body, content_type = encode_multipart(
+            fields, {'audio': (f'load_{counter}_{duration:g}s.wav', self.audio[duration])}
+        )
+        return endpoint, duration, ENDPOINTS[endpoint], body, {'Content-Type': content_type}
+
+
+# ==========================================
+# LASTERZEUGUNG
+# ==========================================
+def send(base_url: str, request, scheduled: float) -> Dict:
+    endpoint, duration, path, body, headers = request
+    status, _ = http_request(base_url + path, 'POST', body, headers)
+    return {'endpoint': endpoint, 'clip_s': duration, 'status': status,
+            'latency_s': time.perf_counter() - scheduled}
+
+
+def run_closed(base_url: str, mix: RequestMix, concurrency: int, seconds: float) -> List[Dict]:
+    """`concurrency` Clients schicken für `seconds` Sekunden Request auf Request"""
+    deadline = time.perf_counter() + seconds
+
+    def client(_):
+        samples = []
+        while time.perf_counter() < deadline:
+            samples.append(send(base_url, mix.next(), time.perf_counter()))
+        return samples
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [sample for samples in pool.map(client, range(concurrency)) for sample in samples]
+
+
+def run_open(base_url: str, mix: RequestMix, rate: float, seconds: float, max_inflight: int,
+             seed: int = 0) -> List[Dict]:
+    """Poisson-Ankünfte mit `rate` Requests/s für `seconds` Sekunden"""
+    arrivals = random.Random(seed)
+    start = time.perf_counter()
+    scheduled = start
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        while True:
+            scheduled += arrivals.expovariate(rate)
+            if scheduled - start > seconds:
+                break
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            futures.append(pool.submit(send, base_url, mix.next(), scheduled))
+        return [future.result() for future in futures]
+
+
+# ==========================================
+# AUSWERTUNG
+# ==========================================
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank-Perzentil (q in 0-100)"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    latencies = sorted(s['latency_s'] for s in samples if s['status'] == 200)
+    errors = sum(1 for s in samples if s['status'] != 200)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'throughput_rps': len(latencies) / elapsed,
+        'latency_p50_s': percentile(latencies, 50),
+        'latency_p95_s': percentile(latencies, 95),
+        'latency_p99_s': percentile(latencies, 99),
+        'latency_max_s': latencies[-1] if latencies else None,
+    }
+
+
+def run_step(base_url: str, mix: RequestMix, load: str, level: float, args) -> Dict:
+    start = time.perf_counter()
+    if load == 'closed':
+        samples = run_closed(base_url, mix, int(level), args.step_seconds)
+    else:
+        samples = run_open(base_url, mix, level, args.step_seconds, args.max_inflight, args.seed)
+    elapsed = time.perf_counter() - start
+
+    status_counts = {}
+    for sample in samples:
+        status_counts[str(sample['status'])] = status_counts.get(str(sample['status']), 0) + 1
+
+    step = {
+        'load': load,
+        'concurrency' if load == 'closed' else 'offered_rps': level,
+        'elapsed_s': elapsed,
+        **summarize(samples, elapsed),
+        'status_counts': status_counts,
+        'endpoints': {
+            endpoint: summarize([s for s in samples if s['endpoint'] == endpoint], elapsed)
+            for endpoint in mix.endpoints
+        },
+        'clips': {
+            f'{duration:g}s': summarize([s for s in samples if s['clip_s'] == duration], elapsed)
+            for duration in mix.clips
+        },
+    }
+    p95 = step['latency_p95_s']
+    print(f"{load:6s} {level:6g}  {step['throughput_rps']:7.2f} req/s  "
+          f"p50 {fmt_ms(step['latency_p50_s'])}  p95 {fmt_ms(p95)}  p99 {fmt_ms(step['latency_p99_s'])}  "
+          f"Fehler {step['error_rate']:6.1%}  {status_counts}")
+    for clip, summary in step['clips'].items():
+        print(f"       Clip {clip:>6s}  p50 {fmt_ms(summary['latency_p50_s'])}  "
+              f"p95 {fmt_ms(summary['latency_p95_s'])}  Fehler {summary['error_rate']:6.1%}")
+    return step
+
+
+def fmt_ms(value: Optional[float]) -> str:
+    return f"{value * 1000:8.1f} ms" if value is not None else '       - ms'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Bestehenden Server testen statt lokal zu starten')
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='prod', help='Lokaler Server-Modus')
+    parser.add_argument('--workers', type=int, default=2, help='Worker-Prozesse im prod-Modus')
+    parser.add_argument('--models', choices=['stand-in', 'real'], default='stand-in')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--load', choices=['closed', 'open'], default='closed')
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 2, 4, 8], help='Stufen (closed)')
+    parser.add_argument('--rates', nargs='+', type=float, default=[1, 2, 5, 10], help='Requests/s-Stufen (open)')
+    parser.add_argument('--max-inflight', type=int, default=64, help='Obergrenze paralleler Requests (open)')
+    parser.add_argument('--step-seconds', type=float, default=20)
+    parser.add_argument('--mix', nargs='+', default=['upload=1', 'embed=1', 'detect=2', 'manipulate=1'],
+                        help='Endpoint-Gewichte (upload, embed, detect, manipulate)')
+    parser.add_argument('--clips', nargs='+', default=['1:0.5', '10:0.4', '60:0.1'],
+                        help='Clip-Längen in Sekunden mit Gewicht')
+    parser.add_argument('--sample-rate', type=int, default=16000)
+    parser.add_argument('--method', default='audioseal', help='Watermarking-Methode')
+    parser.add_argument('--manipulations', nargs='+', default=['noise', 'lowpass'], choices=list(MANIPULATIONS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    endpoints = parse_weights(args.mix)
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unbekannte Endpoints: {', '.join(sorted(unknown))}")
+
+    mix = RequestMix(endpoints, parse_weights(args.clips, float), args.method,
+                     args.manipulations, args.sample_rate, args.seed)
+    levels = args.concurrency if args.load == 'closed' else args.rates
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        base_url = args.url
+        if base_url is None:
+            env = {
+                'WEB_CONCURRENCY': str(args.workers),
+                'WATERMARK_STAND_IN_MODELS': '1' if args.models == 'stand-in' else '0',
+                'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'load_test.db')}",
+                'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+                'PROFILE_FOLDER': os.path.join(tmp, 'profiles'),
+            }
+            os.makedirs(env['UPLOAD_FOLDER'])
+            process = start_server(args.mode, args.port, env)
+            base_url = f'http://127.0.0.1:{args.port}'
+
+        try:
+            wait_for_server(base_url)
+            # Aufwärmen: erste Requests laden Modelle/Caches
+            run_closed(base_url, mix, 1, min(5.0, args.step_seconds))
+            steps = [run_step(base_url, mix, args.load, level, args) for level in levels]
+        finally:
+            if process is not None:
+                stop_server(process)
+
+    write_results({
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'steps': steps,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+"""
+Benchmark der Manipulationen (Attacken) aus AudioManipulationService.
+
+Misst jede Manipulation über ein Parameter-Grid und mehrere Signal-Längen,
+getrennt nach:
+    decode      librosa.load der Eingabe (einmal pro Signal-Länge)
+    compute     reine Berechnung auf dem dekodierten Signal (*_array-Methoden)
+    encode      sf.write des Ergebnisses als WAV
+    end_to_end  Datei-Methode wie in der API (decode + compute + encode)
+
+Für compute werden zusätzlich die Allokationen erfasst (tracemalloc-Peak und
+nach dem Lauf noch gehaltene Bytes, auch als Vielfaches der Signalgröße).
+Am Ende steht der Anteil jeder Manipulation an der Gesamtzeit des Grids -
+also welche Attacken einen Robustness-Lauf dominieren.
+
+Baselines (maschinenabhängig, pro Rechner erzeugen):
+    python -m benchmarks.manipulation_benchmark run --save-baseline
+    python -m benchmarks.manipulation_benchmark compare --tolerance 0.25
+
+`compare` führt dasselbe Grid wie die Baseline erneut aus (oder liest
+`--results`) und endet mit Exit-Code 1, wenn compute/end_to_end-Zeit oder
+Allokations-Peak eines Falls um mehr als die Toleranz schlechter sind.
+Fälle mit fehlender Abhängigkeit (ffmpeg/pydub, pyrubberband/resampy)
+werden übersprungen.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import librosa
+import soundfile as sf
+
+from benchmarks.common import PACKAGE_ROOT, write_results
+from benchmarks.signals import write_speech_like
+from services.audio_manipulation_service import AudioManipulationService as Service
+
+DEFAULT_BASELINE = PACKAGE_ROOT / 'benchmarks' / 'baselines' / 'manipulation.json'
+
+# Manipulationstyp -> (Parametername, Grid, Datei-Methode, Compute-Funktion(audio, sr, wert))
+CASES = {
+    'noise': ('snr_db', [5, 20, 40], Service.add_noise,
+              lambda audio, sr, value: Service.add_noise_array(audio, value)),
+    'compression': ('bitrate', [64, 128, 320], Service.apply_compression,
+                    Service.apply_compression_array),
+    'gain': ('gain_db', [-6, 6], Service.apply_gain,
+             lambda audio, sr, value: Service.apply_gain_array(audio, value)),
+    'resample': ('target_sr', [8000, 16000, 22050], Service.resample_audio, Service.resample_array),
+    'lowpass': ('cutoff', [1000, 3000, 8000], Service.apply_lowpass, Service.apply_lowpass_array),
+    'highpass': ('cutoff', [100, 300, 1000], Service.apply_highpass, Service.apply_highpass_array),
+    'timestretch': ('rate', [0.8, 1.2], Service.time_stretch,
+                    lambda audio, sr, value: Service.time_stretch_array(audio, value)),
+    'pitchshift': ('n_steps', [-2, 2], Service.pitch_shift, Service.pitch_shift_array),
+}
+
+# Verglichene Messwerte: (Operation, Feld) - Minimum statt Median, da weniger anfällig für Störungen
+COMPARED = [('compute', 'min_s'), ('compute', 'peak_bytes'), ('end_to_end', 'min_s')]
+
+
+# ==========================================
+# MESSUNG
+# ==========================================
+def time_repeats(func, repeats: int) -> Dict[str, float]:
+    """Führt func einmal zum Aufwärmen und dann `repeats`-mal gemessen aus"""
+    func()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(latencies), 'min_s': min(latencies), 'max_s': max(latencies)}
+
+
+def allocations(func) -> Dict[str, int]:
+    """tracemalloc-Peak und nach dem Lauf noch gehaltene Bytes (ohne das Ergebnis)"""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'peak_bytes': peak, 'retained_bytes': retained}
+
+
+def case_key(row: Dict) -> str:
+    """Eindeutiger Schlüssel eines Falls (für Baseline-Vergleich)"""
+    if row['operation'] == 'decode':
+        return f"decode@{row['duration_s']:g}s/{row['sample_rate']}"
+    return (f"{row['manipulation_type']}[{row['parameter']}={row['value']:g}]"
+            f"@{row['duration_s']:g}s/{row['sample_rate']}")
+
+
+def benchmark_signal(input_path: str, tmp: str, duration: float, sample_rate: int,
+                     types: List[str], repeats: int) -> List[Dict]:
+    """Alle Manipulationen des Grids auf einer Eingabedatei"""
+    base = {'duration_s': duration, 'sample_rate': sample_rate}
+    rows = [{**base, 'operation': 'decode', **time_repeats(lambda: librosa.load(input_path, sr=None), repeats)}]
+
+    audio, sr = librosa.load(input_path, sr=None)
+    decoded_bytes = audio.nbytes
+    output_path = os.path.join(tmp, 'output.wav')
+
+    for manipulation_type in types:
+        parameter, values, file_method, compute = CASES[manipulation_type]
+        for value in values:
+            case = {**base, 'manipulation_type': manipulation_type, 'parameter': parameter, 'value': value}
+            try:
+                compute_timing = time_repeats(lambda: compute(audio, sr, value), repeats)
+            except ImportError as e:
+                print(f"- {manipulation_type}: übersprungen ({e.name or str(e).splitlines()[0]})")
+                break
+
+            memory = allocations(lambda: compute(audio, sr, value))
+            memory['peak_factor'] = round(memory['peak_bytes'] / decoded_bytes, 2)
+
+            result = compute(audio, sr, value)
+            output_sr = value if manipulation_type == 'resample' else sr
+            encode_timing = time_repeats(lambda: sf.write(output_path, result, output_sr), repeats)
+
+            file_output = os.path.join(tmp, 'output.mp3' if manipulation_type == 'compression' else 'output.wav')
+            end_to_end = time_repeats(lambda: file_method(input_path, file_output, value), repeats)
+
+            rows.append({**case, 'operation': 'compute', **compute_timing, **memory})
+            rows.append({**case, 'operation': 'encode', **encode_timing})
+            rows.append({**case, 'operation': 'end_to_end', **end_to_end})
+
+            print(f"{manipulation_type:12s} {f'{parameter}={value:g}':16s} {duration:6g} s  "
+                  f"compute {compute_timing['median_s'] * 1000:9.1f} ms  "
+                  f"encode {encode_timing['median_s'] * 1000:7.1f} ms  "
+                  f"gesamt {end_to_end['median_s'] * 1000:9.1f} ms  "
+                  f"peak {memory['peak_bytes'] / 2 ** 20:7.1f} MB ({memory['peak_factor']:.1f}x)")
+    return rows
+
+
+def run(config: Dict) -> Dict:
+    """Führt das Grid aus; liefert {'config': ..., 'results': [...]}"""
+    # Erster librosa.load() importiert/cached Module - nicht mitmessen
+    with tempfile.TemporaryDirectory() as tmp:
+        warmup_path = write_speech_like(os.path.join(tmp, 'warmup'), 0.5, config['sample_rate'])
+        librosa.load(warmup_path, sr=None)
+
+        results = []
+        for duration in config['durations']:
+            input_path = write_speech_like(os.path.join(tmp, f'speech_{duration:g}'),
+                                           duration, config['sample_rate'])
+            results += benchmark_signal(input_path, tmp, duration, config['sample_rate'],
+                                        config['types'], config['repeats'])
+            os.remove(input_path)
+
+    for row in results:
+        row['case'] = case_key(row)
+    print_shares(results)
+    return {'config': config, 'results': results}
+
+
+def print_shares(results: List[Dict]) -> None:
+    """Anteil jeder Manipulation an der End-to-End-Zeit des ganzen Grids"""
+    totals = {}
+    for row in results:
+        if row['operation'] == 'end_to_end':
+            totals[row['manipulation_type']] = totals.get(row['manipulation_type'], 0) + row['median_s']
+    overall = sum(totals.values()) or 1
+    print("\nAnteil an der Gesamtzeit:")
+    for manipulation_type, total in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"  {manipulation_type:12s} {total:8.2f} s  {100 * total / overall:5.1f} %")
+
+
+# ==========================================
+# BASELINE-VERGLEICH
+# ==========================================
+def compare(baseline: Dict, current: Dict, tolerance: float, min_delta_ms: float) -> bool:
+    """
+    Vergleicht aktuelle Ergebnisse mit der Baseline.
+
+    Args:
+        tolerance: Erlaubte relative Verschlechterung (0.25 = +25 %)
+        min_delta_ms: Zeit-Abweichungen darunter zählen nie als Regression (Messrauschen)
+
+    Returns:
+        bool: True, wenn kein Fall die Toleranz überschreitet
+    """
+    current_rows = {(row['case'], row['operation']): row for row in current['results']}
+    all_ok = True
+
+    for old in baseline['results']:
+        for operation, field in COMPARED:
+            if old['operation'] != operation:
+                continue
+            new = current_rows.get((old['case'], operation))
+            if new is None:
+                print(f"- {old['case']} {operation}: fehlt in den aktuellen Ergebnissen")
+                continue
+
+            ratio = new[field] / old[field] if old[field] else 1.0
+            regression = ratio > 1 + tolerance
+            if field.endswith('_s') and (new[field] - old[field]) * 1000 < min_delta_ms:
+                regression = False
+            all_ok &= not regression
+            if regression or ratio < 1 - tolerance:
+                print(f"{'✗' if regression else '✓'} {old['case']:40s} {operation:10s} {field:10s} "
+                      f"{old[field]:.4g} -> {new[field]:.4g} ({ratio:.2f}x)")
+    return all_ok
+
+
+def load_json(path) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Grid ausführen')
+    run_parser.add_argument('--types', nargs='+', default=list(CASES), choices=list(CASES))
+    run_parser.add_argument('--durations', nargs='+', type=float, default=[1, 10, 60])
+    run_parser.add_argument('--sample-rate', type=int, default=44100)
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--output', help='JSON-Ausgabedatei')
+    run_parser.add_argument('--save-baseline', nargs='?', const=str(DEFAULT_BASELINE),
+                            help=f'Ergebnis als Baseline speichern (Standard: {DEFAULT_BASELINE})')
+
+    compare_parser = commands.add_parser('compare', help='Gegen Baseline prüfen')
+    compare_parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    compare_parser.add_argument('--results', help='Vorhandene Ergebnisse statt neuem Lauf')
+    compare_parser.add_argument('--tolerance', type=float, default=0.25)
+    compare_parser.add_argument('--min-delta-ms', type=float, default=2.0)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        config = {'types': args.types, 'durations': args.durations,
+                  'sample_rate': args.sample_rate, 'repeats': args.repeats}
+        current = run(config)
+        if args.save_baseline:
+            os.makedirs(os.path.dirname(args.save_baseline), exist_ok=True)
+            write_results(current, args.save_baseline)
+        if args.output or not args.save_baseline:
+            write_results(current, args.output)
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"✗ Keine Baseline unter {args.baseline} - zuerst 'run --save-baseline'")
+        sys.exit(2)
+    baseline = load_json(args.baseline)
+    current = load_json(args.results) if args.results else run(baseline['config'])
+
+    print(f"\nVergleich mit {args.baseline} (Toleranz {args.tolerance:.0%}):")
+    all_ok = compare(baseline, current, args.tolerance, args.min_delta_ms)
+    print("\n✓ Keine Regression" if all_ok else "\n✗ Regression über der Toleranz")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Regressions-Check: Speicher-Peak pro Stage relativ zur dekodierten Signalgröße.
+
+Erzeugt ein Test-WAV, führt Metadaten-Extraktion, alle Manipulationen (ohne
+'compression', braucht ffmpeg) und - falls installiert - Embed/Detect der
+Watermarking-Methoden mit MEMORY_TRACKING aus. Jede Stage muss mit ihrem
+tracemalloc-Peak unter `--max-factor` x dekodierter Größe (float32, native
+Sample-Rate) plus `--allowance-mb` bleiben, sonst Exit-Code 1. Die feste
+Zugabe deckt längenunabhängige Puffer (FFT-Fenster, Filter-Koeffizienten,
+Resampling-Kernel) ab, damit das Ergebnis nicht von der Clip-Länge abhängt.
+STFT-basierte Manipulationen haben ein eigenes Limit (CASE_FACTORS).
+
+Als Test läuft der Check in tests/test_memory.py ohne Zugabe (--allowance-mb 0)
+auf einem 120-s-Clip, sodass dort allein die Faktoren entscheiden.
+
+Usage (aus src/watermark_testing):
+    python -m benchmarks.memory_check --duration 60
+    python -m benchmarks.memory_check --sample-rate 16000 --max-factor 6 --output memory.json
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+# Muss vor dem ersten Import von services.metrics gesetzt sein
+os.environ['METRICS_ENABLED'] = '1'
+os.environ['MEMORY_TRACKING'] = '1'
+
+import librosa
+
+from benchmarks.common import make_test_wav, write_results
+from services import metrics
+from services.audio_manipulation_service import AudioManipulationService
+from services.audio_service import AudioService
+from services.watermark_strategy import WatermarkStrategyFactory
+
+# Parameter je Manipulation (wie vom Frontend gesendet)
+MANIPULATIONS = {
+    'noise': {'snr': 20},
+    'gain': {'gain_db': 6},
+    'resample': {'sample_rate': 16000},
+    'lowpass': {'cutoff': 3000},
+    'highpass': {'cutoff': 300},
+    'timestretch': {'rate': 1.2},
+    'pitchshift': {'steps': 2},
+}
+
+# Phase-Vocoder (STFT + ISTFT): mehrere komplexe Spektrogramme sind unvermeidlich.
+# Gemessen (timestretch, 44.1 kHz): ~12.7x Signalgröße plus ~17 MB fest
+CASE_FACTORS = {
+    'manipulation:timestretch': 16.0,
+    'manipulation:pitchshift': 16.0,
+}
+
+# Feste Zugabe pro Stage (MB), unabhängig von der Signallänge
+DEFAULT_ALLOWANCE_MB = 32.0
+
+
+def run_case(name: str, func) -> list:
+    """Führt einen Fall aus und liefert den Speicher-Report pro Stage ([] bei fehlender Abhängigkeit)"""
+    with metrics.memory_report() as report:
+        try:
+            func()
+        except ImportError as e:
+            print(f"- {name}: übersprungen ({e.name or str(e).splitlines()[0]})")
+            return []
+    return [{'case': name, 'stages': report}]
+
+
+def check(results: list, decoded_bytes: int, max_factor: float, allowance_bytes: int) -> bool:
+    """Limit pro Stage: Faktor x dekodierte Größe + feste Zugabe"""
+    all_ok = True
+    for result in results:
+        limit = CASE_FACTORS.get(result['case'], max_factor) * decoded_bytes + allowance_bytes
+        for stage, values in result['stages'].items():
+            factor = values['peak_bytes'] / decoded_bytes
+            values['factor'] = round(factor, 2)
+            values['limit_bytes'] = int(limit)
+            ok = values['peak_bytes'] <= limit
+            all_ok &= ok
+            print(f"{'✓' if ok else '✗'} {result['case']:22s} {stage:12s} "
+                  f"peak {values['peak_bytes'] / 2 ** 20:8.1f} MB  ({factor:5.2f}x, "
+                  f"Limit {limit / 2 ** 20:.1f} MB)")
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=30.0, help='Länge des Test-Signals (Sekunden)')
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--max-factor', type=float, default=8.0,
+                        help='Erlaubter Peak als Vielfaches der dekodierten Signalgröße')
+    parser.add_argument('--allowance-mb', type=float, default=DEFAULT_ALLOWANCE_MB,
+                        help='Feste Zugabe zum Limit jeder Stage (MB)')
+    parser.add_argument('--output', help='JSON-Ausgabedatei')
+    args = parser.parse_args()
+
+    decoded_bytes = int(args.duration * args.sample_rate) * 4  # float32 mono
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.wav')
+        with open(input_path, 'wb') as f:
+            f.write(make_test_wav(args.duration, args.sample_rate))
+
+        # Erster librosa.load() importiert/cached Module (~80 MB) - nicht mitzählen
+        librosa.load(input_path, sr=None, duration=1.0)
+
+        results = run_case('metadata', lambda: AudioService.get_audio_metadata(input_path))
+
+        for manipulation_type, parameters in MANIPULATIONS.items():
+            output_path = os.path.join(tmp, f'{manipulation_type}.wav')
+            with metrics.labels(manipulation_type=manipulation_type):
+                results += run_case(
+                    f'manipulation:{manipulation_type}',
+                    lambda: AudioManipulationService.apply_manipulation(
+                        manipulation_type, input_path, output_path, parameters
+                    )
+                )
+
+        for method in WatermarkStrategyFactory.available_methods():
+            strategy = WatermarkStrategyFactory.get_strategy(method)
+            output_path = os.path.join(tmp, f'watermarked_{method}.wav')
+            try:
+                strategy.warm_up()  # Modell-Laden zählt nicht zum Request
+            except ImportError as e:
+                print(f"- {method}: übersprungen ({e.name or str(e).splitlines()[0]})")
+                continue
+            with metrics.labels(method=method):
+                results += run_case(f'embed:{method}', lambda: strategy.embed(input_path, output_path))
+                results += run_case(f'detect:{method}', lambda: strategy.detect(output_path))
+
+    print(f"Signal: {args.duration:.0f} s @ {args.sample_rate} Hz = {decoded_bytes / 2 ** 20:.1f} MB (float32)\n")
+    allowance_bytes = int(args.allowance_mb * 2 ** 20)
+    all_ok = check(results, decoded_bytes, args.max_factor, allowance_bytes)
+
+    if args.output:
+        write_results({'decoded_bytes': decoded_bytes, 'max_factor': args.max_factor,
+                       'allowance_bytes': allowance_bytes, 'results': results}, args.output)
+
+    print("\n✓ Alle Stages unter ihrem Limit" if all_ok else "\n✗ Mindestens eine Stage über ihrem Limit")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
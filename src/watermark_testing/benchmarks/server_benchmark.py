@@ -0,0 +1,105 @@
+"""
+Vergleicht den Flask-Dev-Server mit dem Preforking-Production-Server.
+
+Misst Requests/s gegen einen Endpoint sowie RSS/PSS pro Prozess.
+PSS (proportional set size) verteilt copy-on-write geteilte Seiten
+anteilig auf die Worker und zeigt so die Ersparnis durch vorgeladene Modelle.
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.server_benchmark --endpoint detect --requests 50 --concurrency 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import (
+    child_pids, encode_multipart, http_request, make_test_wav, process_memory,
+    start_server, stop_server, wait_for_server, write_results
+)
+
+
+def build_request(endpoint: str, method: str, clip_seconds: float):
+    """Gibt (pfad, http_methode, body, headers) für den Endpoint zurück"""
+    if endpoint == 'health':
+        return '/health', 'GET', None, {}
+
+    body, content_type = encode_multipart(
+        {'method': method},
+        {'audio': ('benchmark.wav', make_test_wav(clip_seconds))}
+    )
+    path = '/watermark/detect' if endpoint == 'detect' else '/watermark/embed'
+    return path, 'POST', body, {'Content-Type': content_type}
+
+
+def run_load(base_url: str, request_spec, total: int, concurrency: int) -> dict:
+    """Schickt `total` Requests mit fester Parallelität und misst den Durchsatz"""
+    path, http_method, body, headers = request_spec
+
+    def one_request(_):
+        start = time.perf_counter()
+        status, _ = http_request(base_url + path, http_method, body, headers)
+        return status, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(duration for _, duration in results)
+    errors = sum(1 for status, _ in results if status != 200)
+    return {
+        'requests': total,
+        'errors': errors,
+        'elapsed_s': elapsed,
+        'requests_per_s': total / elapsed,
+        'latency_p50_s': latencies[len(latencies) // 2],
+        'latency_max_s': latencies[-1],
+    }
+
+
+def benchmark_mode(mode: str, args) -> dict:
+    """Startet einen Server-Modus, misst Durchsatz und Speicher, beendet ihn wieder"""
+    env = {'WEB_CONCURRENCY': str(args.workers)}
+    process = start_server(mode, args.port, env)
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        wait_for_server(base_url)
+        request_spec = build_request(args.endpoint, args.method, args.clip_seconds)
+
+        # Aufwärmen: Modelle im Dev-Server laden, Caches füllen
+        run_load(base_url, request_spec, args.warmup, args.concurrency)
+        load = run_load(base_url, request_spec, args.requests, args.concurrency)
+
+        workers = child_pids(process.pid) if mode == 'prod' else [process.pid]
+        worker_memory = [{'pid': pid, **process_memory(pid)} for pid in workers]
+        return {
+            'mode': mode,
+            **load,
+            'master': {'pid': process.pid, **process_memory(process.pid)},
+            'workers': worker_memory,
+        }
+    finally:
+        stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoint', choices=['health', 'detect', 'embed'], default='detect')
+    parser.add_argument('--method', default='audioseal', help='Watermarking-Methode')
+    parser.add_argument('--modes', nargs='+', default=['dev', 'prod'], choices=['dev', 'prod'])
+    parser.add_argument('--workers', type=int, default=4, help='Worker-Prozesse im prod-Modus')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--warmup', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--clip-seconds', type=float, default=3.0)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = [benchmark_mode(mode, args) for mode in args.modes]
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Startzeit der API: Import-Kosten und Zeit bis /health bzw. /ready.
+
+1. `python -X importtime -c "import app"` (mehrfach, frischer Prozess): Wandzeit,
+   kumulierte Importzeit, die teuersten Module und ob schwere Bibliotheken
+   (torch, librosa, scipy, ...) schon beim Import geladen werden.
+2. Optional (--server): Server starten und messen, wann /health und /ready
+   erstmals 200 liefern - pro Server-Modus und PRELOAD_MODELS-Wert.
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --server --modes prod --preload 1 background 0 --stand-in
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.common import API_DIR, http_request, start_server, stop_server, write_results
+
+HEAVY_MODULES = ('numpy', 'scipy', 'soundfile', 'librosa', 'torch', 'torchaudio', 'audioseal', 'perth')
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parst die Zeilen 'import time: self [us] | cumulative | imported package'"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return modules
+
+
+def measure_import(env: Dict[str, str], top: int) -> Dict:
+    """Ein Import von app.py in einem frischen Prozess"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=API_DIR, env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import app fehlgeschlagen:\n{result.stderr[-2000:]}")
+
+    modules = parse_importtime(result.stderr)
+    app_entry = next((m for m in modules if m['module'] == 'app'), None)
+    imported = {m['module'] for m in modules}
+    # Top-Level-Pakete, die direkt unter app geladen werden (Tiefe 1)
+    children = sorted((m for m in modules if m['depth'] == 1), key=lambda m: -m['cumulative_ms'])
+    return {
+        'wall_s': wall,
+        'import_app_ms': app_entry['cumulative_ms'] if app_entry else None,
+        'heavy_modules_imported': [name for name in HEAVY_MODULES if name in imported],
+        'top_imports': [{'module': m['module'], 'cumulative_ms': m['cumulative_ms']} for m in children[:top]],
+    }
+
+
+def benchmark_import(env: Dict[str, str], repeats: int, top: int) -> Dict:
+    runs = [measure_import(env, top) for _ in range(repeats)]
+    walls = [run['wall_s'] for run in runs]
+    result = {
+        'repeats': repeats,
+        'wall_s_median': statistics.median(walls),
+        'wall_s_min': min(walls),
+        'import_app_ms_median': statistics.median(run['import_app_ms'] for run in runs),
+        'heavy_modules_imported': runs[-1]['heavy_modules_imported'],
+        'top_imports': runs[-1]['top_imports'],
+    }
+
+    print(f"import app: {result['import_app_ms_median']:.0f} ms (Prozess gesamt {result['wall_s_median']:.2f} s)")
+    print(f"  schwere Module beim Import: {', '.join(result['heavy_modules_imported']) or 'keine'}")
+    for entry in result['top_imports']:
+        print(f"  {entry['cumulative_ms']:8.1f} ms  {entry['module']}")
+    return result
+
+
+def wait_for_status(url: str, deadline: float) -> Optional[float]:
+    """Sekunden bis url erstmals 200 liefert (None bei Timeout)"""
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        status, _ = http_request(url, timeout=2)
+        if status == 200:
+            return time.perf_counter() - start
+        time.sleep(0.05)
+    return None
+
+
+def benchmark_server(mode: str, preload: str, env: Dict[str, str], port: int, timeout: float) -> Dict:
+    """Zeit vom Prozessstart bis /health und /ready mit 200 antworten"""
+    start = time.perf_counter()
+    process = start_server(mode, port, {**env, 'PRELOAD_MODELS': preload})
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = start + timeout
+        health = wait_for_status(f'{base_url}/health', deadline)
+        health_s = (time.perf_counter() - start) if health is not None else None
+        ready = wait_for_status(f'{base_url}/ready', deadline)
+        ready_s = (time.perf_counter() - start) if ready is not None else None
+    finally:
+        stop_server(process)
+
+    print(f"{mode:4s} PRELOAD_MODELS={preload:10s} /health nach {fmt_s(health_s)}  /ready nach {fmt_s(ready_s)}")
+    return {'mode': mode, 'preload_models': preload, 'health_s': health_s, 'ready_s': ready_s}
+
+
+def fmt_s(value) -> str:
+    return f"{value:6.2f} s" if value is not None else 'Timeout '
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=3, help='Wiederholungen des Import-Laufs')
+    parser.add_argument('--top', type=int, default=10, help='Anzahl der teuersten Top-Level-Imports')
+    parser.add_argument('--server', action='store_true', help='Zusätzlich Zeit bis /health und /ready messen')
+    parser.add_argument('--modes', nargs='+', default=['prod'], choices=['dev', 'prod'])
+    parser.add_argument('--preload', nargs='+', default=['1', 'background', '0'],
+                        choices=['1', 'background', '0'], help='PRELOAD_MODELS-Werte')
+    parser.add_argument('--stand-in', action='store_true', help='Stand-in-Modelle statt echter Checkpoints')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5058)
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+            'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+            'WEB_CONCURRENCY': str(args.workers),
+        }
+        if args.stand_in:
+            env['WATERMARK_STAND_IN_MODELS'] = '1'
+
+        results = {'import': benchmark_import(env, args.repeats, args.top)}
+        if args.server:
+            # Eigener Port pro Lauf: der vorige Server gibt seinen Port evtl. noch nicht frei
+            runs = [(mode, preload) for mode in args.modes for preload in args.preload]
+            results['server'] = [
+                benchmark_server(mode, preload, env, args.port + index, args.timeout)
+                for index, (mode, preload) in enumerate(runs)
+            ]
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
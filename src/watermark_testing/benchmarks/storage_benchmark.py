@@ -0,0 +1,92 @@
+"""
+Benchmark der FLAC-Ablage (services/storage_tier.py).
+
+Wandelt sprachähnliche 16-bit-WAVs pro Kompressionsstufe in FLAC und stellt
+die Kosten den Einsparungen gegenüber:
+    ratio                   FLAC-Größe / WAV-Größe
+    encode_cpu_s_per_min    CPU-Sekunden fürs Kodieren pro Minute Audio (beim Speichern)
+    decode_cpu_s_per_min    CPU-Sekunden fürs Dekodieren zu WAV pro Minute Audio (Download als WAV)
+    saved_mb_per_cpu_s      gesparter Speicher pro CPU-Sekunde Kodierung
+    transfer_saved_s        gesparte Übertragungszeit eines FLAC-Downloads bei --bandwidth-mbit
+
+Echte Aufnahmen komprimieren meist schlechter als die synthetischen Signale;
+für belastbare Raten zusätzlich `python -m services.storage_tier --dry-run`
+bzw. /metrics (watermark_storage_bytes_total) im Betrieb auswerten.
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.storage_benchmark --durations 10 60 600 --levels 0 0.5 1
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import write_results
+from benchmarks.signals import write_speech_like
+from services import storage_tier
+
+
+def benchmark_case(wav_path: str, duration: float, level: float, bandwidth_mbit: float) -> dict:
+    """Kodiert eine WAV-Datei mit `level` und dekodiert sie wie beim Download"""
+    wav_size = os.path.getsize(wav_path)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    flac_path = storage_tier.compress(wav_path, keep_source=True, level=level)
+    encode_cpu, encode_wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    if flac_path == wav_path:
+        raise RuntimeError(f"{wav_path} wurde nicht umgewandelt (STORAGE_FORMAT={storage_tier.STORAGE_FORMAT})")
+    flac_size = os.path.getsize(flac_path)
+
+    cpu_start = time.process_time()
+    length, chunks = storage_tier.wav_stream(flac_path)
+    decoded = sum(len(chunk) for chunk in chunks)
+    decode_cpu = time.process_time() - cpu_start
+    assert decoded == length
+    os.remove(flac_path)
+
+    minutes = duration / 60
+    saved = wav_size - flac_size
+    return {
+        'level': level,
+        'wav_bytes': wav_size,
+        'flac_bytes': flac_size,
+        'ratio': round(flac_size / wav_size, 4),
+        'encode_wall_s': round(encode_wall, 4),
+        'encode_cpu_s_per_min': round(encode_cpu / minutes, 4),
+        'decode_cpu_s_per_min': round(decode_cpu / minutes, 4),
+        'saved_mb_per_cpu_s': round(saved / 2 ** 20 / encode_cpu, 1) if encode_cpu > 0 else None,
+        'transfer_saved_s': round(saved * 8 / (bandwidth_mbit * 1e6), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', nargs='+', type=float, default=[10, 60, 600], help='Signal-Längen in Sekunden')
+    parser.add_argument('--sample-rates', nargs='+', type=int, default=[16000, 44100])
+    parser.add_argument('--levels', nargs='+', type=float, default=[0.0, 0.5, 1.0], help='FLAC-Stufen 0.0-1.0')
+    parser.add_argument('--bandwidth-mbit', type=float, default=100, help='Client-Bandbreite für transfer_saved_s')
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for sample_rate in args.sample_rates:
+            for duration in args.durations:
+                wav_path = write_speech_like(os.path.join(tmp, f'speech_{sample_rate}_{duration:g}'),
+                                             duration, sample_rate, 'wav')
+                for level in args.levels:
+                    row = {'sample_rate': sample_rate, 'duration_s': duration,
+                           **benchmark_case(wav_path, duration, level, args.bandwidth_mbit)}
+                    results.append(row)
+                    print(f"{sample_rate:6d} Hz {duration:7g} s  level {level:4.2f}  "
+                          f"ratio {row['ratio']:.3f}  "
+                          f"encode {row['encode_cpu_s_per_min']:.3f} / decode {row['decode_cpu_s_per_min']:.3f} "
+                          f"CPU-s pro Audio-Minute  {row['saved_mb_per_cpu_s'] or 0:7.1f} MB/CPU-s  "
+                          f"-{row['transfer_saved_s']:.2f} s Download @ {args.bandwidth_mbit:g} Mbit/s")
+                os.remove(wav_path)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
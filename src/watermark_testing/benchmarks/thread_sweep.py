@@ -0,0 +1,65 @@
+"""
+Sweep über die torch-Threads pro Worker im Production-Server.
+
+Startet den Server für jede Kombination aus Worker-Anzahl und
+TORCH_NUM_THREADS neu und misst den Durchsatz. Das Optimum wird
+am Ende ausgegeben.
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.thread_sweep --workers 2 4 --threads 1 2 4 --endpoint detect
+"""
+import argparse
+
+from benchmarks.common import start_server, stop_server, wait_for_server, http_request, write_results
+from benchmarks.server_benchmark import build_request, run_load
+
+
+def measure(workers: int, threads: int, args) -> dict:
+    """Misst eine Kombination (Worker x torch-Threads)"""
+    env = {
+        'WEB_CONCURRENCY': str(workers),
+        'TORCH_NUM_THREADS': str(threads),
+        'WORKER_CPU_SETS': 'auto' if args.pin else '',
+    }
+    process = start_server('prod', args.port, env)
+    base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        wait_for_server(base_url)
+        _, health = http_request(f'{base_url}/health')
+
+        request_spec = build_request(args.endpoint, args.method, args.clip_seconds)
+        concurrency = args.concurrency or workers * 2
+        run_load(base_url, request_spec, args.warmup, concurrency)
+        load = run_load(base_url, request_spec, args.requests, concurrency)
+
+        return {'workers': workers, 'torch_threads': threads, 'pinned': args.pin,
+                'concurrency': concurrency, **load, 'health_sample': health.decode()}
+    finally:
+        stop_server(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--pin', action='store_true', help='Worker auf Kern-Sets pinnen (WORKER_CPU_SETS=auto)')
+    parser.add_argument('--endpoint', choices=['health', 'detect', 'embed'], default='detect')
+    parser.add_argument('--method', default='audioseal')
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--warmup', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, help='Parallele Clients (Standard: 2 pro Worker)')
+    parser.add_argument('--clip-seconds', type=float, default=3.0)
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = [measure(w, t, args) for w in args.workers for t in args.threads]
+    best = max(results, key=lambda r: r['requests_per_s'])
+    print(f"✓ Optimum: {best['workers']} Worker x {best['torch_threads']} Threads "
+          f"-> {best['requests_per_s']:.1f} req/s")
+    write_results({'results': results, 'best': best}, args.output)
+
+
+if __name__ == '__main__':
+    main()
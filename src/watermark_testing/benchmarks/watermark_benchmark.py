@@ -0,0 +1,194 @@
+"""
+Embed-/Detect-Benchmark für die Watermarking-Strategien.
+
+Misst pro Methode, Sample-Rate, Dauer und Format:
+    - Latenz kalt (Modell wird geladen) und warm (Median/Min/Max über --repeats)
+    - Durchsatz: Echtzeitfaktor (Sekunden Audio pro Sekunde Rechenzeit) und Dateien/s
+    - Peak-Speicher eines warmen Laufs: tracemalloc (Python/numpy) und RSS-Sampling (inkl. torch)
+
+Modelle (--models):
+    real      echte Checkpoints; offline über lokale Pfade in AUDIOSEAL_GENERATOR /
+              AUDIOSEAL_DETECTOR bzw. bereits gecachte Downloads (HF_HUB_OFFLINE=1)
+    stand-in  deterministische Stand-ins (aimodels/stand_in.py), kein Download
+    auto      echte Modelle, wo das Paket installiert ist, sonst Stand-in
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.watermark_benchmark --models stand-in --durations 1 10 60
+    python -m benchmarks.watermark_benchmark --durations 1 60 1800 --sample-rates 16000 44100 \\
+        --formats wav flac --output results.json
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.common import write_results
+from benchmarks.signals import write_speech_like, available_formats
+
+MODEL_MODES = {'real': '0', 'stand-in': '1', 'auto': 'auto'}
+
+
+class PeakRssSampler:
+    """Misst per Hintergrund-Thread den RSS-Peak eines Blocks"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        from services.metrics import current_rss
+        self._current_rss = current_rss
+        self.start_rss = self.peak = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._current_rss())
+        return False
+
+    @property
+    def delta(self) -> int:
+        return max(0, self.peak - self.start_rss)
+
+
+def clear_model_caches(method: str) -> None:
+    """Verwirft geladene Modelle, damit der nächste Aufruf kalt ist"""
+    if method == 'audioseal':
+        from aimodels.AudioSeal.audioseal_handler import get_generator, get_detector
+        get_generator.cache_clear()
+        get_detector.cache_clear()
+    elif method == 'perth':
+        from aimodels.PerTh.perth_handler import get_watermarker
+        get_watermarker.cache_clear()
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def measure(func, repeats: int) -> dict:
+    """Warm-Latenzen und Peak-Speicher einer Operation"""
+    func()  # Aufwärmen (Allocator, Caches)
+    latencies = [timed(func) for _ in range(repeats)]
+
+    tracemalloc.start()
+    try:
+        with PeakRssSampler() as rss:
+            func()
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'warm_latency_s': {
+            'median': statistics.median(latencies),
+            'min': min(latencies),
+            'max': max(latencies),
+        },
+        'peak_traced_bytes': traced_peak,
+        'peak_rss_delta_bytes': rss.delta,
+    }
+
+
+def benchmark_case(strategy, method: str, input_path: str, output_path: str,
+                   duration: float, args) -> list:
+    """Embed + Detect für eine Eingabedatei"""
+    operations = {
+        'embed': lambda: strategy.embed(input_path, output_path),
+        'detect': lambda: strategy.detect(output_path),
+    }
+
+    rows = []
+    for operation, func in operations.items():
+        row = {'operation': operation}
+        if args.cold:
+            clear_model_caches(method)
+            row['cold_latency_s'] = timed(func)
+        else:
+            strategy.warm_up()
+        row.update(measure(func, args.repeats))
+
+        median = row['warm_latency_s']['median']
+        row['realtime_factor'] = duration / median
+        row['files_per_s'] = 1 / median
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--methods', nargs='+', default=['audioseal', 'perth'])
+    parser.add_argument('--models', choices=list(MODEL_MODES), default='auto')
+    parser.add_argument('--durations', nargs='+', type=float, default=[1, 10, 60],
+                        help='Signal-Längen in Sekunden (bis 1800)')
+    parser.add_argument('--sample-rates', nargs='+', type=int, default=[16000, 22050, 44100, 48000])
+    parser.add_argument('--formats', nargs='+', default=['wav'], choices=['wav', 'flac', 'ogg', 'mp3'])
+    parser.add_argument('--repeats', type=int, default=3, help='Warme Wiederholungen pro Messung')
+    parser.add_argument('--no-cold', dest='cold', action='store_false', help='Kalte Läufe überspringen')
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    # Vor dem ersten Laden der Modelle setzen
+    os.environ['WATERMARK_STAND_IN_MODELS'] = MODEL_MODES[args.models]
+    from aimodels.stand_in import use_stand_in
+    from services.watermark_strategy import WatermarkStrategyFactory
+
+    formats = [f for f in args.formats if f in available_formats()]
+    for skipped in set(args.formats) - set(formats):
+        print(f"- Format {skipped}: von libsndfile nicht unterstützt, übersprungen")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for method in args.methods:
+            strategy = WatermarkStrategyFactory.get_strategy(method)
+            try:
+                strategy.warm_up()
+            except ImportError as e:
+                print(f"- {method}: übersprungen ({e.name} nicht installiert, --models stand-in/auto nutzen)")
+                continue
+
+            for sample_rate in args.sample_rates:
+                for duration in args.durations:
+                    for audio_format in formats:
+                        input_path = write_speech_like(
+                            os.path.join(tmp, f'speech_{sample_rate}_{duration:g}'),
+                            duration, sample_rate, audio_format
+                        )
+                        output_path = os.path.join(tmp, f'watermarked_{method}.wav')
+
+                        for row in benchmark_case(strategy, method, input_path, output_path, duration, args):
+                            row = {
+                                'method': method,
+                                'model_version': strategy.model_version,
+                                'stand_in': use_stand_in(method),
+                                'sample_rate': sample_rate,
+                                'duration_s': duration,
+                                'format': audio_format,
+                                **row,
+                            }
+                            results.append(row)
+                            print(f"{method:9s} {row['operation']:6s} {sample_rate:6d} Hz {duration:7g} s "
+                                  f"{audio_format:4s} warm {row['warm_latency_s']['median'] * 1000:9.1f} ms "
+                                  f"({row['realtime_factor']:7.1f}x RT)  "
+                                  f"cold {row.get('cold_latency_s', 0) * 1000:9.1f} ms  "
+                                  f"peak {row['peak_rss_delta_bytes'] / 2 ** 20:7.1f} MB RSS")
+                        os.remove(input_path)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark der Waveform-Pyramiden (services/waveform.py).
+
+Berechnet die Pyramide sprachähnlicher Signale (als FLAC abgelegt, wie im
+Upload-Ordner) und misst die Abfragen der UI bei verschiedenen Zoomstufen:
+    build_cpu_s_per_min     CPU-Sekunden für die Pyramide pro Minute Audio (einmal pro Datei)
+    sidecar_ratio           Größe der .peaks-Datei / Größe als 16-bit-WAV
+    query_ms                Median einer Abfrage pro Ausschnittslänge (Sekunden) bei --width Pixeln
+
+Die Abfragezeit sollte über alle Ausschnitte und Dateilängen etwa gleich
+bleiben; nur Ausschnitte unterhalb der feinsten Stufe lesen Samples direkt.
+
+Beispiel (aus src/watermark_testing):
+    python -m benchmarks.waveform_benchmark --durations 60 600 3600 --width 1200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import write_results
+from benchmarks.signals import write_speech_like
+from services import waveform
+
+
+def benchmark_case(path: str, duration: float, sample_rate: int, width: int,
+                   spans: list, repeats: int) -> dict:
+    """Berechnet die Pyramide von `path` und fragt Ausschnitte in der Dateimitte ab"""
+    cpu_start = time.process_time()
+    sidecar = waveform.build_pyramid(path)
+    build_cpu = time.process_time() - cpu_start
+
+    row = {
+        'build_cpu_s_per_min': round(build_cpu / (duration / 60), 4),
+        'sidecar_bytes': os.path.getsize(sidecar),
+        'sidecar_ratio': round(os.path.getsize(sidecar) / (duration * sample_rate * 2), 4),
+        'query_ms': {},
+    }
+    for span in [s for s in spans if s <= duration] + [duration]:
+        start = (duration - span) / 2
+        timings = []
+        for _ in range(repeats):
+            wall_start = time.perf_counter()
+            peaks = waveform.read_peaks(path, 'audio', start, start + span, width)
+            timings.append(time.perf_counter() - wall_start)
+        row['query_ms'][f'{span:g}'] = {
+            'ms': round(statistics.median(timings) * 1000, 3),
+            'samples_per_peak': peaks['samples_per_peak'],
+        }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', nargs='+', type=float, default=[60, 600, 3600], help='Signal-Längen in Sekunden')
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--width', type=int, default=1200, help='Pixel pro Abfrage')
+    parser.add_argument('--spans', nargs='+', type=float, default=[0.05, 1, 10, 60],
+                        help='Ausschnittslängen in Sekunden (zusätzlich immer die ganze Datei)')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--output', help='JSON-Ausgabedatei (sonst stdout)')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration in args.durations:
+            path = write_speech_like(os.path.join(tmp, f'speech_{duration:g}'), duration, args.sample_rate, 'flac')
+            row = {'sample_rate': args.sample_rate, 'duration_s': duration, 'width': args.width,
+                   **benchmark_case(path, duration, args.sample_rate, args.width, args.spans, args.repeats)}
+            results.append(row)
+            queries = '  '.join(f"{span} s: {q['ms']:.2f} ms" for span, q in row['query_ms'].items())
+            print(f"{duration:7g} s  build {row['build_cpu_s_per_min']:.3f} CPU-s pro Audio-Minute  "
+                  f"sidecar {row['sidecar_bytes'] / 1024:.0f} KB ({row['sidecar_ratio']:.1%})  {queries}")
+            waveform.remove_sidecars(path)
+            os.remove(path)
+
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
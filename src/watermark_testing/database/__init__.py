@@ -1,2 +1,3 @@
 from .database import init_db, SessionLocal
-from .repositories import UserRepository, AudioFileRepository
\ No newline at end of file
+from .repositories import UserRepository, AudioFileRepository, DetectionResultRepository
+from .unit_of_work import unit_of_work
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, ForeignKey, Float, Boolean, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -35,6 +35,13 @@ class AudioFile(Base):
     
     # Relationship zu User
     user = relationship("User", back_populates="audio_files")
+    
+    # Indizes passend zu den Repository-Queries (Filter + Sortierung nach created_at, id)
+    __table_args__ = (
+        Index("ix_audio_files_user_created", "user_id", "created_at", "id"),
+        Index("ix_audio_files_user_watermark_created", "user_id", "watermark_type", "created_at", "id"),
+        Index("ix_audio_files_file_path", "file_path"),  # Storage-Abgleich
+    )
 
 
 class ManipulatedAudioFile(Base):
@@ -66,4 +73,113 @@ class ManipulatedAudioFile(Base):
     
     # Relationships
     user = relationship("User")
-    original_audio = relationship("AudioFile", foreign_keys=[original_audio_id])
\ No newline at end of file
+    original_audio = relationship("AudioFile", foreign_keys=[original_audio_id])
+    
+    # Indizes passend zu den Repository-Queries (Filter + Sortierung nach created_at, id)
+    __table_args__ = (
+        Index("ix_manipulated_user_created", "user_id", "created_at", "id"),
+        Index("ix_manipulated_user_type_created", "user_id", "manipulation_type", "created_at", "id"),
+        Index("ix_manipulated_original", "original_audio_id"),
+        Index("ix_manipulated_file_path", "file_path"),  # Storage-Abgleich
+    )
+
+class DetectionResult(Base):
+    __tablename__ = "detection_results"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Geprüfte Datei: Original/Upload ODER manipulierte Datei
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), nullable=True)
+    manipulated_audio_id = Column(Integer, ForeignKey("manipulated_audio_files.id"), nullable=True)
+    
+    # Detection-Ergebnis
+    method = Column(String(50), nullable=False)  # z.B. "AudioSeal", "PerTh"
+    detected = Column(Boolean, nullable=False)
+    confidence = Column(Float)  # in Prozent, falls die Methode einen Score liefert
+    bit_accuracy = Column(Float)  # 0.0 - 1.0, nur wenn die erwartete Nachricht bekannt ist
+    message = Column(String(255))  # Extrahierte Nachricht als JSON-String
+    
+    # Laufzeit + Modell
+    latency_ms = Column(Float)
+    model_version = Column(String(100))
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User")
+    audio_file = relationship("AudioFile", foreign_keys=[audio_file_id])
+    manipulated_audio = relationship("ManipulatedAudioFile", foreign_keys=[manipulated_audio_id])
+    
+    __table_args__ = (
+        Index("ix_detection_results_user_method", "user_id", "method"),
+        Index("ix_detection_results_audio_file", "audio_file_id"),
+        Index("ix_detection_results_manipulated", "manipulated_audio_id"),
+    )
+
+
+class UploadSession(Base):
+    """
+    Resumable Upload in Chunks. Jeder Chunk wird direkt an seinen Offset in
+    file_path geschrieben, die Datei ist nach dem letzten Chunk fertig.
+    """
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)  # uuid4().hex
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)  # Teil-Datei im Upload-Ordner
+    total_size = Column(Integer, nullable=False)  # in Bytes
+    chunk_size = Column(Integer, nullable=False)  # in Bytes, alle außer dem letzten Chunk
+    sha256 = Column(String(64))  # Optional: erwarteter Hash der ganzen Datei
+    status = Column(String(20), nullable=False, default='open')  # open -> completed / failed
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), nullable=True)  # nach finalize
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_upload_sessions_file_path", "file_path"),
+    )
+
+
+class UploadChunk(Base):
+    """Empfangener, per SHA-256 geprüfter Chunk einer UploadSession"""
+    __tablename__ = "upload_chunks"
+    
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    size = Column(Integer, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IdempotencyKey(Base):
+    """
+    Ergebnis eines Requests mit Idempotency-Key (Embed, Manipulation).
+    Wiederholungen mit demselben Key und Payload bekommen das gespeicherte
+    Ergebnis, statt erneut zu rechnen.
+    """
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    endpoint = Column(String(50), primary_key=True)
+    key = Column(String(255), primary_key=True)  # Header Idempotency-Key
+    request_hash = Column(String(64), nullable=False)  # SHA-256 über Datei und Parameter
+    status = Column(String(20), nullable=False, default='processing')  # processing -> completed
+    
+    # Ergebnis (nach completed)
+    result_path = Column(String(500))
+    result_sha256 = Column(String(64))  # erkennt überschriebene Ergebnis-Dateien
+    download_name = Column(String(255))
+    resource_id = Column(Integer)  # AudioFile- bzw. ManipulatedAudioFile-ID
+    
+    # Timestamps; expires_at: processing -> Lock-Timeout, completed -> TTL
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
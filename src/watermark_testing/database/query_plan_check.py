@@ -0,0 +1,196 @@
+"""
+Prüft per EXPLAIN QUERY PLAN, dass jede Repository-Query einen Index nutzt.
+
+Legt eine temporäre SQLite-DB an, füllt sie mit vielen Zeilen (Standard: 1 Mio.
+pro Tabelle, Detection-Ergebnisse für Originale und Manipulationen), ruft die echten Repository-Methoden auf, fängt das erzeugte SQL ab
+und lässt SQLite den Plan dazu erklären. Ein Full-Table-Scan oder eine Sortierung
+über einen temporären B-Tree gilt als Fehler (Exit-Code 1). Ausnahme: Aggregate,
+die über Spalten einer gejointen Tabelle gruppieren (GROUP_BY_OVER_JOIN) - kein
+Index kann diese Reihenfolge liefern; der Filter muss trotzdem per Index laufen.
+
+Usage (aus src/watermark_testing):
+    python database/query_plan_check.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Füge das watermark_testing Verzeichnis zum Path hinzu
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, User, AudioFile, ManipulatedAudioFile, DetectionResult
+from database.repositories import AudioFileRepository, ManipulatedAudioFileRepository, DetectionResultRepository
+
+WATERMARK_TYPES = ['AudioSeal', 'PerTh', None]
+METHODS = ['AudioSeal', 'PerTh']
+
+# GROUP BY über (method, manipulation_type, manipulation_parameters) aus zwei Tabellen:
+# der temporäre B-Tree sortiert nur die per Index gefundenen Zeilen eines Users
+GROUP_BY_OVER_JOIN = {
+    'DetectionResultRepository.robustness_stats',
+    'DetectionResultRepository.robustness_stats(method)',
+    'DetectionResultRepository.robustness_stats(manipulation_type)',
+}
+MANIPULATION_TYPES = ['noise', 'compression', 'gain', 'resample', 'lowpass', 'highpass', 'timestretch', 'pitchshift']
+
+
+def seed(engine, rows: int, users: int, batch_size: int = 50000) -> None:
+    """Füllt die Tabellen mit synthetischen Zeilen (Core-Bulk-Insert)"""
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, users + 1)
+        ])
+
+    for offset in range(0, rows, batch_size):
+        count = min(batch_size, rows - offset)
+        audio_rows = []
+        manipulated_rows = []
+        detection_rows = []
+        for i in range(offset + 1, offset + count + 1):
+            created_at = start + timedelta(seconds=i * 7)
+            watermark_type = rng.choice(WATERMARK_TYPES)
+            audio_rows.append({
+                'id': i, 'user_id': rng.randint(1, users), 'filename': f'file{i}.wav',
+                'file_path': f'/app/uploads/file{i}.wav', 'file_size': 1000, 'sample_rate': 44100,
+                'duration': 3.0, 'has_watermark': watermark_type is not None,
+                'watermark_type': watermark_type, 'created_at': created_at
+            })
+            manipulated_rows.append({
+                'id': i, 'user_id': rng.randint(1, users), 'original_audio_id': rng.randint(1, max(1, i)),
+                'filename': f'manipulated{i}.wav', 'file_path': f'/app/uploads/manipulated{i}.wav',
+                'file_size': 1000, 'sample_rate': 44100, 'duration': 3.0,
+                'manipulation_type': rng.choice(MANIPULATION_TYPES), 'manipulation_parameters': '{}',
+                'had_watermark': False, 'watermark_type': None, 'created_at': created_at
+            })
+            # Abwechselnd Detection auf Original bzw. manipulierter Datei
+            on_original = i % 2 == 0
+            detection_rows.append({
+                'id': i, 'user_id': rng.randint(1, users),
+                'audio_file_id': i if on_original else None,
+                'manipulated_audio_id': None if on_original else i,
+                'method': rng.choice(METHODS), 'detected': rng.random() < 0.5,
+                'confidence': rng.random() * 100, 'latency_ms': 50.0, 'created_at': created_at
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(AudioFile), audio_rows)
+            conn.execute(insert(ManipulatedAudioFile), manipulated_rows)
+            conn.execute(insert(DetectionResult), detection_rows)
+        print(f"  {offset + count:,} / {rows:,} Zeilen")
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+
+def repository_calls(db):
+    """Alle Repository-Lesezugriffe, deren Plan geprüft wird: (Name, Aufruf)"""
+    audio_repo = AudioFileRepository(db)
+    manipulated_repo = ManipulatedAudioFileRepository(db)
+    detection_repo = DetectionResultRepository(db)
+    _, cursor = audio_repo.list_page(1, limit=5)
+    _, manipulated_cursor = manipulated_repo.list_page(1, limit=5)
+    date_from, date_to = datetime(2024, 1, 2), datetime(2024, 1, 9)
+
+    return [
+        ('AudioFileRepository.get_by_id', lambda: audio_repo.get_by_id(1)),
+        ('AudioFileRepository.get_by_user', lambda: audio_repo.get_by_user(1)),
+        ('AudioFileRepository.list_page', lambda: audio_repo.list_page(1)),
+        ('AudioFileRepository.list_page(cursor)', lambda: audio_repo.list_page(1, cursor=cursor)),
+        ('AudioFileRepository.list_page(watermark_type)',
+         lambda: audio_repo.list_page(1, watermark_type='AudioSeal')),
+        ('AudioFileRepository.list_page(date range)',
+         lambda: audio_repo.list_page(1, created_from=date_from, created_to=date_to)),
+        ('ManipulatedAudioFileRepository.get_by_id', lambda: manipulated_repo.get_by_id(1)),
+        ('ManipulatedAudioFileRepository.get_by_user', lambda: manipulated_repo.get_by_user(1)),
+        ('ManipulatedAudioFileRepository.get_by_manipulation_type',
+         lambda: manipulated_repo.get_by_manipulation_type(1, 'noise')),
+        ('ManipulatedAudioFileRepository.get_by_original', lambda: manipulated_repo.get_by_original(1)),
+        ('ManipulatedAudioFileRepository.list_page', lambda: manipulated_repo.list_page(1)),
+        ('ManipulatedAudioFileRepository.list_page(cursor)',
+         lambda: manipulated_repo.list_page(1, cursor=manipulated_cursor)),
+        ('ManipulatedAudioFileRepository.list_page(manipulation_type)',
+         lambda: manipulated_repo.list_page(1, manipulation_type='noise')),
+        ('ManipulatedAudioFileRepository.list_page(date range)',
+         lambda: manipulated_repo.list_page(1, created_from=date_from, created_to=date_to)),
+        ('DetectionResultRepository.get_by_audio_file', lambda: detection_repo.get_by_audio_file(2)),
+        ('DetectionResultRepository.get_by_manipulated', lambda: detection_repo.get_by_manipulated(1)),
+        ('DetectionResultRepository.robustness_stats', lambda: detection_repo.robustness_stats(1)),
+        ('DetectionResultRepository.robustness_stats(method)',
+         lambda: detection_repo.robustness_stats(1, method='AudioSeal')),
+        ('DetectionResultRepository.robustness_stats(manipulation_type)',
+         lambda: detection_repo.robustness_stats(1, manipulation_type='noise')),
+    ]
+
+
+def check_plans(engine) -> bool:
+    """Führt alle Repository-Calls aus und prüft die Pläne. True = alles per Index"""
+    captured = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    db = sessionmaker(bind=engine)()
+    all_ok = True
+    try:
+        for name, call in repository_calls(db):
+            captured.clear()
+            start = time.perf_counter()
+            call()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            for statement, parameters in captured:
+                with engine.connect() as conn:
+                    plan = [row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                allowed = {'USE TEMP B-TREE FOR GROUP BY'} if name in GROUP_BY_OVER_JOIN else set()
+                problems = [
+                    step for step in plan
+                    if (step.startswith('SCAN') and 'USING' not in step)
+                    or ('TEMP B-TREE' in step and step not in allowed)
+                ]
+                ok = not problems
+                all_ok = all_ok and ok
+                print(f"{'✓' if ok else '✗'} {name} ({elapsed_ms:.1f} ms)")
+                for step in plan:
+                    print(f"    {step}")
+    finally:
+        db.close()
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    return all_ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Zeilen pro Tabelle')
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'query_plans.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        print(f"--- Seed: {args.rows:,} Zeilen pro Tabelle ---")
+        seed(engine, args.rows, args.users)
+
+        print("\n--- Query-Pläne ---")
+        all_ok = check_plans(engine)
+        engine.dispose()
+
+    print("\n✓ Alle Queries nutzen einen Index" if all_ok else "\n✗ Mindestens eine Query ohne Index")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == "__main__":
+    main()
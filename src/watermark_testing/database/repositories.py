@@ -1,14 +1,94 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple, Any
+from sqlalchemy import tuple_, func, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .models import User, AudioFile, ManipulatedAudioFile
+from .models import (
+    User, AudioFile, ManipulatedAudioFile, DetectionResult, UploadSession, UploadChunk, IdempotencyKey
+)
+from .unit_of_work import in_unit_of_work
+from services.metrics import stage_timer
 from datetime import datetime
+import base64
 import json
 
 
-class UserRepository:
+# ==========================================
+# PAGINATION - Keyset-Cursor auf (created_at, id)
+# ==========================================
+
+# Obergrenze für Einträge pro Seite
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Kodiert die Position nach dem letzten Eintrag einer Seite als URL-sicheren String"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Dekodiert einen Cursor aus encode_cursor().
+    
+    Raises:
+        ValueError: Bei ungültigem Cursor
+    """
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Ungültiger Cursor")
+
+
+def _keyset_page(query, model, columns, limit: int, cursor: Optional[str],
+                 created_from: Optional[datetime], created_to: Optional[datetime]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Liefert eine Seite (neueste zuerst) und den Cursor für die nächste Seite.
+    Lädt nur die angegebenen Spalten, nicht die kompletten ORM-Objekte.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    query = query.with_entities(*columns)
+    if created_from:
+        query = query.filter(model.created_at >= created_from)
+    if created_to:
+        query = query.filter(model.created_at < created_to)
+    if cursor:
+        # Alles "nach" dem Cursor in absteigender Reihenfolge
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*decode_cursor(cursor)))
+    
+    # Ein Eintrag mehr laden, um zu wissen ob es eine weitere Seite gibt
+    with stage_timer('db_query'):
+        rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+class BaseRepository:
     def __init__(self, db: Session):
         self.db = db
     
+    def _commit(self) -> None:
+        """
+        Schließt einen Schreibzugriff ab: Commit, oder nur Flush solange
+        eine Unit of Work offen ist (Commit dann einmal am Ende).
+        Nach dem Flush sind IDs gesetzt - kein refresh() nötig.
+        """
+        if in_unit_of_work(self.db):
+            with stage_timer('db_flush'):
+                self.db.flush()
+        else:
+            with stage_timer('db_commit'):
+                self.db.commit()
+
+
+class UserRepository(BaseRepository):
+    
 
 # ==========================================
 # CREATE - Neuen User anlegen
@@ -17,8 +97,7 @@ class UserRepository:
         """Erstellt einen neuen User"""
         user = User(username=username, email=email, password_hash=password_hash)
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        self._commit()
         return user
     
 
@@ -53,8 +132,7 @@ class UserRepository:
         if user:
             for key, value in kwargs.items():
                 setattr(user, key, value)
-            self.db.commit()
-            self.db.refresh(user)
+            self._commit()
         return user
     
 # ==========================================
@@ -65,14 +143,12 @@ class UserRepository:
         user = self.get_by_id(user_id)
         if user:
             self.db.delete(user)
-            self.db.commit()
+            self._commit()
             return True
         return False
 
 
-class AudioFileRepository:
-    def __init__(self, db: Session):
-        self.db = db
+class AudioFileRepository(BaseRepository):
     
     def create(self, user_id: int, filename: str, file_path: str, 
                file_size: int, sample_rate: int, duration: float,
@@ -89,10 +165,22 @@ class AudioFileRepository:
             watermark_type=watermark_type
         )
         self.db.add(audio)
-        self.db.commit()
-        self.db.refresh(audio)
+        self._commit()
         return audio
     
+    def create_many(self, entries: List[dict]) -> List[AudioFile]:
+        """
+        Erstellt mehrere AudioFile-Einträge mit einem einzigen Commit.
+        Die INSERTs werden gebündelt (insertmanyvalues), IDs sind direkt gesetzt.
+        
+        Args:
+            entries: Liste von dicts mit den Feldern von create()
+        """
+        audios = [AudioFile(**entry) for entry in entries]
+        self.db.add_all(audios)
+        self._commit()
+        return audios
+    
     def get_by_id(self, audio_id: int) -> Optional[AudioFile]:
         """Findet AudioFile nach ID"""
         return self.db.query(AudioFile).filter(AudioFile.id == audio_id).first()
@@ -101,18 +189,47 @@ class AudioFileRepository:
         """Gibt alle AudioFiles eines Users zurück"""
         return self.db.query(AudioFile).filter(AudioFile.user_id == user_id).all()
     
+    def list_page(self, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                  watermark_type: Optional[str] = None, created_from: Optional[datetime] = None,
+                  created_to: Optional[datetime] = None) -> Tuple[List[Any], Optional[str]]:
+        """
+        Gibt eine Seite der AudioFiles eines Users zurück (neueste zuerst).
+        Lädt nur die Spalten für Listen-Ansichten.
+        
+        Args:
+            user_id: ID des Users
+            limit: Einträge pro Seite (max. MAX_PAGE_SIZE)
+            cursor: next_cursor der vorherigen Seite
+            watermark_type: Optionaler Filter (z.B. "AudioSeal")
+            created_from: Optional, nur Einträge ab diesem Zeitpunkt
+            created_to: Optional, nur Einträge vor diesem Zeitpunkt
+            
+        Returns:
+            Tuple (rows, next_cursor) - next_cursor ist None auf der letzten Seite
+        """
+        query = self.db.query(AudioFile).filter(AudioFile.user_id == user_id)
+        if watermark_type:
+            query = query.filter(AudioFile.watermark_type == watermark_type)
+        
+        columns = (AudioFile.id, AudioFile.filename, AudioFile.has_watermark,
+                   AudioFile.watermark_type, AudioFile.duration, AudioFile.created_at)
+        return _keyset_page(query, AudioFile, columns, limit, cursor, created_from, created_to)
+    
     def get_all(self) -> List[AudioFile]:
         """Gibt alle AudioFiles zurück"""
         return self.db.query(AudioFile).all()
     
+    def path_in_use(self, file_path: str) -> bool:
+        """Prüft, ob ein Eintrag auf die Datei zeigt (gleichnamige Uploads teilen sich den Pfad)"""
+        return self.db.query(AudioFile.id).filter(AudioFile.file_path == file_path).first() is not None
+    
     def update(self, audio_id: int, **kwargs) -> Optional[AudioFile]:
         """Aktualisiert AudioFile-Daten"""
         audio = self.get_by_id(audio_id)
         if audio:
             for key, value in kwargs.items():
                 setattr(audio, key, value)
-            self.db.commit()
-            self.db.refresh(audio)
+            self._commit()
         return audio
     
     def delete(self, audio_id: int) -> bool:
@@ -120,14 +237,12 @@ class AudioFileRepository:
         audio = self.get_by_id(audio_id)
         if audio:
             self.db.delete(audio)
-            self.db.commit()
+            self._commit()
             return True
         return False
 
 
-class ManipulatedAudioFileRepository:
-    def __init__(self, db: Session):
-        self.db = db
+class ManipulatedAudioFileRepository(BaseRepository):
     
     def create(self, user_id: int, filename: str, file_path: str,
                file_size: int, sample_rate: int, duration: float,
@@ -145,16 +260,34 @@ class ManipulatedAudioFileRepository:
             sample_rate=sample_rate,
             duration=duration,
             manipulation_type=manipulation_type,
-            manipulation_parameters=json.dumps(manipulation_parameters),  # Dict -> JSON String
+            manipulation_parameters=json.dumps(manipulation_parameters, sort_keys=True),  # Dict -> JSON String, sortiert (Gruppierung in robustness_stats)
             had_watermark=had_watermark,
             watermark_type=watermark_type
         )
         
         self.db.add(manipulated_audio)
-        self.db.commit()
-        self.db.refresh(manipulated_audio)
+        self._commit()
         return manipulated_audio
     
+    def create_many(self, entries: List[dict]) -> List[ManipulatedAudioFile]:
+        """
+        Erstellt mehrere ManipulatedAudioFile-Einträge mit einem einzigen Commit.
+        
+        Args:
+            entries: Liste von dicts mit den Feldern von create()
+                     (manipulation_parameters als dict)
+        """
+        manipulated = [
+            ManipulatedAudioFile(**{
+                **entry,
+                'manipulation_parameters': json.dumps(entry.get('manipulation_parameters', {}), sort_keys=True)
+            })
+            for entry in entries
+        ]
+        self.db.add_all(manipulated)
+        self._commit()
+        return manipulated
+    
     def get_by_id(self, manipulated_id: int) -> Optional[ManipulatedAudioFile]:
         """Findet ManipulatedAudioFile nach ID"""
         return self.db.query(ManipulatedAudioFile).filter(
@@ -167,6 +300,46 @@ class ManipulatedAudioFileRepository:
             ManipulatedAudioFile.user_id == user_id
         ).order_by(ManipulatedAudioFile.created_at.desc()).all()
     
+    def list_page(self, user_id: int, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                  manipulation_type: Optional[str] = None, watermark_type: Optional[str] = None,
+                  created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                  include_parameters: bool = True) -> Tuple[List[Any], Optional[str]]:
+        """
+        Gibt eine Seite der ManipulatedAudioFiles eines Users zurück (neueste zuerst).
+        Lädt nur die Spalten für Listen-Ansichten.
+        
+        Args:
+            user_id: ID des Users
+            limit: Einträge pro Seite (max. MAX_PAGE_SIZE)
+            cursor: next_cursor der vorherigen Seite
+            manipulation_type: Optionaler Filter (z.B. "noise")
+            watermark_type: Optionaler Filter (z.B. "AudioSeal")
+            created_from: Optional, nur Einträge ab diesem Zeitpunkt
+            created_to: Optional, nur Einträge vor diesem Zeitpunkt
+            include_parameters: False lässt die Parameter-Spalte weg
+            
+        Returns:
+            Tuple (rows, next_cursor) - next_cursor ist None auf der letzten Seite
+        """
+        query = self.db.query(ManipulatedAudioFile).filter(ManipulatedAudioFile.user_id == user_id)
+        if manipulation_type:
+            query = query.filter(ManipulatedAudioFile.manipulation_type == manipulation_type)
+        if watermark_type:
+            query = query.filter(ManipulatedAudioFile.watermark_type == watermark_type)
+        
+        columns = [ManipulatedAudioFile.id, ManipulatedAudioFile.filename, ManipulatedAudioFile.file_size,
+                   ManipulatedAudioFile.duration, ManipulatedAudioFile.manipulation_type,
+                   ManipulatedAudioFile.created_at]
+        if include_parameters:
+            columns.append(ManipulatedAudioFile.manipulation_parameters)
+        return _keyset_page(query, ManipulatedAudioFile, columns, limit, cursor, created_from, created_to)
+    
+    def path_in_use(self, file_path: str) -> bool:
+        """Prüft, ob ein Eintrag auf die Datei zeigt"""
+        return self.db.query(ManipulatedAudioFile.id).filter(
+            ManipulatedAudioFile.file_path == file_path
+        ).first() is not None
+    
     def get_by_manipulation_type(self, user_id: int, manipulation_type: str) -> List[ManipulatedAudioFile]:
         """Gibt alle Dateien eines Users mit bestimmtem Manipulation-Typ zurück"""
         return self.db.query(ManipulatedAudioFile).filter(
@@ -185,6 +358,298 @@ class ManipulatedAudioFileRepository:
         manipulated = self.get_by_id(manipulated_id)
         if manipulated:
             self.db.delete(manipulated)
-            self.db.commit()
+            self._commit()
+            return True
+        return False
+
+
+class DetectionResultRepository(BaseRepository):
+    
+    def create(self, user_id: int, method: str, detected: bool,
+               audio_file_id: int = None, manipulated_audio_id: int = None,
+               confidence: float = None, bit_accuracy: float = None, message=None,
+               latency_ms: float = None, model_version: str = None) -> DetectionResult:
+        """Speichert ein Detection-Ergebnis"""
+        result = DetectionResult(
+            user_id=user_id,
+            audio_file_id=audio_file_id,
+            manipulated_audio_id=manipulated_audio_id,
+            method=method,
+            detected=detected,
+            confidence=confidence,
+            bit_accuracy=bit_accuracy,
+            message=json.dumps(message) if message is not None else None,  # Liste -> JSON String
+            latency_ms=latency_ms,
+            model_version=model_version
+        )
+        self.db.add(result)
+        self._commit()
+        return result
+    
+    def create_many(self, entries: List[dict]) -> List[DetectionResult]:
+        """
+        Speichert mehrere Detection-Ergebnisse mit einem einzigen Commit.
+        
+        Args:
+            entries: Liste von dicts mit den Feldern von create()
+        """
+        results = [
+            DetectionResult(**{
+                **entry,
+                'message': json.dumps(entry['message']) if entry.get('message') is not None else None
+            })
+            for entry in entries
+        ]
+        self.db.add_all(results)
+        self._commit()
+        return results
+    
+    def get_by_audio_file(self, audio_file_id: int) -> List[DetectionResult]:
+        """Gibt alle Detection-Ergebnisse einer AudioFile zurück"""
+        return self.db.query(DetectionResult).filter(
+            DetectionResult.audio_file_id == audio_file_id
+        ).all()
+    
+    def get_by_manipulated(self, manipulated_audio_id: int) -> List[DetectionResult]:
+        """Gibt alle Detection-Ergebnisse einer manipulierten Datei zurück"""
+        return self.db.query(DetectionResult).filter(
+            DetectionResult.manipulated_audio_id == manipulated_audio_id
+        ).all()
+    
+    def robustness_stats(self, user_id: int, method: Optional[str] = None,
+                         manipulation_type: Optional[str] = None) -> List[Any]:
+        """
+        Aggregiert Detection-Ergebnisse per SQL GROUP BY über
+        (Methode, Manipulations-Typ, Parameter). Ergebnisse ohne manipulierte
+        Datei erscheinen mit manipulation_type None.
+        
+        Returns:
+            Zeilen mit method, manipulation_type, manipulation_parameters, count,
+            detection_rate (0-1), mean_confidence, mean_bit_accuracy, mean_latency_ms
+        """
+        detected_as_number = case((DetectionResult.detected.is_(True), 1.0), else_=0.0)
+        
+        query = self.db.query(
+            DetectionResult.method,
+            ManipulatedAudioFile.manipulation_type,
+            ManipulatedAudioFile.manipulation_parameters,
+            func.count(DetectionResult.id).label('count'),
+            func.avg(detected_as_number).label('detection_rate'),
+            func.avg(DetectionResult.confidence).label('mean_confidence'),
+            func.avg(DetectionResult.bit_accuracy).label('mean_bit_accuracy'),
+            func.avg(DetectionResult.latency_ms).label('mean_latency_ms')
+        ).outerjoin(
+            ManipulatedAudioFile, DetectionResult.manipulated_audio_id == ManipulatedAudioFile.id
+        ).filter(DetectionResult.user_id == user_id)
+        
+        if method:
+            query = query.filter(DetectionResult.method == method)
+        if manipulation_type:
+            query = query.filter(ManipulatedAudioFile.manipulation_type == manipulation_type)
+        
+        group = (DetectionResult.method, ManipulatedAudioFile.manipulation_type,
+                 ManipulatedAudioFile.manipulation_parameters)
+        return query.group_by(*group).order_by(*group).all()
+
+
+
+class UploadSessionRepository(BaseRepository):
+    
+    def create(self, session_id: str, user_id: int, filename: str, file_path: str,
+               total_size: int, chunk_size: int, expires_at: datetime,
+               sha256: Optional[str] = None) -> UploadSession:
+        """Legt eine neue Upload-Session an"""
+        upload = UploadSession(
+            id=session_id,
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            total_size=total_size,
+            chunk_size=chunk_size,
+            sha256=sha256,
+            status='open',
+            expires_at=expires_at
+        )
+        self.db.add(upload)
+        self._commit()
+        return upload
+    
+    def get_by_id(self, session_id: str) -> Optional[UploadSession]:
+        """Findet Upload-Session nach ID"""
+        return self.db.query(UploadSession).filter(UploadSession.id == session_id).first()
+    
+    def update(self, session_id: str, **kwargs) -> Optional[UploadSession]:
+        """Aktualisiert z.B. status und audio_file_id"""
+        upload = self.get_by_id(session_id)
+        if upload:
+            for key, value in kwargs.items():
+                setattr(upload, key, value)
+            self._commit()
+        return upload
+    
+    def record_chunk(self, session_id: str, chunk_index: int, size: int, sha256: str) -> bool:
+        """
+        Vermerkt einen geprüften Chunk. Derselbe Chunk darf mehrfach kommen
+        (Retry, parallele Wiederholung) - der letzte Hash gilt.
+        
+        Returns:
+            True, wenn der Chunk neu ist
+        """
+        existing = self.db.get(UploadChunk, (session_id, chunk_index))
+        if existing:
+            existing.size, existing.sha256 = size, sha256
+            self._commit()
+            return False
+        
+        self.db.add(UploadChunk(session_id=session_id, chunk_index=chunk_index, size=size, sha256=sha256))
+        try:
+            self._commit()
+        except IntegrityError:
+            # Paralleler Request hat denselben Chunk gerade eingetragen
+            self.db.rollback()
+            return False
+        return True
+    
+    def forget_chunk(self, session_id: str, chunk_index: int) -> None:
+        """Chunk gilt wieder als fehlend (Bereich wird gerade überschrieben oder ist ungültig)"""
+        self.db.query(UploadChunk).filter(
+            UploadChunk.session_id == session_id,
+            UploadChunk.chunk_index == chunk_index
+        ).delete()
+        self._commit()
+    
+    def received_chunks(self, session_id: str) -> List[Tuple[int, int]]:
+        """(chunk_index, size) aller empfangenen Chunks, aufsteigend"""
+        with stage_timer('db_query'):
+            return self.db.query(UploadChunk.chunk_index, UploadChunk.size).filter(
+                UploadChunk.session_id == session_id
+            ).order_by(UploadChunk.chunk_index).all()
+    
+    def delete(self, session_id: str) -> bool:
+        """Löscht Session samt Chunk-Einträgen"""
+        upload = self.get_by_id(session_id)
+        if upload:
+            self.db.query(UploadChunk).filter(UploadChunk.session_id == session_id).delete()
+            self.db.delete(upload)
+            self._commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+
+class IdempotencyKeyRepository(BaseRepository):
+    """
+    Reservierungen und Ergebnisse von Idempotency-Keys. Alle Zustandswechsel
+    sind bedingte Updates auf (Key, expires_at), damit bei mehreren Workern
+    genau ein Request einen Key besitzt.
+    """
+    
+    def _filter(self, user_id: int, endpoint: str, key: str):
+        return self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.endpoint == endpoint,
+            IdempotencyKey.key == key
+        )
+    
+    def get(self, user_id: int, endpoint: str, key: str) -> Optional[IdempotencyKey]:
+        """Findet einen Key"""
+        return self.db.get(IdempotencyKey, (user_id, endpoint, key))
+    
+    def reserve(self, user_id: int, endpoint: str, key: str, request_hash: str,
+                expires_at: datetime) -> Tuple[IdempotencyKey, bool]:
+        """
+        Legt den Key als 'processing' an, falls es ihn noch nicht gibt.
+        
+        Returns:
+            (Eintrag, True wenn neu angelegt) - bei False gehört der Key einem
+            anderen Request oder enthält schon ein Ergebnis
+        """
+        existing = self.get(user_id, endpoint, key)
+        if existing:
+            return existing, False
+        
+        record = IdempotencyKey(
+            user_id=user_id,
+            endpoint=endpoint,
+            key=key,
+            request_hash=request_hash,
+            status='processing',
+            expires_at=expires_at
+        )
+        self.db.add(record)
+        try:
+            self._commit()
+        except IntegrityError:
+            # Paralleler Request hat den Key gerade angelegt
+            self.db.rollback()
+            return self.get(user_id, endpoint, key), False
+        return record, True
+    
+    def take_over(self, record: IdempotencyKey, request_hash: str, expires_at: datetime) -> bool:
+        """
+        Übernimmt einen abgelaufenen oder verwaisten Key (Ergebnis-Datei
+        gelöscht, Worker abgestürzt) als neue Reservierung.
+        
+        Returns:
+            True, wenn kein anderer Request schneller war
+        """
+        updated = self._filter(record.user_id, record.endpoint, record.key).filter(
+            IdempotencyKey.status == record.status,
+            IdempotencyKey.expires_at == record.expires_at
+        ).update({
+            'request_hash': request_hash,
+            'status': 'processing',
+            'result_path': None,
+            'result_sha256': None,
+            'download_name': None,
+            'resource_id': None,
+            'created_at': datetime.utcnow(),
+            'expires_at': expires_at
+        }, synchronize_session=False)
+        self._commit()
+        return updated == 1
+    
+    def complete(self, user_id: int, endpoint: str, key: str, reserved_until: datetime,
+                 result_path: str, result_sha256: str, download_name: str,
+                 resource_id: Optional[int], expires_at: datetime) -> bool:
+        """
+        Speichert das Ergebnis einer Reservierung (reserved_until = deren expires_at).
+        
+        Returns:
+            False, wenn die Reservierung inzwischen übernommen wurde
+        """
+        updated = self._filter(user_id, endpoint, key).filter(
+            IdempotencyKey.status == 'processing',
+            IdempotencyKey.expires_at == reserved_until
+        ).update({
+            'status': 'completed',
+            'result_path': result_path,
+            'result_sha256': result_sha256,
+            'download_name': download_name,
+            'resource_id': resource_id,
+            'expires_at': expires_at
+        }, synchronize_session=False)
+        self._commit()
+        return updated == 1
+    
+    def release(self, user_id: int, endpoint: str, key: str, reserved_until: datetime) -> bool:
+        """Gibt eine Reservierung ohne Ergebnis frei (Request fehlgeschlagen)"""
+        deleted = self._filter(user_id, endpoint, key).filter(
+            IdempotencyKey.status == 'processing',
+            IdempotencyKey.expires_at == reserved_until
+        ).delete(synchronize_session=False)
+        self._commit()
+        return deleted == 1
+    
+    def purge_expired(self, now: Optional[datetime] = None) -> int:
+        """
+        Löscht abgelaufene Keys (TTL-Eviction).
+        
+        Returns:
+            Anzahl gelöschter Einträge
+        """
+        deleted = self.db.query(IdempotencyKey).filter(
+            IdempotencyKey.expires_at < (now or datetime.utcnow())
+        ).delete(synchronize_session=False)
+        self._commit()
+        return deleted
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+from sqlalchemy.orm import Session
+from services.metrics import stage_timer
+
+# Schlüssel in Session.info für die Verschachtelungstiefe
+_UOW_DEPTH_KEY = "unit_of_work_depth"
+
+
+def in_unit_of_work(db: Session) -> bool:
+    """True, solange ein unit_of_work()-Block auf dieser Session offen ist"""
+    return db.info.get(_UOW_DEPTH_KEY, 0) > 0
+
+
+@contextmanager
+def unit_of_work(db: Session):
+    """
+    Fasst alle Repository-Schreibzugriffe im Block zu einer Transaktion zusammen.
+    Repositories flushen innerhalb des Blocks nur (IDs sind danach gesetzt),
+    committet wird einmal am Ende des äußersten Blocks. Bei einer Exception
+    wird alles zurückgerollt.
+
+    Usage:
+        with get_db() as db, unit_of_work(db):
+            repo = AudioFileRepository(db)
+            original = repo.create(...)
+            watermarked = repo.create(...)
+        # -> ein Commit für beide Einträge
+    """
+    depth = db.info.get(_UOW_DEPTH_KEY, 0)
+    db.info[_UOW_DEPTH_KEY] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            with stage_timer('db_commit'):
+                db.commit()
+    except Exception:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[_UOW_DEPTH_KEY] = depth
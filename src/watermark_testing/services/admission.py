@@ -0,0 +1,376 @@
+"""
+Admission Control für Embed und Detect: begrenzte Parallelität pro Route mit
+begrenzter Warteschlange.
+
+Jeder Request bekommt geschätzte Kosten in Sekunden Rechenzeit
+(Audiodauer aus dem Header × Faktor der Methode). Ist die Route ausgelastet,
+wartet er in der Queue. Ist die Queue voll -> 429, wartet er länger als
+ADMISSION_MAX_WAIT_S -> 503, jeweils mit Retry-After aus der geschätzten
+offenen Arbeit.
+
+Die Queue arbeitet nach Größenklassen (Shortest Job First): Ein freier Platz
+geht an den Wartenden der günstigsten Kostenklasse, innerhalb einer Klasse in
+Ankunftsreihenfolge. Kurze TTS-Clips warten so nicht hinter langen Podcasts.
+Damit teure Requests nicht verhungern, rückt ein Wartender alle
+ADMISSION_AGING_S Sekunden eine Klasse vor (Aging).
+
+Damit eine 30-Minuten-Datei kurze Clips nicht aushungert, belegen teure
+Requests (Kosten >= ADMISSION_LONG_COST_S) höchstens slots - 1 Plätze, und
+wartende günstige Requests ziehen an wartenden teuren vorbei, für die gerade
+kein Platz frei ist.
+
+Die Grenzen gelten pro Worker-Prozess. Wartende Requests belegen einen
+Request-Thread, GUNICORN_THREADS sollte daher über der Summe der Slots liegen,
+sonst staut sich die Last vor dem Worker statt in der Queue.
+
+Umgebungsvariablen:
+    ADMISSION_EMBED_CONCURRENCY    parallele Embeds pro Worker (0 = keine Grenze)
+    ADMISSION_DETECT_CONCURRENCY   parallele Detections pro Worker (inkl. Batch)
+    ADMISSION_QUEUE_SIZE           wartende Requests pro Route
+    ADMISSION_MAX_WAIT_S           maximale Wartezeit in der Queue
+    ADMISSION_LONG_COST_S          ab diesen Kosten gilt ein Request als teuer
+    ADMISSION_SIZE_CLASSES         Klassengrenzen der Kosten in Sekunden, z.B. '0.5,5,30'
+    ADMISSION_AGING_S              Wartezeit, nach der ein Request eine Klasse vorrückt
+    ADMISSION_COST_FACTORS         Sekunden Rechenzeit pro Sekunde Audio je Methode,
+                                   z.B. 'audioseal=0.05,perth=0.2'
+                                   (messen mit benchmarks/watermark_benchmark.py)
+
+Usage:
+    ticket = admission.acquire('detect', admission.request_cost('audioseal', file.stream))
+    try:
+        ...
+    finally:
+        ticket.release()
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+from typing import Any, Dict, List, Tuple
+
+from services import metrics
+
+_THREADS = int(os.environ.get('GUNICORN_THREADS', 2))
+
+ADMISSION_EMBED_CONCURRENCY = int(os.environ.get('ADMISSION_EMBED_CONCURRENCY', max(1, _THREADS // 2)))
+ADMISSION_DETECT_CONCURRENCY = int(os.environ.get('ADMISSION_DETECT_CONCURRENCY', max(1, _THREADS // 2)))
+ADMISSION_QUEUE_SIZE = int(os.environ.get('ADMISSION_QUEUE_SIZE', 8))
+ADMISSION_MAX_WAIT_S = float(os.environ.get('ADMISSION_MAX_WAIT_S', 30))
+ADMISSION_LONG_COST_S = float(os.environ.get('ADMISSION_LONG_COST_S', 10))
+ADMISSION_AGING_S = float(os.environ.get('ADMISSION_AGING_S', 5))
+
+# Unbekannte Methoden und Fallback
+DEFAULT_COST_FACTOR = 0.1
+
+# Ohne lesbaren Header: Dauer aus der Größe schätzen (16 kHz, 16 bit, mono)
+FALLBACK_BYTES_PER_SECOND = 32000
+
+# Grenzen für Retry-After in Sekunden
+RETRY_AFTER_MIN_S = 1
+RETRY_AFTER_MAX_S = 300
+
+
+def _parse_cost_factors(value: str) -> Dict[str, float]:
+    factors = {}
+    for item in value.split(','):
+        name, _, factor = item.partition('=')
+        if name.strip() and factor.strip():
+            factors[name.strip().lower()] = float(factor)
+    return factors
+
+
+COST_FACTORS = _parse_cost_factors(os.environ.get('ADMISSION_COST_FACTORS', 'audioseal=0.05,perth=0.2'))
+
+# Klassengrenzen in Sekunden Rechenzeit; mit den Standardfaktoren für AudioSeal
+# etwa < 10 s, < 100 s, < 10 min und längeres Audio
+SIZE_CLASS_BOUNDS = tuple(sorted(
+    float(bound) for bound in os.environ.get('ADMISSION_SIZE_CLASSES', '0.5,5,30').split(',') if bound.strip()
+))
+SIZE_CLASSES = tuple(f'lt_{bound:g}s' for bound in SIZE_CLASS_BOUNDS) + (
+    f'ge_{SIZE_CLASS_BOUNDS[-1]:g}s' if SIZE_CLASS_BOUNDS else 'all',
+)
+
+
+def size_class(cost: float) -> int:
+    """Index der Größenklasse (0 = günstigste) für geschätzte Kosten"""
+    return bisect_right(SIZE_CLASS_BOUNDS, cost)
+
+
+class AdmissionRejected(Exception):
+    """Request wurde nicht zugelassen (429 Queue voll, 503 Wartezeit überschritten)"""
+
+    def __init__(self, route: str, status: int, reason: str, retry_after: int):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ==========================================
+# KOSTEN
+# ==========================================
+
+def estimate_duration(source) -> float:
+    """
+    Audiodauer in Sekunden, ohne die Datei zu dekodieren.
+
+    Args:
+        source: Dateipfad, seekbarer Stream (Position bleibt erhalten) oder Größe in Bytes
+
+    Returns:
+        float: Dauer aus dem Header (soundfile), sonst aus der Größe geschätzt
+    """
+    if isinstance(source, int):
+        return source / FALLBACK_BYTES_PER_SECOND
+
+    import soundfile as sf
+
+    if isinstance(source, str):
+        try:
+            return sf.info(source).duration
+        except Exception:
+            return os.path.getsize(source) / FALLBACK_BYTES_PER_SECOND
+
+    position = source.tell()
+    try:
+        return sf.info(source).duration
+    except Exception:
+        source.seek(0, os.SEEK_END)
+        return source.tell() / FALLBACK_BYTES_PER_SECOND
+    finally:
+        source.seek(position)
+
+
+def request_cost(method: str, source) -> float:
+    """Geschätzte Rechenzeit in Sekunden: Audiodauer × Faktor der Methode"""
+    return estimate_duration(source) * COST_FACTORS.get(method.lower(), DEFAULT_COST_FACTOR)
+
+
+# ==========================================
+# LIMITER
+# ==========================================
+
+class Ticket:
+    """Zulassung eines Requests; release() gibt den Platz frei (mehrfacher Aufruf ist harmlos)"""
+
+    __slots__ = ('limiter', 'cost', 'long', 'size_class', 'wait_s', '_released')
+
+    def __init__(self, limiter: 'RouteLimiter', cost: float, long: bool, wait_s: float = 0.0):
+        self.limiter = limiter
+        self.cost = cost
+        self.long = long
+        self.size_class = SIZE_CLASSES[size_class(cost)]
+        self.wait_s = wait_s
+        self._released = False
+        ADMISSION_WAIT.observe(wait_s, (limiter.route, self.size_class))
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.limiter._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class _Waiter:
+    __slots__ = ('cost', 'long', 'size_class', 'seq', 'enqueued', 'event', 'granted')
+
+    def __init__(self, cost: float, long: bool, seq: int):
+        self.cost = cost
+        self.long = long
+        self.size_class = size_class(cost)
+        self.seq = seq
+        self.enqueued = time.perf_counter()
+        self.event = threading.Event()
+        self.granted = False
+
+    def priority(self, now: float, aging_s: float) -> Tuple[float, int]:
+        """Kleiner = früher dran: Größenklasse minus Aging, bei Gleichstand Ankunft"""
+        aged = (now - self.enqueued) / aging_s if aging_s > 0 else 0.0
+        return self.size_class - aged, self.seq
+
+
+class RouteLimiter:
+    """Begrenzte Parallelität und Warteschlange einer Route"""
+
+    def __init__(self, route: str, slots: int, queue_size: int, max_wait_s: float, long_cost_s: float,
+                 aging_s: float = ADMISSION_AGING_S):
+        self.route = route
+        self.slots = slots
+        # Bei nur einem Slot gibt es nichts zu reservieren
+        self.long_slots = slots - 1 if slots > 1 else slots
+        self.queue_size = queue_size
+        self.max_wait_s = max_wait_s
+        self.long_cost_s = long_cost_s
+        self.aging_s = aging_s
+
+        self._lock = threading.Lock()
+        self._waiting: List[_Waiter] = []
+        self._running = 0
+        self._running_long = 0
+        self._running_cost = 0.0
+        self._seq = itertools.count()
+
+    def acquire(self, cost: float) -> Ticket:
+        """
+        Wartet auf einen freien Platz.
+
+        Raises:
+            AdmissionRejected: Queue voll (429) oder Wartezeit überschritten (503)
+        """
+        long = cost >= self.long_cost_s
+        with self._lock:
+            # Nach jedem _dispatch() kann kein Wartender laufen -> niemand wird überholt,
+            # der jetzt starten dürfte
+            if self._can_run(long):
+                self._start(cost, long)
+                return Ticket(self, cost, long)
+            if len(self._waiting) >= self.queue_size:
+                raise self._reject(429, 'queue_full', cost)
+            waiter = _Waiter(cost, long, next(self._seq))
+            self._waiting.append(waiter)
+
+        waiter.event.wait(self.max_wait_s)
+        with self._lock:
+            if not waiter.granted:
+                self._waiting.remove(waiter)
+                raise self._reject(503, 'timeout', cost)
+        return Ticket(self, cost, long, time.perf_counter() - waiter.enqueued)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            queued_by_class = dict.fromkeys(SIZE_CLASSES, 0)
+            for waiter in self._waiting:
+                queued_by_class[SIZE_CLASSES[waiter.size_class]] += 1
+            return {
+                'slots': self.slots,
+                'long_slots': self.long_slots,
+                'queue_size': self.queue_size,
+                'running': self._running,
+                'running_long': self._running_long,
+                'running_cost_s': round(self._running_cost, 3),
+                'queued': len(self._waiting),
+                'queued_cost_s': round(sum(w.cost for w in self._waiting), 3),
+                'queued_by_class': queued_by_class,
+            }
+
+    # Alle folgenden Methoden laufen unter self._lock
+
+    def _can_run(self, long: bool) -> bool:
+        if self.slots <= 0:
+            return True
+        return self._running < self.slots and (not long or self._running_long < self.long_slots)
+
+    def _start(self, cost: float, long: bool) -> None:
+        self._running += 1
+        self._running_long += long
+        self._running_cost += cost
+
+    def _release(self, ticket: Ticket) -> None:
+        with self._lock:
+            self._running -= 1
+            self._running_long -= ticket.long
+            self._running_cost -= ticket.cost
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Vergibt freie Plätze nach Priorität; wer gerade nicht darf (teuer), wird übersprungen"""
+        now = time.perf_counter()
+        while True:
+            runnable = [w for w in self._waiting if self._can_run(w.long)]
+            if not runnable:
+                return
+            waiter = min(runnable, key=lambda w: w.priority(now, self.aging_s))
+            self._waiting.remove(waiter)
+            self._start(waiter.cost, waiter.long)
+            waiter.granted = True
+            waiter.event.set()
+
+    def _reject(self, status: int, reason: str, cost: float) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc((self.route, SIZE_CLASSES[size_class(cost)], reason))
+        # Offene Arbeit verteilt auf die Slots
+        backlog = self._running_cost + sum(w.cost for w in self._waiting)
+        retry_after = math.ceil(backlog / max(1, self.slots))
+        return AdmissionRejected(self.route, status, reason,
+                                 min(RETRY_AFTER_MAX_S, max(RETRY_AFTER_MIN_S, retry_after)))
+
+
+_limiters: Dict[str, RouteLimiter] = {
+    route: RouteLimiter(route, slots, ADMISSION_QUEUE_SIZE, ADMISSION_MAX_WAIT_S, ADMISSION_LONG_COST_S)
+    for route, slots in (('embed', ADMISSION_EMBED_CONCURRENCY), ('detect', ADMISSION_DETECT_CONCURRENCY))
+}
+
+
+def acquire(route: str, cost: float) -> Ticket:
+    """Lässt einen Request der Route ('embed' oder 'detect') mit geschätzten Kosten zu"""
+    return _limiters[route].acquire(cost)
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    """Auslastung und Grenzen pro Route"""
+    return {route: limiter.snapshot() for route, limiter in _limiters.items()}
+
+
+# ==========================================
+# METRIKEN
+# ==========================================
+
+def _collect(*keys: str) -> Dict[Tuple[str, ...], float]:
+    values = {}
+    for route, snapshot in status().items():
+        for key in keys:
+            values[(route, key) if len(keys) > 1 else (route,)] = snapshot[key]
+    return values
+
+
+ADMISSION_WAIT = metrics.register(metrics.Histogram(
+    'watermark_admission_wait_seconds',
+    'Wartezeit zugelassener Requests in der Admission-Queue (0 = sofort zugelassen)',
+    ('route', 'size_class')
+))
+
+ADMISSION_REJECTED = metrics.register(metrics.Counter(
+    'watermark_admission_rejected_total',
+    'Abgewiesene Requests (queue_full = 429, timeout = 503)',
+    ('route', 'size_class', 'reason')
+))
+
+metrics.register(metrics.Gauge(
+    'watermark_admission_limit',
+    'Grenzen der Admission Control (slots, long_slots, queue_size; 0 = keine Grenze)',
+    ('route', 'limit'),
+    lambda: _collect('slots', 'long_slots', 'queue_size')
+))
+
+metrics.register(metrics.Gauge(
+    'watermark_admission_in_flight',
+    'Zugelassene, laufende Requests',
+    ('route',),
+    lambda: _collect('running')
+))
+
+metrics.register(metrics.Gauge(
+    'watermark_admission_in_flight_cost_seconds',
+    'Geschätzte Rechenzeit der laufenden Requests',
+    ('route',),
+    lambda: _collect('running_cost_s')
+))
+
+metrics.register(metrics.Gauge(
+    'watermark_admission_queued',
+    'Wartende Requests pro Größenklasse',
+    ('route', 'size_class'),
+    lambda: {
+        (route, name): count
+        for route, snapshot in status().items()
+        for name, count in snapshot['queued_by_class'].items()
+    }
+))
@@ -1,9 +1,11 @@
+import io
 import numpy as np
 import librosa
 import soundfile as sf
 from scipy import signal
 from typing import Tuple, Dict
 import os
+from services.metrics import stage_timer
 
 
 class AudioManipulationService:
@@ -27,6 +29,20 @@ class AudioManipulationService:
         # Audio laden
         audio, sr = librosa.load(audio_path, sr=None)
         
+        noisy_audio = AudioManipulationService.add_noise_array(audio, snr_db)
+        
+        # Speichern
+        sf.write(output_path, noisy_audio, sr)
+        
+        return {
+            'sample_rate': sr,
+            'duration': len(audio) / sr,
+            'parameters': {'snr_db': snr_db}
+        }
+    
+    @staticmethod
+    def add_noise_array(audio: np.ndarray, snr_db: float = 20) -> np.ndarray:
+        """Rauschen auf ein dekodiertes Signal (float32) addieren - ohne Datei-I/O"""
         # Signal-Power berechnen
         signal_power = np.mean(audio ** 2)
         
@@ -34,23 +50,16 @@ class AudioManipulationService:
         snr_linear = 10 ** (snr_db / 10)
         noise_power = signal_power / snr_linear
         
-        # Rauschen generieren
-        noise = np.random.normal(0, np.sqrt(noise_power), audio.shape)
+        # Rauschen generieren (float32 wie das Signal, statt float64-Temporaries)
+        noise = np.random.default_rng().standard_normal(audio.shape, dtype=np.float32)
+        noise *= np.sqrt(noise_power)
         
         # Rauschen hinzufügen
-        noisy_audio = audio + noise
+        noisy_audio = np.add(audio, noise, out=noise)
         
         # Clipping vermeiden
-        noisy_audio = np.clip(noisy_audio, -1.0, 1.0)
-        
-        # Speichern
-        sf.write(output_path, noisy_audio, sr)
-        
-        return {
-            'sample_rate': sr,
-            'duration': len(audio) / sr,
-            'parameters': {'snr_db': snr_db}
-        }
+        np.clip(noisy_audio, -1.0, 1.0, out=noisy_audio)
+        return noisy_audio
     
     @staticmethod
     def apply_compression(audio_path: str, output_path: str, bitrate: int = 128) -> Dict:
@@ -65,21 +74,51 @@ class AudioManipulationService:
         Returns:
             Dict mit Metadaten
         """
-        # Nutze pydub für MP3-Encoding
-        from pydub import AudioSegment
+        # Kanäle behalten (mono=False liefert (channels, frames)) -> (frames, channels)
+        audio, sr = librosa.load(audio_path, sr=None, mono=False)
+        audio = audio.T if audio.ndim > 1 else audio
         
-        audio = AudioSegment.from_file(audio_path)
-        audio.export(output_path, format="mp3", bitrate=f"{bitrate}k")
-        
-        # Metadaten
-        audio_reloaded, sr = librosa.load(output_path, sr=None)
+        # Gleiche Encode-/Decode-Schritte wie apply_compression_array, zusätzlich MP3 ablegen
+        encoded = AudioManipulationService._encode_mp3(audio, sr, bitrate)
+        with open(output_path, 'wb') as f:
+            f.write(encoded.getbuffer())
+        compressed = AudioManipulationService._decode_mp3(encoded)
         
         return {
             'sample_rate': sr,
-            'duration': len(audio_reloaded) / sr,
+            'duration': len(compressed) / sr,
             'parameters': {'bitrate_kbps': bitrate}
         }
     
+    @staticmethod
+    def apply_compression_array(audio: np.ndarray, sr: int, bitrate: int = 128) -> np.ndarray:
+        """
+        MP3-Roundtrip im Speicher (Encode per ffmpeg, Decode per libsndfile).
+        Mono (frames,) oder mehrkanalig (frames, channels) - das Layout bleibt erhalten.
+        """
+        encoded = AudioManipulationService._encode_mp3(audio, sr, bitrate)
+        return AudioManipulationService._decode_mp3(encoded)
+    
+    @staticmethod
+    def _encode_mp3(audio: np.ndarray, sr: int, bitrate: int) -> io.BytesIO:
+        """Kodiert ein dekodiertes Signal (float32, (frames,) oder (frames, channels)) als MP3 im Speicher"""
+        from pydub import AudioSegment
+        
+        channels = 1 if audio.ndim == 1 else audio.shape[1]
+        # Zeilenweise (C-Order) = Frames mit verschachtelten Kanälen, wie PCM es erwartet
+        pcm = np.ascontiguousarray((np.clip(audio, -1.0, 1.0) * 32767).astype('<i2'))
+        segment = AudioSegment(pcm.tobytes(), frame_rate=sr, sample_width=2, channels=channels)
+        encoded = io.BytesIO()
+        segment.export(encoded, format="mp3", bitrate=f"{bitrate}k")
+        return encoded
+    
+    @staticmethod
+    def _decode_mp3(encoded: io.BytesIO) -> np.ndarray:
+        """MP3 -> float32, mono als (frames,), sonst (frames, channels)"""
+        encoded.seek(0)
+        decoded, _ = sf.read(encoded, dtype='float32')
+        return decoded
+    
     @staticmethod
     def apply_gain(audio_path: str, output_path: str, gain_db: float = 0) -> Dict:
         """
@@ -95,14 +134,7 @@ class AudioManipulationService:
         """
         audio, sr = librosa.load(audio_path, sr=None)
         
-        # dB zu linear
-        gain_linear = 10 ** (gain_db / 20)
-        
-        # Gain anwenden
-        gained_audio = audio * gain_linear
-        
-        # Clipping vermeiden
-        gained_audio = np.clip(gained_audio, -1.0, 1.0)
+        gained_audio = AudioManipulationService.apply_gain_array(audio, gain_db)
         
         sf.write(output_path, gained_audio, sr)
         
@@ -112,6 +144,18 @@ class AudioManipulationService:
             'parameters': {'gain_db': gain_db}
         }
     
+    @staticmethod
+    def apply_gain_array(audio: np.ndarray, gain_db: float = 0) -> np.ndarray:
+        """Gain auf ein dekodiertes Signal anwenden - ohne Datei-I/O"""
+        # dB zu linear
+        gain_linear = 10 ** (gain_db / 20)
+        
+        # Gain anwenden
+        gained_audio = audio * gain_linear
+        
+        # Clipping vermeiden
+        return np.clip(gained_audio, -1.0, 1.0)
+    
     @staticmethod
     def resample_audio(audio_path: str, output_path: str, target_sr: int = 16000) -> Dict:
         """
@@ -128,7 +172,7 @@ class AudioManipulationService:
         audio, original_sr = librosa.load(audio_path, sr=None)
         
         # Resample
-        resampled = librosa.resample(audio, orig_sr=original_sr, target_sr=target_sr)
+        resampled = AudioManipulationService.resample_array(audio, original_sr, target_sr)
         
         sf.write(output_path, resampled, target_sr)
         
@@ -141,6 +185,11 @@ class AudioManipulationService:
             }
         }
     
+    @staticmethod
+    def resample_array(audio: np.ndarray, sr: int, target_sr: int = 16000) -> np.ndarray:
+        """Dekodiertes Signal resamplen - ohne Datei-I/O"""
+        return librosa.resample(audio, orig_sr=sr, target_sr=target_sr)
+    
     @staticmethod
     def apply_lowpass(audio_path: str, output_path: str, cutoff: float = 3000) -> Dict:
         """
@@ -156,12 +205,7 @@ class AudioManipulationService:
         """
         audio, sr = librosa.load(audio_path, sr=None)
         
-        # Butterworth Lowpass Filter
-        nyquist = sr / 2
-        normalized_cutoff = cutoff / nyquist
-        b, a = signal.butter(5, normalized_cutoff, btype='low')
-        
-        filtered = signal.filtfilt(b, a, audio)
+        filtered = AudioManipulationService.apply_lowpass_array(audio, sr, cutoff)
         
         sf.write(output_path, filtered, sr)
         
@@ -171,6 +215,15 @@ class AudioManipulationService:
             'parameters': {'cutoff_hz': cutoff}
         }
     
+    @staticmethod
+    def apply_lowpass_array(audio: np.ndarray, sr: int, cutoff: float = 3000) -> np.ndarray:
+        """Butterworth-Lowpass (zero-phase) auf ein dekodiertes Signal - ohne Datei-I/O"""
+        nyquist = sr / 2
+        normalized_cutoff = cutoff / nyquist
+        b, a = signal.butter(5, normalized_cutoff, btype='low')
+        
+        return signal.filtfilt(b, a, audio)
+    
     @staticmethod
     def apply_highpass(audio_path: str, output_path: str, cutoff: float = 300) -> Dict:
         """
@@ -186,12 +239,7 @@ class AudioManipulationService:
         """
         audio, sr = librosa.load(audio_path, sr=None)
         
-        # Butterworth Highpass Filter
-        nyquist = sr / 2
-        normalized_cutoff = cutoff / nyquist
-        b, a = signal.butter(5, normalized_cutoff, btype='high')
-        
-        filtered = signal.filtfilt(b, a, audio)
+        filtered = AudioManipulationService.apply_highpass_array(audio, sr, cutoff)
         
         sf.write(output_path, filtered, sr)
         
@@ -201,6 +249,15 @@ class AudioManipulationService:
             'parameters': {'cutoff_hz': cutoff}
         }
     
+    @staticmethod
+    def apply_highpass_array(audio: np.ndarray, sr: int, cutoff: float = 300) -> np.ndarray:
+        """Butterworth-Highpass (zero-phase) auf ein dekodiertes Signal - ohne Datei-I/O"""
+        nyquist = sr / 2
+        normalized_cutoff = cutoff / nyquist
+        b, a = signal.butter(5, normalized_cutoff, btype='high')
+        
+        return signal.filtfilt(b, a, audio)
+    
     @staticmethod
     def time_stretch(audio_path: str, output_path: str, rate: float = 1.0) -> Dict:
         """
@@ -217,7 +274,7 @@ class AudioManipulationService:
         audio, sr = librosa.load(audio_path, sr=None)
         
         # Time-Stretch
-        stretched = librosa.effects.time_stretch(audio, rate=rate)
+        stretched = AudioManipulationService.time_stretch_array(audio, rate)
         
         sf.write(output_path, stretched, sr)
         
@@ -227,6 +284,11 @@ class AudioManipulationService:
             'parameters': {'rate': rate}
         }
     
+    @staticmethod
+    def time_stretch_array(audio: np.ndarray, rate: float = 1.0) -> np.ndarray:
+        """Phase-Vocoder-Time-Stretch auf ein dekodiertes Signal - ohne Datei-I/O"""
+        return librosa.effects.time_stretch(audio, rate=rate)
+    
     @staticmethod
     def pitch_shift(audio_path: str, output_path: str, n_steps: float = 0) -> Dict:
         """
@@ -240,17 +302,29 @@ class AudioManipulationService:
         Returns:
             Dict mit Metadaten
         """
+        audio, sr = librosa.load(audio_path, sr=None)
+        shifted = AudioManipulationService.pitch_shift_array(audio, sr, n_steps)
+    
+        sf.write(output_path, shifted, sr)
+        
+        return {
+            'sample_rate': sr,
+            'duration': len(audio) / sr,
+            'parameters': {'n_steps': n_steps}
+        }
+    
+    @staticmethod
+    def pitch_shift_array(audio: np.ndarray, sr: int, n_steps: float = 0) -> np.ndarray:
+        """Pitch-Shift auf ein dekodiertes Signal - ohne Datei-I/O"""
         try:
             # Versuch 1: pyrubberband (beste Qualität)
             import pyrubberband as pyrb
-            audio, sr = librosa.load(audio_path, sr=None)
-            shifted = pyrb.pitch_shift(audio, sr, n_steps)
+            return pyrb.pitch_shift(audio, sr, n_steps)
             
         except ImportError:
             # Fallback: librosa mit besten Parametern
             print("⚠️ pyrubberband nicht installiert - nutze librosa (schlechtere Qualität)")
-            audio, sr = librosa.load(audio_path, sr=None)
-            shifted = librosa.effects.pitch_shift(
+            return librosa.effects.pitch_shift(
                 audio, 
                 sr=sr, 
                 n_steps=n_steps,
@@ -260,14 +334,6 @@ class AudioManipulationService:
                 res_type='kaiser_best'
             )
     
-        sf.write(output_path, shifted, sr)
-        
-        return {
-            'sample_rate': sr,
-            'duration': len(audio) / sr,
-            'parameters': {'n_steps': n_steps}
-        }
-    
     @staticmethod
     def apply_manipulation(manipulation_type: str, audio_path: str, 
                           output_path: str, parameters: dict) -> Dict:
@@ -313,4 +379,5 @@ class AudioManipulationService:
         if manipulation_type not in manipulation_map:
             raise ValueError(f"Unknown manipulation type: {manipulation_type}")
         
-        return manipulation_map[manipulation_type]()
\ No newline at end of file
+        with stage_timer('manipulation'):
+            return manipulation_map[manipulation_type]()
\ No newline at end of file
@@ -1,7 +1,17 @@
 import os
-import librosa
-from typing import Tuple
+import hashlib
+import tarfile
+import threading
+import zipfile
+import uuid
+from collections import OrderedDict
+from typing import Tuple, Iterator, BinaryIO
 from pathlib import Path
+from services.metrics import stage_timer
+
+
+class BatchTooLarge(ValueError):
+    """Gesamtgröße eines Batches über AudioService.MAX_BATCH_SIZE (API: 413)"""
 
 
 class AudioService:
@@ -16,6 +26,63 @@ class AudioService:
     # Maximale Dateigröße (in Bytes) - 100MB
     MAX_FILE_SIZE = 100 * 1024 * 1024
     
+    # Erlaubte Archiv-Formate für Batch-Uploads
+    ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2')
+    
+    # Maximale Anzahl Audio-Dateien pro Batch
+    MAX_BATCH_FILES = 500
+    
+    # Maximale Gesamtgröße eines Batches (Uploads + entpackte Archiv-Einträge) - Standard 1GB
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE_MB', 1024)) * 1024 * 1024
+    
+    # Blockgröße beim Kopieren von Streams
+    COPY_CHUNK_SIZE = 1024 * 1024
+    
+    # Cache für Content-Hashes: Pfad -> (mtime_ns, size, sha256)
+    HASH_CACHE_SIZE = 4096
+    _hash_cache: 'OrderedDict[str, Tuple[int, int, str]]' = OrderedDict()
+    _hash_lock = threading.Lock()
+    
+    @staticmethod
+    def validate_filename(filename: str) -> None:
+        """
+        Prüft Dateiname und Extension.
+        
+        Raises:
+            ValueError: Bei leerem Namen oder ungültigem Format
+        """
+        if not filename:
+            raise ValueError("Dateiname ist leer")
+        
+        file_ext = Path(filename).suffix.lower()
+        if file_ext not in AudioService.ALLOWED_EXTENSIONS:
+            allowed = ', '.join(AudioService.ALLOWED_EXTENSIONS)
+            raise ValueError(f"Ungültiges Dateiformat '{file_ext}'. Erlaubt: {allowed}")
+    
+    @staticmethod
+    def validate_file_size(file_size: int) -> None:
+        """
+        Prüft die Dateigröße gegen MAX_FILE_SIZE.
+        
+        Raises:
+            ValueError: Bei zu großer Datei
+        """
+        if file_size > AudioService.MAX_FILE_SIZE:
+            max_mb = AudioService.MAX_FILE_SIZE / (1024 * 1024)
+            raise ValueError(f"Datei zu groß ({file_size / (1024 * 1024):.1f}MB). Maximum: {max_mb}MB")
+    
+    @staticmethod
+    def validate_batch_size(total_size: int) -> None:
+        """
+        Prüft die Gesamtgröße eines Batches gegen MAX_BATCH_SIZE.
+        
+        Raises:
+            BatchTooLarge: Bei zu großem Batch
+        """
+        if total_size > AudioService.MAX_BATCH_SIZE:
+            max_mb = AudioService.MAX_BATCH_SIZE / (1024 * 1024)
+            raise BatchTooLarge(f"Batch zu groß ({total_size / (1024 * 1024):.1f}MB). Maximum: {max_mb}MB")
+    
     @staticmethod
     def validate_audio_file(file) -> None:
         """
@@ -27,24 +94,23 @@ class AudioService:
         Raises:
             ValueError: Bei ungültigem Format oder zu großer Datei
         """
-        # Dateiname prüfen
-        if not file.filename:
-            raise ValueError("Dateiname ist leer")
+        # Dateiname + Extension prüfen
+        AudioService.validate_filename(file.filename)
         
-        # Extension prüfen
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in AudioService.ALLOWED_EXTENSIONS:
-            allowed = ', '.join(AudioService.ALLOWED_EXTENSIONS)
-            raise ValueError(f"Ungültiges Dateiformat '{file_ext}'. Erlaubt: {allowed}")
+        # Beim Streaming-Upload (services/upload_stream.py) sind Größe und
+        # Format schon beim Schreiben geprüft worden
+        stream = file.stream
+        if hasattr(stream, 'commit'):
+            if stream.format is None:
+                raise ValueError("Datei ist keine unterstützte Audio-Datei")
+            return
         
         # Größe prüfen (wenn verfügbar)
         file.seek(0, os.SEEK_END)
         file_size = file.tell()
         file.seek(0)  # Zurück zum Anfang
         
-        if file_size > AudioService.MAX_FILE_SIZE:
-            max_mb = AudioService.MAX_FILE_SIZE / (1024 * 1024)
-            raise ValueError(f"Datei zu groß ({file_size / (1024 * 1024):.1f}MB). Maximum: {max_mb}MB")
+        AudioService.validate_file_size(file_size)
     
     @staticmethod
     def get_audio_metadata(file_path: str) -> dict:
@@ -60,10 +126,20 @@ class AudioService:
         Raises:
             ValueError: Bei Fehler beim Lesen der Datei
         """
+        # Erst hier importieren (schwere Abhängigkeiten, API-Start bleibt schnell)
+        import soundfile as sf
+        
         try:
-            # Audio laden
-            audio_data, sample_rate = librosa.load(file_path, sr=None)
-            duration = librosa.get_duration(y=audio_data, sr=sample_rate)
+            with stage_timer('metadata'):
+                try:
+                    # Nur Header lesen statt das ganze Signal zu dekodieren
+                    info = sf.info(file_path)
+                    sample_rate, duration = info.samplerate, info.frames / info.samplerate
+                except RuntimeError:
+                    # Formate ohne libsndfile-Support (z.B. m4a): dekodieren
+                    import librosa
+                    audio_data, sample_rate = librosa.load(file_path, sr=None)
+                    duration = librosa.get_duration(y=audio_data, sr=sample_rate)
             file_size = os.path.getsize(file_path)
             
             return {
@@ -98,7 +174,199 @@ class AudioService:
         # Pfad erstellen
         filepath = os.path.join(upload_folder, filename)
         
-        # Speichern
-        file.save(filepath)
+        AudioService.store_upload(file, filepath)
+        
+        return filename, filepath
+    
+    @staticmethod
+    def store_upload(file, filepath: str) -> None:
+        """
+        Legt einen (validierten) Upload unter `filepath` ab. Streaming- und
+        Chunk-Uploads liegen schon im Upload-Ordner und werden nur umbenannt;
+        ein bereits bekannter SHA-256 landet direkt im ETag-Cache.
+        
+        Args:
+            file: Werkzeug FileStorage Objekt
+            filepath: Zielpfad
+        """
+        with stage_timer('save_upload'):
+            commit = getattr(file.stream, 'commit', None)
+            if commit is None:
+                file.save(filepath)
+                return
+            digest = commit(filepath)
+        
+        if digest is None:
+            return
+        stat = os.stat(filepath)
+        AudioService._remember_hash(filepath, (stat.st_mtime_ns, stat.st_size), digest)
+    
+    @staticmethod
+    def save_stream(stream: BinaryIO, filename: str, upload_folder: str) -> Tuple[str, str]:
+        """
+        Speichert einen (nicht seekbaren) Stream blockweise als Datei.
+        Bricht ab, sobald MAX_FILE_SIZE überschritten wird.
+        
+        Der gespeicherte Name bekommt ein eindeutiges Präfix: Archiv-Einträge
+        wie a/x.wav und b/x.wav landen sonst beide in <upload_folder>/x.wav
+        und überschreiben sich, bevor der Batch detektiert ist.
+        
+        Args:
+            stream: Lesbarer Binär-Stream (z.B. Archiv-Eintrag)
+            filename: Ursprünglicher Dateiname
+            upload_folder: Zielordner
+            
+        Returns:
+            Tuple (filename, filepath) - filename ohne Präfix (für AudioFile.filename)
+            
+        Raises:
+            ValueError: Bei ungültigem Format oder zu großer Datei
+        """
+        # Sichere Dateinamen (Path-Traversal verhindern)
+        filename = os.path.basename(filename)
+        AudioService.validate_filename(filename)
+        
+        filepath = os.path.join(upload_folder, f"{uuid.uuid4().hex}_{filename}")
+        written = 0
+        try:
+            with stage_timer('save_upload'), open(filepath, 'wb') as target:
+                while True:
+                    chunk = stream.read(AudioService.COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    AudioService.validate_file_size(written)
+                    target.write(chunk)
+        except ValueError:
+            os.remove(filepath)
+            raise
         
-        return filename, filepath
\ No newline at end of file
+        return filename, filepath
+    
+    @staticmethod
+    def is_archive(filename: str) -> bool:
+        """Prüft ob der Dateiname auf ein unterstütztes Archiv-Format endet"""
+        return bool(filename) and filename.lower().endswith(AudioService.ARCHIVE_EXTENSIONS)
+    
+    @staticmethod
+    def _is_archive_audio_entry(name: str) -> bool:
+        """Verzeichnis-Metadaten und versteckte Dateien (z.B. __MACOSX, .DS_Store) überspringen"""
+        basename = os.path.basename(name)
+        return bool(basename) and not basename.startswith('.') and '__MACOSX' not in name
+    
+    @staticmethod
+    def declared_archive_size(file) -> int:
+        """
+        Summe der entpackten Größen aller Audio-Einträge laut ZIP-Inhaltsverzeichnis
+        (zipfile liest nie mehr als die angegebene Größe). TAR hat kein
+        Inhaltsverzeichnis -> 0, dort prüft iter_archive_entries() beim Lesen.
+        
+        Raises:
+            ValueError: Bei ungültigem ZIP-Archiv
+        """
+        if not file.filename.lower().endswith('.zip'):
+            return 0
+        try:
+            with zipfile.ZipFile(file.stream) as archive:
+                return sum(info.file_size for info in archive.infolist()
+                           if not info.is_dir() and AudioService._is_archive_audio_entry(info.filename))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Ungültiges ZIP-Archiv: {e}")
+        finally:
+            file.stream.seek(0)
+    
+    @staticmethod
+    def iter_archive_entries(file, used_size: int = 0) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        Liefert die Audio-Einträge eines ZIP/TAR-Archivs nacheinander als Stream.
+        Das Archiv wird nicht komplett entpackt - jeder Eintrag wird erst beim
+        Lesen dekomprimiert. Verzeichnisse und versteckte Dateien werden übersprungen.
+        
+        Args:
+            file: Werkzeug FileStorage Objekt mit dem Archiv
+            used_size: Bereits belegter Teil von MAX_BATCH_SIZE (z.B. weitere Uploads im Batch)
+            
+        Yields:
+            Tuple (entry_name, stream)
+            
+        Raises:
+            ValueError: Bei ungültigem Archiv oder zu vielen Einträgen
+            BatchTooLarge: Wenn die entpackten Einträge MAX_BATCH_SIZE überschreiten
+                (ZIP vor dem ersten Eintrag, TAR vor dem Eintrag, der das Limit überschreitet)
+        """
+        count = 0
+        
+        def accept(name: str) -> bool:
+            nonlocal count
+            if not AudioService._is_archive_audio_entry(name):
+                return False
+            count += 1
+            if count > AudioService.MAX_BATCH_FILES:
+                raise ValueError(f"Zu viele Dateien im Archiv. Maximum: {AudioService.MAX_BATCH_FILES}")
+            return True
+        
+        if file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile as e:
+                raise ValueError(f"Ungültiges ZIP-Archiv: {e}")
+            with archive:
+                infos = [info for info in archive.infolist() if not info.is_dir() and accept(info.filename)]
+                AudioService.validate_batch_size(used_size + sum(info.file_size for info in infos))
+                for info in infos:
+                    with archive.open(info) as entry:
+                        yield info.filename, entry
+        else:
+            try:
+                # 'r|*' = reiner Stream-Modus, liest das Archiv genau einmal sequentiell
+                archive = tarfile.open(fileobj=file.stream, mode='r|*')
+            except tarfile.TarError as e:
+                raise ValueError(f"Ungültiges TAR-Archiv: {e}")
+            with archive:
+                for member in archive:
+                    if not member.isfile() or not accept(member.name):
+                        continue
+                    used_size += member.size
+                    AudioService.validate_batch_size(used_size)
+                    yield member.name, archive.extractfile(member)
+
+    
+    @staticmethod
+    def content_hash(file_path: str) -> str:
+        """
+        SHA-256 des Dateiinhalts (z.B. als starkes ETag für Downloads).
+        Wird pro Prozess gecacht und nur neu berechnet, wenn sich
+        Änderungszeit oder Größe der Datei ändern.
+        
+        Args:
+            file_path: Pfad zur Datei
+            
+        Returns:
+            Hex-Digest
+        """
+        stat = os.stat(file_path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        
+        with AudioService._hash_lock:
+            cached = AudioService._hash_cache.get(file_path)
+            if cached and cached[:2] == key:
+                AudioService._hash_cache.move_to_end(file_path)
+                return cached[2]
+        
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(AudioService.COPY_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        hex_digest = digest.hexdigest()
+        
+        AudioService._remember_hash(file_path, key, hex_digest)
+        return hex_digest
+    
+    @staticmethod
+    def _remember_hash(file_path: str, key: Tuple[int, int], hex_digest: str) -> None:
+        """Legt einen Hash mit (mtime_ns, size) im LRU-Cache ab"""
+        with AudioService._hash_lock:
+            AudioService._hash_cache[file_path] = (*key, hex_digest)
+            AudioService._hash_cache.move_to_end(file_path)
+            while len(AudioService._hash_cache) > AudioService.HASH_CACHE_SIZE:
+                AudioService._hash_cache.popitem(last=False)
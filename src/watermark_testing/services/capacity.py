@@ -0,0 +1,135 @@
+"""
+Kapazität einer Instanz für die Readiness-Prüfung (/ready).
+
+Erfasst pro Worker-Prozess die laufenden Requests und prüft die Ressourcen,
+ohne die keine Arbeit angenommen werden kann:
+    - in-flight Requests gegen die Request-Threads des Workers
+    - Accept-Queue des Listen-Sockets (wartende Verbindungen der ganzen Instanz, Linux)
+    - freier Speicherplatz im Upload-Ordner
+    - Erreichbarkeit der Datenbank
+
+Umgebungsvariablen:
+    READY_MAX_IN_FLIGHT      Ab so vielen laufenden Requests gilt der Worker als ausgelastet
+                             (Standard: GUNICORN_THREADS, 0 = keine Grenze)
+    READY_MAX_ACCEPT_QUEUE   Ab so vielen wartenden Verbindungen nicht bereit (0 = nur berichten)
+    READY_MIN_FREE_DISK_MB   Mindestens freier Platz in UPLOAD_FOLDER
+"""
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Any, Optional
+
+READY_MAX_IN_FLIGHT = int(os.environ.get('READY_MAX_IN_FLIGHT', os.environ.get('GUNICORN_THREADS', 0)))
+READY_MAX_ACCEPT_QUEUE = int(os.environ.get('READY_MAX_ACCEPT_QUEUE', 0))
+READY_MIN_FREE_DISK_MB = int(os.environ.get('READY_MIN_FREE_DISK_MB', 500))
+
+# Endpoints, die nicht als Arbeit zählen (Probes des Load-Balancers, Monitoring)
+PROBE_ENDPOINTS = {'health', 'ready', 'prometheus_metrics', 'static'}
+
+# TCP-Zustand LISTEN in /proc/net/tcp
+_TCP_LISTEN = '0A'
+
+
+class InFlightCounter:
+    """Thread-sicherer Zähler laufender Requests pro Endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+    def enter(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def exit(self, key: str) -> None:
+        with self._lock:
+            remaining = self._counts.get(key, 0) - 1
+            if remaining > 0:
+                self._counts[key] = remaining
+            else:
+                self._counts.pop(key, None)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+
+in_flight = InFlightCounter()
+
+
+def accept_queue(port: int) -> Optional[int]:
+    """
+    Länge der Accept-Queue des Listen-Sockets auf `port` (Linux, /proc/net/tcp).
+    Bei LISTEN-Sockets steht in rx_queue die Zahl der aufgebauten, aber noch
+    nicht per accept() abgeholten Verbindungen.
+
+    Returns:
+        int oder None (Socket nicht gefunden / kein Linux)
+    """
+    length = None
+    for table in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    local_port = int(fields[1].rsplit(':', 1)[1], 16)
+                    if fields[3] != _TCP_LISTEN or local_port != port:
+                        continue
+                    length = (length or 0) + int(fields[4].split(':')[1], 16)
+        except OSError:
+            continue
+    return length
+
+
+def check_in_flight() -> Dict[str, Any]:
+    total = in_flight.total
+    return {
+        'ok': READY_MAX_IN_FLIGHT <= 0 or total < READY_MAX_IN_FLIGHT,
+        'total': total,
+        'limit': READY_MAX_IN_FLIGHT or None,
+        'by_endpoint': in_flight.snapshot(),
+    }
+
+
+def check_accept_queue(port: int) -> Dict[str, Any]:
+    length = accept_queue(port)
+    return {
+        'ok': length is None or READY_MAX_ACCEPT_QUEUE <= 0 or length < READY_MAX_ACCEPT_QUEUE,
+        'length': length,
+        'limit': READY_MAX_ACCEPT_QUEUE or None,
+    }
+
+
+def check_disk(folder: str) -> Dict[str, Any]:
+    try:
+        usage = shutil.disk_usage(folder)
+    except OSError as e:
+        return {'ok': False, 'error': str(e)}
+    free_mb = usage.free // 2 ** 20
+    return {
+        'ok': free_mb >= READY_MIN_FREE_DISK_MB,
+        'free_mb': free_mb,
+        'total_mb': usage.total // 2 ** 20,
+        'min_free_mb': READY_MIN_FREE_DISK_MB,
+    }
+
+
+def check_database() -> Dict[str, Any]:
+    """Führt SELECT 1 über den Connection-Pool aus"""
+    from sqlalchemy import text
+    from database.database import engine
+
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+    except Exception as e:
+        return {'ok': False, 'error': str(e).splitlines()[0]}
+    return {'ok': True, 'latency_ms': round((time.perf_counter() - start) * 1000, 2)}
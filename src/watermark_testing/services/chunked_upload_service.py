@@ -0,0 +1,343 @@
+"""
+Resumable Uploads in Chunks für lange Aufnahmen.
+
+Ablauf:
+    1. create_session(): legt die Teil-Datei in voller Größe an (sparse) und
+       gibt upload_id und Chunk-Größe zurück
+    2. write_chunk(): schreibt einen Chunk per pwrite() direkt an seinen Offset,
+       prüft dabei den SHA-256 und vermerkt ihn in upload_chunks. Chunks dürfen
+       parallel, in beliebiger Reihenfolge und mehrfach kommen. Während eines
+       Retries und nach einem fehlgeschlagenen gilt der Chunk als fehlend
+    3. finalize(): prüft Vollständigkeit (und optional den Hash der ganzen
+       Datei) und übergibt die Datei an upload_audio_workflow. Da die Chunks
+       schon an der richtigen Stelle liegen, gibt es keinen Zusammenbau und
+       keine Kopie - die Teil-Datei wird nur umbenannt.
+
+Nach einem Verbindungsabbruch liefert status() die fehlenden Chunks, der
+Client schickt nur diese erneut.
+
+Umgebungsvariablen:
+    UPLOAD_CHUNK_SIZE      Chunk-Größe in Bytes (Standard: 8 MB)
+    UPLOAD_SESSION_TTL_S   Gültigkeit einer Session in Sekunden (Standard: 24 h)
+"""
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, BinaryIO, Optional
+
+from werkzeug.datastructures import FileStorage
+
+from database.models import UploadSession
+from database.repositories import UploadSessionRepository
+from services.audio_service import AudioService
+from services.upload_stream import MAGIC_BYTES, StoredUpload, sniff_audio_format
+
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+UPLOAD_SESSION_TTL_S = int(os.environ.get('UPLOAD_SESSION_TTL_S', 24 * 60 * 60))
+
+# Endung der Teil-Dateien (kein temp_-Präfix: der Reconciler würde sie nach
+# STORAGE_TEMP_TTL_S löschen, solange die Session noch läuft)
+PART_SUFFIX = '.part'
+
+
+class ChunkedUploadError(Exception):
+    """Fehler mit HTTP-Status (404, 403, 409, 410, 411, 415, ...)"""
+
+    def __init__(self, message: str, status: int = 400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ChunkedUploadService:
+    """Resumable Uploads: Session anlegen, Chunks schreiben, abschließen"""
+
+    def __init__(self, upload_repo: UploadSessionRepository):
+        self.upload_repo = upload_repo
+
+    # ==========================================
+    # SESSION
+    # ==========================================
+
+    def create_session(self, filename: str, total_size: int, user_id: int, upload_folder: str,
+                       sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Legt eine Upload-Session und die Teil-Datei an.
+
+        Args:
+            filename: Ursprünglicher Dateiname (Endung wird geprüft)
+            total_size: Größe der ganzen Datei in Bytes
+            user_id: ID des Users
+            upload_folder: Zielordner
+            sha256: Optional erwarteter Hash der ganzen Datei (wird bei finalize geprüft)
+
+        Returns:
+            dict: upload_id, chunk_size, chunk_count, expires_at
+
+        Raises:
+            ValueError: Bei ungültigem Namen, Größe oder Hash
+        """
+        filename = os.path.basename(filename or '')
+        AudioService.validate_filename(filename)
+        if not isinstance(total_size, int) or total_size <= 0:
+            raise ValueError("Ungültige Dateigröße")
+        AudioService.validate_file_size(total_size)
+        if sha256 is not None and not _is_sha256(sha256):
+            raise ValueError("sha256 muss ein Hex-Digest sein")
+
+        session_id = uuid.uuid4().hex
+        file_path = os.path.join(upload_folder, f"upload_{session_id}{PART_SUFFIX}")
+        # Volle Größe vorab (sparse), damit Chunks an beliebigen Offsets landen können
+        with open(file_path, 'wb') as f:
+            f.truncate(total_size)
+
+        upload = self.upload_repo.create(
+            session_id=session_id,
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            total_size=total_size,
+            chunk_size=UPLOAD_CHUNK_SIZE,
+            sha256=sha256.lower() if sha256 else None,
+            expires_at=datetime.utcnow() + timedelta(seconds=UPLOAD_SESSION_TTL_S)
+        )
+        return {
+            'upload_id': upload.id,
+            'filename': upload.filename,
+            'size': upload.total_size,
+            'chunk_size': upload.chunk_size,
+            'chunk_count': _chunk_count(upload),
+            'expires_at': upload.expires_at.isoformat()
+        }
+
+    def status(self, session_id: str, user_id: int) -> Dict[str, Any]:
+        """Empfangene und fehlende Chunks einer Session (zum Fortsetzen)"""
+        upload = self._get(session_id, user_id, require_open=False)
+        received = self.upload_repo.received_chunks(upload.id)
+        received_indices = {index for index, _ in received}
+        return {
+            'upload_id': upload.id,
+            'filename': upload.filename,
+            'status': upload.status,
+            'size': upload.total_size,
+            'chunk_size': upload.chunk_size,
+            'chunk_count': _chunk_count(upload),
+            'received_bytes': sum(size for _, size in received),
+            'received_chunks': sorted(received_indices),
+            'missing_chunks': [i for i in range(_chunk_count(upload)) if i not in received_indices],
+            'audio_id': upload.audio_file_id,
+            'expires_at': upload.expires_at.isoformat()
+        }
+
+    def abort(self, session_id: str, user_id: int) -> None:
+        """Bricht eine offene Session ab und löscht die Teil-Datei"""
+        upload = self._get(session_id, user_id)
+        if os.path.exists(upload.file_path):
+            os.remove(upload.file_path)
+        self.upload_repo.delete(upload.id)
+
+    # ==========================================
+    # CHUNKS
+    # ==========================================
+
+    def write_chunk(self, session_id: str, user_id: int, offset: int, stream: BinaryIO,
+                    content_length: Optional[int], sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Schreibt einen Chunk blockweise an seinen Offset (kein Puffern im Speicher).
+
+        Args:
+            session_id: upload_id
+            user_id: ID des Users
+            offset: Byte-Offset, Vielfaches der chunk_size
+            stream: Request-Body
+            content_length: Länge des Bodys (Pflicht)
+            sha256: Optional erwarteter Hash des Chunks (Header X-Chunk-SHA256)
+
+        Returns:
+            dict: chunk_index, offset, size, sha256, received_bytes, complete
+
+        Raises:
+            ChunkedUploadError: Bei falschem Offset/Länge (400/411/416), Hash-Abweichung (422),
+                                keiner Audio-Datei (415) oder ungültiger Session
+        """
+        upload = self._get(session_id, user_id)
+
+        if offset < 0 or offset >= upload.total_size or offset % upload.chunk_size:
+            raise ChunkedUploadError(
+                f"Offset muss ein Vielfaches von {upload.chunk_size} und kleiner als {upload.total_size} sein", 416
+            )
+        expected_length = min(upload.chunk_size, upload.total_size - offset)
+        if content_length is None:
+            raise ChunkedUploadError("Content-Length fehlt", 411)
+        if content_length != expected_length:
+            raise ChunkedUploadError(f"Chunk bei Offset {offset} muss {expected_length} Bytes lang sein", 400)
+        if sha256 is not None and not _is_sha256(sha256):
+            raise ChunkedUploadError("X-Chunk-SHA256 muss ein Hex-Digest sein", 400)
+
+        chunk_index = offset // upload.chunk_size
+        # Ein Retry überschreibt schon geprüfte Bytes: bis er vollständig und
+        # geprüft ist, gilt der Chunk als fehlend (auch bei Abbruch, 415, 422)
+        self.upload_repo.forget_chunk(upload.id, chunk_index)
+        try:
+            written, actual = self._write_range(upload.file_path, offset, expected_length, stream)
+            if sha256 is not None and actual != sha256.lower():
+                # Bereich wird beim nächsten Versuch überschrieben
+                raise ChunkedUploadError("Prüfsumme des Chunks stimmt nicht", 422,
+                                         expected=sha256.lower(), actual=actual)
+        except Exception:
+            # Ein paralleler Versuch könnte ihn inzwischen eingetragen haben
+            self.upload_repo.forget_chunk(upload.id, chunk_index)
+            raise
+
+        self.upload_repo.record_chunk(upload.id, chunk_index, written, actual)
+        received = self.upload_repo.received_chunks(upload.id)
+        return {
+            'chunk_index': chunk_index,
+            'offset': offset,
+            'size': written,
+            'sha256': actual,
+            'received_bytes': sum(size for _, size in received),
+            'complete': len(received) == _chunk_count(upload)
+        }
+
+    @staticmethod
+    def _write_range(file_path: str, offset: int, length: int, stream: BinaryIO):
+        """
+        Schreibt `length` Bytes aus `stream` per pwrite() ab `offset`.
+
+        Returns:
+            Tuple: (geschriebene Bytes, SHA-256)
+
+        Raises:
+            ChunkedUploadError: Body zu kurz (400) oder keine Audio-Datei (415, nur Offset 0)
+        """
+        digest = hashlib.sha256()
+        written = 0
+        head = b''
+        fd = os.open(file_path, os.O_WRONLY)
+        try:
+            while written < length:
+                block = stream.read(min(AudioService.COPY_CHUNK_SIZE, length - written))
+                if not block:
+                    break
+                if offset == 0 and len(head) < MAGIC_BYTES:
+                    head += block[:MAGIC_BYTES - len(head)]
+                    if len(head) >= MAGIC_BYTES and sniff_audio_format(head) is None:
+                        raise ChunkedUploadError("Datei ist keine unterstützte Audio-Datei", 415)
+                digest.update(block)
+                os.pwrite(fd, block, offset + written)
+                written += len(block)
+        finally:
+            os.close(fd)
+
+        if written != length:
+            raise ChunkedUploadError(f"Chunk unvollständig ({written} von {length} Bytes)", 400)
+        return written, digest.hexdigest()
+
+    # ==========================================
+    # FINALIZE
+    # ==========================================
+
+    def finalize(self, session_id: str, user_id: int, business_service, upload_folder: str) -> Dict[str, Any]:
+        """
+        Schließt den Upload ab und registriert die Datei über upload_audio_workflow.
+        Wiederholte Aufrufe nach Erfolg liefern dasselbe Ergebnis.
+
+        Args:
+            session_id: upload_id
+            user_id: ID des Users
+            business_service: WatermarkBusinessService (für upload_audio_workflow)
+            upload_folder: Zielordner
+
+        Returns:
+            dict: audio_id, filename, metadata (wie /upload)
+
+        Raises:
+            ChunkedUploadError: Fehlende Chunks (409), Hash-Abweichung (422), ungültige Session
+            ValueError: Aus upload_audio_workflow (z.B. unlesbare Audio-Datei)
+        """
+        upload = self._get(session_id, user_id, require_open=False)
+        if upload.status == 'completed':
+            audio = business_service.audio_repo.get_by_id(upload.audio_file_id)
+            if audio is None:
+                raise ChunkedUploadError("Datei wurde inzwischen gelöscht", 410)
+            return {
+                'audio_id': audio.id,
+                'filename': audio.filename,
+                'metadata': {'sample_rate': audio.sample_rate, 'duration': audio.duration,
+                             'file_size': audio.file_size}
+            }
+        self._check_open(upload)
+
+        received = self.upload_repo.received_chunks(upload.id)
+        received_indices = {index for index, _ in received}
+        missing = [i for i in range(_chunk_count(upload)) if i not in received_indices]
+        if missing:
+            raise ChunkedUploadError(f"Es fehlen noch {len(missing)} Chunks", 409, missing_chunks=missing)
+
+        digest = None
+        if upload.sha256:
+            digest = _file_sha256(upload.file_path)
+            if digest != upload.sha256:
+                raise ChunkedUploadError("Prüfsumme der Datei stimmt nicht", 422,
+                                         expected=upload.sha256, actual=digest)
+
+        stored = StoredUpload(upload.file_path, digest)
+        file = FileStorage(stored, upload.filename)
+        try:
+            result = business_service.upload_audio_workflow(
+                file=file,
+                upload_folder=upload_folder,
+                user_id=user_id
+            )
+        except Exception:
+            if stored.committed:
+                # Teil-Datei ist schon umbenannt, die Session lässt sich nicht fortsetzen
+                self.upload_repo.update(upload.id, status='failed', file_path=stored.path)
+            raise
+        finally:
+            file.close()
+
+        # Gespeicherter Pfad (ggf. FLAC, siehe services/storage_tier.py)
+        audio = business_service.audio_repo.get_by_id(result['audio_id'])
+        self.upload_repo.update(upload.id, status='completed', audio_file_id=result['audio_id'],
+                                file_path=audio.file_path)
+        return result
+
+    # ==========================================
+    # HELPER
+    # ==========================================
+
+    def _get(self, session_id: str, user_id: int, require_open: bool = True) -> UploadSession:
+        upload = self.upload_repo.get_by_id(session_id)
+        if upload is None:
+            raise ChunkedUploadError("Upload-Session nicht gefunden", 404)
+        if upload.user_id != user_id:
+            raise ChunkedUploadError("Keine Berechtigung", 403)
+        if require_open:
+            self._check_open(upload)
+        return upload
+
+    @staticmethod
+    def _check_open(upload: UploadSession) -> None:
+        if upload.status != 'open':
+            raise ChunkedUploadError(f"Upload-Session ist bereits {upload.status}", 409)
+        if upload.expires_at < datetime.utcnow():
+            raise ChunkedUploadError("Upload-Session ist abgelaufen", 410)
+
+
+def _chunk_count(upload: UploadSession) -> int:
+    return -(-upload.total_size // upload.chunk_size)
+
+
+def _is_sha256(value: str) -> bool:
+    return len(value) == 64 and all(c in '0123456789abcdefABCDEF' for c in value)
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(AudioService.COPY_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,281 @@
+"""
+Idempotency-Keys für Embed und Manipulation.
+
+Clients, die /watermark/embed nach einem Timeout wiederholen, lösen sonst ein
+zweites Embedding aus und erzeugen doppelte AudioFile-Einträge und Dateien.
+Mit Header `Idempotency-Key` gilt pro (User, Endpoint, Key):
+    - erster Request: reserviert den Key (Zeile 'processing') und rechnet
+    - Wiederholung mit gleichem Payload, Ergebnis fertig -> gespeichertes
+      Ergebnis, ohne neu zu rechnen (Header Idempotent-Replayed: true)
+    - Wiederholung, während der erste noch läuft -> wartet auf dessen Ergebnis
+      (im selben Worker per Event, sonst durch Abfragen der Datenbank)
+    - gleicher Key mit anderem Payload -> 422
+    - Ergebnis nach IDEMPOTENCY_WAIT_S noch nicht fertig -> 409 mit Retry-After
+    - Request fehlgeschlagen -> Reservierung wird freigegeben, die nächste
+      Wiederholung rechnet neu
+
+Der Payload-Hash umfasst den SHA-256 der Datei (entsteht beim Streamen, siehe
+services/upload_stream.py), Dateiname und Parameter.
+
+Keys verfallen nach IDEMPOTENCY_TTL_S (abgelaufene Einträge gelten als nicht
+vorhanden und werden regelmäßig gelöscht). Reservierungen abgestürzter Worker
+übernimmt nach IDEMPOTENCY_LOCK_TIMEOUT_S der nächste Request.
+
+Umgebungsvariablen:
+    IDEMPOTENCY_TTL_S             Gültigkeit gespeicherter Ergebnisse (Standard: 24 h)
+    IDEMPOTENCY_LOCK_TIMEOUT_S    Reservierung läuft ab nach (Standard: 30 min)
+    IDEMPOTENCY_WAIT_S            Maximale Wartezeit auf einen laufenden Request
+    IDEMPOTENCY_POLL_S            Abfrage-Intervall, wenn der Request in einem anderen Worker läuft
+
+Usage:
+    claim = idempotency.claim('embed', key, idempotency.payload_hash(file, method=method), user_id)
+    if claim.result:
+        return send_audio_file(claim.result.path, claim.result.download_name)
+    try:
+        ...
+        claim.complete(output_path, output_filename, audio_id)
+    finally:
+        claim.release()
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from database.database import get_db
+from database.repositories import IdempotencyKeyRepository
+from services import metrics
+from services.audio_service import AudioService
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+IDEMPOTENCY_TTL_S = int(os.environ.get('IDEMPOTENCY_TTL_S', 24 * 60 * 60))
+IDEMPOTENCY_LOCK_TIMEOUT_S = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT_S', 30 * 60))
+IDEMPOTENCY_WAIT_S = float(os.environ.get('IDEMPOTENCY_WAIT_S', 60))
+IDEMPOTENCY_POLL_S = float(os.environ.get('IDEMPOTENCY_POLL_S', 0.25))
+
+# Abgelaufene Keys höchstens so oft pro Worker löschen
+PURGE_INTERVAL_S = 300
+
+MAX_KEY_LENGTH = 255
+
+# Blockgröße zum Hashen von Uploads ohne mitgeschriebenen SHA-256
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class IdempotencyError(Exception):
+    """Key ungültig (400), mit anderem Payload verwendet (422) oder noch in Arbeit (409)"""
+
+    def __init__(self, message: str, status: int, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+IDEMPOTENCY_REQUESTS = metrics.register(metrics.Counter(
+    'watermark_idempotency_requests_total',
+    'Requests mit Idempotency-Key (executed, replayed, attached = auf laufenden gewartet, mismatch, timeout)',
+    ('endpoint', 'outcome')
+))
+
+
+# ==========================================
+# PAYLOAD-HASH
+# ==========================================
+
+def validate_key(key: str) -> str:
+    """
+    Raises:
+        IdempotencyError: Leerer, zu langer oder nicht druckbarer Key (400)
+    """
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isprintable():
+        raise IdempotencyError(f"Ungültiger {IDEMPOTENCY_HEADER} (1-{MAX_KEY_LENGTH} druckbare Zeichen)", 400)
+    return key
+
+
+def file_sha256(file) -> str:
+    """SHA-256 eines Uploads (FileStorage); nutzt den beim Streamen berechneten Hash"""
+    digest = getattr(file.stream, 'sha256', None)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    file.stream.seek(0)
+    for block in iter(lambda: file.stream.read(HASH_BLOCK_SIZE), b''):
+        sha.update(block)
+    file.stream.seek(0)
+    return sha.hexdigest()
+
+
+def payload_hash(file, **fields) -> str:
+    """Fingerprint eines Requests aus Datei-Inhalt, Dateiname und Parametern"""
+    payload = {'file': file_sha256(file), 'filename': file.filename, **fields}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+# ==========================================
+# RESERVIERUNG
+# ==========================================
+
+class StoredResult:
+    """Gespeichertes Ergebnis eines abgeschlossenen Requests"""
+
+    def __init__(self, path: str, download_name: str, resource_id: Optional[int], attached: bool = False):
+        self.path = path
+        self.download_name = download_name
+        self.resource_id = resource_id
+        # True, wenn auf den laufenden Request gewartet wurde
+        self.attached = attached
+
+
+class Claim:
+    """
+    Ergebnis von claim(): entweder ein gespeichertes Ergebnis (`result`) oder
+    die Reservierung des Keys. complete() und release() sind idempotent;
+    release() nach complete() tut nichts.
+    """
+
+    def __init__(self, user_id: int, endpoint: str, key: str,
+                 reserved_until: Optional[datetime] = None, result: Optional[StoredResult] = None):
+        self.user_id = user_id
+        self.endpoint = endpoint
+        self.key = key
+        self.reserved_until = reserved_until
+        self.result = result
+        self._done = result is not None
+
+    def complete(self, path: str, download_name: str, resource_id: Optional[int] = None) -> None:
+        """Speichert das Ergebnis für Wiederholungen"""
+        if self._done:
+            return
+        self._done = True
+        try:
+            with get_db() as db:
+                IdempotencyKeyRepository(db).complete(
+                    self.user_id, self.endpoint, self.key, self.reserved_until,
+                    result_path=path,
+                    result_sha256=AudioService.content_hash(path),
+                    download_name=download_name,
+                    resource_id=resource_id,
+                    expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_S)
+                )
+        finally:
+            _finish((self.user_id, self.endpoint, self.key))
+
+    def release(self) -> None:
+        """Gibt die Reservierung ohne Ergebnis frei (z.B. nach einem Fehler)"""
+        if self._done:
+            return
+        self._done = True
+        try:
+            with get_db() as db:
+                IdempotencyKeyRepository(db).release(self.user_id, self.endpoint, self.key, self.reserved_until)
+        finally:
+            _finish((self.user_id, self.endpoint, self.key))
+
+
+# Laufende Reservierungen dieses Workers: Wartende werden sofort geweckt
+_lock = threading.Lock()
+_running: Dict[Tuple[int, str, str], threading.Event] = {}
+_last_purge = 0.0
+
+
+def _start(ident: Tuple[int, str, str]) -> None:
+    with _lock:
+        _running[ident] = threading.Event()
+
+
+def _finish(ident: Tuple[int, str, str]) -> None:
+    with _lock:
+        event = _running.pop(ident, None)
+    if event:
+        event.set()
+
+
+def _wait(ident: Tuple[int, str, str], timeout: float) -> None:
+    with _lock:
+        event = _running.get(ident)
+    if event:
+        event.wait(timeout)
+    else:
+        time.sleep(min(timeout, IDEMPOTENCY_POLL_S))
+
+
+def _result_intact(path: Optional[str], sha256: Optional[str]) -> bool:
+    # Gleichnamige Uploads überschreiben Ergebnis-Dateien; Hash ist pro Prozess gecacht
+    try:
+        return bool(path) and AudioService.content_hash(path) == sha256
+    except OSError:
+        return False
+
+
+def _purge_expired(repo: IdempotencyKeyRepository) -> None:
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < PURGE_INTERVAL_S:
+        return
+    _last_purge = now
+    repo.purge_expired()
+
+
+def claim(endpoint: str, key: str, request_hash: str, user_id: int,
+          wait_s: float = IDEMPOTENCY_WAIT_S) -> Claim:
+    """
+    Reserviert den Key oder liefert das Ergebnis eines früheren Requests.
+    Läuft ein Request mit demselben Key noch, wird bis `wait_s` auf ihn gewartet.
+
+    Raises:
+        IdempotencyError: Key mit anderem Payload (422) oder Wartezeit überschritten (409)
+    """
+    ident = (user_id, endpoint, key)
+    deadline = time.monotonic() + wait_s
+    waited = False
+
+    while True:
+        now = datetime.utcnow()
+        reserved_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT_S)
+
+        with get_db() as db:
+            repo = IdempotencyKeyRepository(db)
+            _purge_expired(repo)
+            record, created = repo.reserve(user_id, endpoint, key, request_hash, reserved_until)
+
+            if not created:
+                # Abgelaufen, abgestürzt oder Ergebnis-Datei gelöscht/überschrieben -> wie nicht vorhanden
+                stale = record.expires_at <= now or (
+                    record.status == 'completed' and not _result_intact(record.result_path, record.result_sha256)
+                )
+                if stale:
+                    created = repo.take_over(record, request_hash, reserved_until)
+                    if not created:
+                        # Ein anderer Request war schneller
+                        continue
+                elif record.request_hash != request_hash:
+                    IDEMPOTENCY_REQUESTS.inc((endpoint, 'mismatch'))
+                    raise IdempotencyError(
+                        f"{IDEMPOTENCY_HEADER} wurde bereits für einen anderen Request verwendet", 422
+                    )
+                elif record.status == 'completed':
+                    IDEMPOTENCY_REQUESTS.inc((endpoint, 'attached' if waited else 'replayed'))
+                    return Claim(user_id, endpoint, key, result=StoredResult(
+                        record.result_path, record.download_name, record.resource_id, attached=waited
+                    ))
+
+        if created:
+            _start(ident)
+            IDEMPOTENCY_REQUESTS.inc((endpoint, 'executed'))
+            return Claim(user_id, endpoint, key, reserved_until=reserved_until)
+
+        # Request mit diesem Key läuft noch
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            IDEMPOTENCY_REQUESTS.inc((endpoint, 'timeout'))
+            raise IdempotencyError(
+                f"Ein Request mit diesem {IDEMPOTENCY_HEADER} wird noch bearbeitet", 409, retry_after=1
+            )
+        waited = True
+        _wait(ident, remaining)
@@ -0,0 +1,350 @@
+"""
+Leichtgewichtige Stage-Timer mit Export im Prometheus-Textformat.
+
+Jede Stage (Upload speichern, Audio laden, Inference, Schreiben, DB-Commit, ...)
+wird als Histogramm erfasst, gelabelt nach Watermarking-Methode und
+Manipulations-Typ. Die Labels werden pro Request über labels() gesetzt und
+gelten für alle darin verschachtelten Timer (auch in Repositories).
+
+Usage:
+    with metrics.labels(method='audioseal'):
+        with metrics.stage_timer('inference'):
+            ...
+
+Umgebungsvariablen:
+    METRICS_ENABLED   '0' -> Timer sind No-Ops (ein Funktionsaufruf, kein Zeitmessen/Lock)
+    MEMORY_TRACKING   '1' -> zusätzlich Speicher pro Stage erfassen (tracemalloc + RSS).
+                      Kostet spürbar Laufzeit; tracemalloc ist prozessweit, bei parallelen
+                      Requests (GUNICORN_THREADS > 1) sind die Werte daher nur Näherungen.
+
+Hinweis: Die Werte gelten pro Prozess. Unter Gunicorn beantwortet jeweils ein
+Worker den Scrape von /metrics (Label 'worker' = PID unterscheidet die Serien).
+"""
+import os
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Tuple, Optional, Union
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+MEMORY_TRACKING = METRICS_ENABLED and os.environ.get('MEMORY_TRACKING', '0') == '1'
+
+# Bucket-Grenzen in Sekunden (DB-Commits im ms-Bereich bis Inference langer Dateien)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Bucket-Grenzen in Bytes (1 MB bis 4 GB)
+MEMORY_BUCKETS = tuple(float(2 ** exp) for exp in range(20, 33))
+
+# Aktuelle Labels des Requests: (method, manipulation_type)
+_current_labels: ContextVar[Tuple[str, str]] = ContextVar('metric_labels', default=('', ''))
+
+# Speicher-Report des Requests (nur mit memory_report()) und offene Stages:
+# je Stage [tracemalloc-Stand beim Start, bisheriger Peak, RSS beim Start]
+_memory_report: ContextVar[Optional[Dict[str, Dict[str, int]]]] = ContextVar('memory_report', default=None)
+_memory_stack: ContextVar[Tuple[list, ...]] = ContextVar('memory_stack', default=())
+
+
+class Histogram:
+    """Thread-sicheres Histogramm (kumulative Buckets wie bei Prometheus)"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        # Label-Werte -> [bucket_counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_values: Tuple[str, ...]) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1  # Index len(buckets) = +Inf
+            series[-1] += value
+
+    def render(self, const_labels: str = '') -> List[str]:
+        """Zeilen im Prometheus-Textformat (Version 0.0.4)"""
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        for label_values, series in sorted(snapshot.items()):
+            label_str = _label_str(self.label_names, label_values, const_labels)
+
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label_str},le="+Inf"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_str}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_str}}} {cumulative}')
+        return lines
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_str(label_names: Tuple[str, ...], label_values: Tuple[str, ...], const_labels: str = '') -> str:
+    label_str = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values))
+    if const_labels:
+        label_str = f'{label_str},{const_labels}' if label_str else const_labels
+    return label_str
+
+
+class Counter:
+    """Thread-sicherer, monoton steigender Zähler"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self, const_labels: str = '') -> List[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{{_label_str(self.label_names, label_values, const_labels)}}} {value}')
+        return lines
+
+
+class Gauge:
+    """Momentanwerte, die erst beim Export über `collect` abgefragt werden"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...],
+                 collect: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.collect = collect
+
+    def render(self, const_labels: str = '') -> List[str]:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} gauge']
+        for label_values, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{{{_label_str(self.label_names, label_values, const_labels)}}} {value}')
+        return lines
+
+
+# ==========================================
+# REGISTRY
+# ==========================================
+
+STAGE_DURATION = Histogram(
+    'watermark_stage_duration_seconds',
+    'Dauer einzelner Verarbeitungsschritte',
+    ('stage', 'method', 'manipulation_type')
+)
+
+REQUEST_DURATION = Histogram(
+    'watermark_request_duration_seconds',
+    'Dauer der HTTP-Requests (bis zum Beginn der Antwort)',
+    ('endpoint', 'http_method', 'status')
+)
+
+STAGE_PEAK_MEMORY = Histogram(
+    'watermark_stage_peak_memory_bytes',
+    'Zusätzlicher Python/numpy-Speicher (tracemalloc-Peak) pro Verarbeitungsschritt',
+    ('stage', 'method', 'manipulation_type'),
+    MEMORY_BUCKETS
+)
+
+STAGE_RSS_DELTA = Histogram(
+    'watermark_stage_rss_delta_bytes',
+    'RSS-Zuwachs pro Verarbeitungsschritt (inkl. torch-Allokationen)',
+    ('stage', 'method', 'manipulation_type'),
+    MEMORY_BUCKETS
+)
+
+Metric = Union[Histogram, Counter, Gauge]
+
+_registry: List[Metric] = [STAGE_DURATION, REQUEST_DURATION]
+if MEMORY_TRACKING:
+    _registry.extend([STAGE_PEAK_MEMORY, STAGE_RSS_DELTA])
+
+
+def register(metric: Metric) -> Metric:
+    """Nimmt eine weitere Metrik (Histogramm, Zähler, Gauge) in den /metrics-Export auf"""
+    _registry.append(metric)
+    return metric
+
+
+def render_all() -> str:
+    """Alle Metriken im Prometheus-Textformat"""
+    const_labels = f'worker="{os.getpid()}"'
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(const_labels))
+    return '\n'.join(lines) + '\n'
+
+
+# ==========================================
+# TIMER
+# ==========================================
+
+class _StageTimer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        if MEMORY_TRACKING:
+            _memory_enter()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        label_values = (self.stage,) + _current_labels.get()
+        STAGE_DURATION.observe(duration, label_values)
+        if MEMORY_TRACKING:
+            _memory_exit(label_values)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage_timer(stage: str):
+    """
+    Misst die Dauer des with-Blocks als Stage (auch bei Exceptions).
+
+    Args:
+        stage: Name des Schritts, z.B. 'load_audio', 'inference', 'db_commit'
+    """
+    if not METRICS_ENABLED:
+        return _NULL_TIMER
+    return _StageTimer(stage)
+
+
+@contextmanager
+def labels(method: str = None, manipulation_type: str = None):
+    """
+    Setzt Labels für alle Stage-Timer im Block (nicht gesetzte bleiben erhalten).
+
+    Args:
+        method: Watermarking-Methode, z.B. 'audioseal'
+        manipulation_type: Manipulations-Typ, z.B. 'noise'
+    """
+    current_method, current_type = _current_labels.get()
+    token = _current_labels.set((
+        (method or current_method).lower(),
+        manipulation_type or current_type
+    ))
+    try:
+        yield
+    finally:
+        _current_labels.reset(token)
+
+
+# ==========================================
+# SPEICHER
+# ==========================================
+
+def current_rss() -> int:
+    """Aktuelle RSS des Prozesses in Bytes (0, wenn /proc nicht verfügbar ist)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _memory_enter() -> None:
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _memory_stack.get()
+    if stack:
+        # Peak der äußeren Stage sichern, bevor reset_peak() ihn verwirft
+        stack[-1][1] = max(stack[-1][1], peak)
+    _memory_stack.set(stack + ([current, 0, current_rss()],))
+    tracemalloc.reset_peak()
+
+
+def _memory_exit(label_values: Tuple[str, str, str]) -> None:
+    current, peak = tracemalloc.get_traced_memory()
+    stack = _memory_stack.get()
+    if not stack:
+        return
+    start_current, inner_peak, start_rss = stack[-1]
+    stage_peak = max(peak, inner_peak)
+    _memory_stack.set(stack[:-1])
+    if len(stack) > 1:
+        stack[-2][1] = max(stack[-2][1], stage_peak)
+
+    peak_bytes = max(0, stage_peak - start_current)
+    rss_delta = max(0, current_rss() - start_rss)
+    STAGE_PEAK_MEMORY.observe(peak_bytes, label_values)
+    STAGE_RSS_DELTA.observe(rss_delta, label_values)
+
+    report = _memory_report.get()
+    if report is not None:
+        entry = report.setdefault(label_values[0], {'peak_bytes': 0, 'rss_delta_bytes': 0})
+        entry['peak_bytes'] = max(entry['peak_bytes'], peak_bytes)
+        entry['rss_delta_bytes'] = max(entry['rss_delta_bytes'], rss_delta)
+
+
+def begin_memory_report() -> Tuple[Dict[str, Dict[str, int]], object]:
+    """
+    Startet einen Speicher-Report für den aktuellen Kontext (z.B. einen Request).
+
+    Returns:
+        Tuple (report, token): report wird pro Stage befüllt
+        ({'load_audio': {'peak_bytes': ..., 'rss_delta_bytes': ...}, ...}),
+        token für end_memory_report()
+    """
+    report: Dict[str, Dict[str, int]] = {}
+    return report, _memory_report.set(report)
+
+
+def end_memory_report(token) -> None:
+    _memory_report.reset(token)
+
+
+@contextmanager
+def memory_report():
+    """
+    Sammelt für den Block den Speicher-Peak pro Stage (leer ohne MEMORY_TRACKING).
+
+    Usage:
+        with metrics.memory_report() as report:
+            ...
+    """
+    report, token = begin_memory_report()
+    try:
+        yield report
+    finally:
+        end_memory_report(token)
+
+
+def observe_request(endpoint: str, http_method: str, status: int, duration: float) -> None:
+    """Erfasst die Dauer eines HTTP-Requests"""
+    if METRICS_ENABLED:
+        REQUEST_DURATION.observe(duration, (endpoint, http_method, str(status)))
+
+
+if MEMORY_TRACKING and not tracemalloc.is_tracing():
+    tracemalloc.start()
@@ -0,0 +1,248 @@
+"""
+Opt-in Profiling einzelner Requests.
+
+Auslöser:
+    - Header 'X-Profile: <ADMIN_TOKEN>' (z.B. um einen langsamen Clip gezielt zu profilen)
+    - Admin-Flag PROFILE_SAMPLE_RATE > 0: dieser Anteil aller Requests wird profiliert
+
+Beides ist durch PROFILE_MAX_PER_MINUTE pro Prozess begrenzt.
+
+Profiler:
+    deterministic   cProfile, gespeichert als .prof (pstats, z.B. snakeviz / pstats.Stats)
+    sampling        pyinstrument (optional installiert), gespeichert als .speedscope.json
+                    (https://www.speedscope.app). Ohne pyinstrument -> cProfile.
+    Auswahl per Header 'X-Profile-Mode' oder PROFILE_MODE.
+
+Umgebungsvariablen:
+    ADMIN_TOKEN             Token für X-Profile und die /admin-Routen (ohne Token: deaktiviert)
+    PROFILE_SAMPLE_RATE     Anteil automatisch profilierter Requests (0.0 - 1.0)
+    PROFILE_MAX_PER_MINUTE  Obergrenze Profile pro Minute und Prozess
+    PROFILE_MODE            'deterministic' oder 'sampling'
+    PROFILE_FOLDER          Ablage der Profile
+    PROFILE_MAX_FILES       Anzahl aufbewahrter Profile (älteste werden gelöscht)
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_MAX_PER_MINUTE = int(os.environ.get('PROFILE_MAX_PER_MINUTE', 6))
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'deterministic')
+PROFILE_FOLDER = os.environ.get('PROFILE_FOLDER', '/app/profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 200))
+
+# Erlaubte Profil-IDs (auch Schutz vor Path-Traversal beim Download)
+_PROFILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,100}$')
+
+try:
+    from pyinstrument import Profiler as _SamplingProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer as _SpeedscopeRenderer
+except ImportError:  # optional
+    _SamplingProfiler = None
+
+
+class _RateLimiter:
+    """Höchstens `limit` Profile pro gleitendem 60-Sekunden-Fenster"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._starts = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._starts and now - self._starts[0] > 60:
+                self._starts.popleft()
+            if len(self._starts) >= self.limit:
+                return False
+            self._starts.append(now)
+            return True
+
+
+_rate_limiter = _RateLimiter(PROFILE_MAX_PER_MINUTE)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Prüft das Admin-Token (ohne konfiguriertes Token ist niemand Admin)"""
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+def valid_profile_id(profile_id: str) -> bool:
+    return bool(_PROFILE_ID_PATTERN.match(profile_id))
+
+
+def new_profile_id(request_id: Optional[str] = None) -> str:
+    """
+    Erzeugt eine eindeutige Profil-ID.
+
+    Die Request-ID stammt vom Client und ist nicht eindeutig - sie wird nur als
+    Präfix übernommen, Zeitstempel und Zufallsanteil erzeugt der Server.
+    So überschreibt eine wiederholte X-Request-ID kein vorhandenes Profil.
+
+    Args:
+        request_id: X-Request-ID des Clients (ungültige Werte werden ignoriert)
+
+    Returns:
+        str: '<request_id>_<Zeitstempel>_<uuid>' bzw. '<Zeitstempel>_<uuid>'
+    """
+    suffix = f"{datetime.utcnow():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:8]}"
+    if request_id and valid_profile_id(request_id):
+        return f"{request_id[:64]}_{suffix}"
+    return suffix
+
+
+class RequestProfiler:
+    """Profiliert einen Request (deterministisch oder sampling) und speichert das Ergebnis"""
+
+    def __init__(self, mode: str):
+        if mode == 'sampling' and _SamplingProfiler is not None:
+            self.mode = 'sampling'
+            self._profiler = _SamplingProfiler()
+        else:
+            self.mode = 'deterministic'
+            self._profiler = cProfile.Profile()
+        self._start = None
+        self.duration = None
+
+    @classmethod
+    def for_request(cls, profile_header: Optional[str], mode_header: Optional[str]) -> Optional['RequestProfiler']:
+        """
+        Entscheidet, ob ein Request profiliert wird.
+
+        Args:
+            profile_header: Wert des X-Profile-Headers
+            mode_header: Wert des X-Profile-Mode-Headers
+
+        Returns:
+            RequestProfiler oder None (nicht angefordert / Limit erreicht)
+        """
+        requested = is_admin(profile_header)
+        sampled = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if not (requested or sampled):
+            return None
+        if not _rate_limiter.acquire():
+            return None
+        return cls(mode_header or PROFILE_MODE)
+
+    def start(self) -> bool:
+        """
+        Startet das Profiling im aktuellen Thread.
+
+        Returns:
+            False, wenn bereits ein anderer Profiler aktiv ist (ab Python 3.12
+            ist pro Prozess nur ein cProfile gleichzeitig möglich)
+        """
+        try:
+            if self.mode == 'sampling':
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+        except (ValueError, RuntimeError):
+            return False
+        self._start = time.perf_counter()
+        return True
+
+    def stop(self) -> None:
+        if self._start is None or self.duration is not None:
+            return
+        if self.mode == 'sampling':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        self.duration = time.perf_counter() - self._start
+
+    def save(self, profile_id: str, meta: Dict[str, Any]) -> str:
+        """
+        Speichert Profil + Metadaten unter PROFILE_FOLDER.
+
+        Args:
+            profile_id: Eindeutige Profil-ID (siehe new_profile_id, wird Teil des Dateinamens)
+            meta: Zusätzliche Angaben (Route, Status, ...)
+
+        Returns:
+            str: Dateiname des Profils
+
+        Raises:
+            FileExistsError: Wenn unter der ID bereits ein Profil liegt (wird nie überschrieben)
+        """
+        self.stop()
+        os.makedirs(PROFILE_FOLDER, exist_ok=True)
+
+        # Metadaten-Datei exklusiv anlegen: reserviert die ID atomar
+        meta_path = os.path.join(PROFILE_FOLDER, f"{profile_id}.meta.json")
+        with open(meta_path, 'x'):
+            pass
+
+        if self.mode == 'sampling':
+            filename = f"{profile_id}.speedscope.json"
+            with open(os.path.join(PROFILE_FOLDER, filename), 'x') as f:
+                f.write(self._profiler.output(renderer=_SpeedscopeRenderer()))
+        else:
+            filename = f"{profile_id}.prof"
+            self._profiler.dump_stats(os.path.join(PROFILE_FOLDER, filename))
+
+        meta = {
+            **meta,
+            'profile_id': profile_id,
+            'mode': self.mode,
+            'file': filename,
+            'duration_ms': round(self.duration * 1000, 3),
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+        _enforce_retention()
+        return filename
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadaten aller gespeicherten Profile (neueste zuerst)"""
+    if not os.path.isdir(PROFILE_FOLDER):
+        return []
+
+    profiles = []
+    with os.scandir(PROFILE_FOLDER) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.meta.json'):
+                continue
+            try:
+                with open(entry.path) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    profiles.sort(key=lambda p: p.get('created_at', ''), reverse=True)
+    return profiles
+
+
+def profile_file(profile_id: str) -> Optional[str]:
+    """Dateiname des Profils zu einer ID (None, wenn nicht vorhanden)"""
+    if not valid_profile_id(profile_id):
+        return None
+    for suffix in ('.prof', '.speedscope.json'):
+        if os.path.exists(os.path.join(PROFILE_FOLDER, profile_id + suffix)):
+            return profile_id + suffix
+    return None
+
+
+def _enforce_retention() -> None:
+    """Löscht die ältesten Profile über PROFILE_MAX_FILES"""
+    profiles = list_profiles()
+    for meta in profiles[PROFILE_MAX_FILES:]:
+        for name in (meta.get('file'), f"{meta['profile_id']}.meta.json"):
+            if name:
+                try:
+                    os.remove(os.path.join(PROFILE_FOLDER, name))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,126 @@
+"""
+Modell-Warm-up und Readiness der API.
+
+Die App importiert torch, librosa und scipy nicht beim Start, sondern erst
+bei Bedarf. Das Warm-up lädt sie (und die Modelle) vorab, damit der erste
+Request nicht dafür bezahlt. /health antwortet sofort (Liveness), /ready
+erst mit 200, wenn die Instanz Arbeit annehmen kann: Warm-up fertig, Worker
+nicht ausgelastet, genug Speicherplatz, Datenbank erreichbar (siehe
+services/capacity.py). Sonst 503, damit der Load-Balancer ausweicht.
+
+Modus über PRELOAD_MODELS:
+    '1'           Gunicorn-Master lädt synchron vor dem Fork (Gewichte
+                  copy-on-write geteilt, dafür langsamerer Start)
+    'background'  jeder Worker lädt nach dem Fork in einem Hintergrund-Thread
+                  (schneller Start, Gewichte pro Worker)
+    '0'           kein Warm-up; der erste Request pro Methode lädt das Modell
+
+Der Dev-Server (python app.py) wärmt bei '1' und 'background' im Hintergrund auf.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from services import capacity, runtime_config
+from services.watermark_strategy import WatermarkStrategyFactory
+
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '1')
+
+# Schwere Bibliotheken, die das Warm-up vorab importiert
+HEAVY_MODULES = ('numpy', 'soundfile', 'scipy.signal', 'librosa', 'torch')
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    'status': 'pending',  # pending -> warming -> done
+    'duration_s': None,
+    'models': {},
+}
+
+
+def warm_up() -> Dict[str, str]:
+    """
+    Importiert die schweren Module und lädt alle Modelle (synchron).
+    Fehler einzelner Methoden brechen das Warm-up nicht ab.
+
+    Returns:
+        dict: Methode -> 'loaded' oder Fehlermeldung
+    """
+    with _lock:
+        if _state['status'] != 'pending':
+            return dict(_state['models'])
+        _state['status'] = 'warming'
+
+    start = time.perf_counter()
+    for module in HEAVY_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            print(f"⚠️ Warm-up: {module} nicht importierbar: {e}")
+    runtime_config.apply_deferred_torch()
+
+    import services.audio_manipulation_service  # noqa: F401 - librosa/scipy-Pfade vorladen
+
+    models = WatermarkStrategyFactory.warm_up_all()
+
+    with _lock:
+        _state.update(status='done', duration_s=round(time.perf_counter() - start, 3), models=models)
+    return models
+
+
+def start_background_warm_up() -> threading.Thread:
+    """Startet warm_up() in einem Daemon-Thread"""
+    thread = threading.Thread(target=warm_up, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def is_warm() -> bool:
+    """Ohne Warm-up (PRELOAD_MODELS=0) gilt die App sofort als warm"""
+    return PRELOAD_MODELS == '0' or _state['status'] == 'done'
+
+
+def status(upload_folder: str, port: int) -> Dict[str, Any]:
+    """
+    Readiness-Status für /ready.
+
+    Args:
+        upload_folder: Ordner, dessen freier Platz geprüft wird
+        port: Port des Listen-Sockets (für die Accept-Queue)
+
+    Returns:
+        dict mit ready, reasons (fehlgeschlagene Checks), checks (warm_up,
+        in_flight, accept_queue, disk, database), models (pro Methode: loaded,
+        ggf. error), modules (welche schweren Module importiert sind) und
+        runtime (wirksame Thread-Einstellungen, siehe services/runtime_config.py)
+    """
+    with _lock:
+        state = dict(_state)
+
+    checks = {
+        'warm_up': {'ok': is_warm(), 'mode': PRELOAD_MODELS, 'status': state['status'],
+                    'duration_s': state['duration_s']},
+        'in_flight': capacity.check_in_flight(),
+        'accept_queue': capacity.check_accept_queue(port),
+        'disk': capacity.check_disk(upload_folder),
+        'database': capacity.check_database(),
+    }
+    reasons = [name for name, check in checks.items() if not check['ok']]
+
+    models = {}
+    for method in WatermarkStrategyFactory.available_methods():
+        warm_up_result: Optional[str] = state['models'].get(method)
+        models[method] = {'loaded': WatermarkStrategyFactory.get_strategy(method).is_loaded()}
+        if warm_up_result and warm_up_result != 'loaded':
+            models[method]['error'] = warm_up_result
+
+    return {
+        'ready': not reasons,
+        'reasons': reasons,
+        'checks': checks,
+        'models': models,
+        'modules': {module: module in sys.modules for module in HEAVY_MODULES},
+        'runtime': runtime_config.effective_settings(),
+    }
@@ -0,0 +1,195 @@
+import os
+import sys
+from typing import Dict, Any, List, Optional, Set
+
+
+class RuntimeConfig:
+    """
+    Thread- und CPU-Konfiguration eines Worker-Prozesses.
+    Verhindert Überbelegung der Kerne, wenn mehrere Worker/Threads
+    gleichzeitig Inferenz rechnen.
+
+    Umgebungsvariablen:
+        TORCH_NUM_THREADS      intra-op Threads pro Worker (Standard: Kerne / Worker)
+        TORCH_INTEROP_THREADS  inter-op Threads pro Worker (Standard: 1)
+        BLAS_NUM_THREADS       Threads für numpy/scipy-BLAS (Standard: wie TORCH_NUM_THREADS)
+        WORKER_CPU_SETS        Kern-Pinning: 'auto' (gleichmäßig aufteilen) oder
+                               explizit, z.B. '0-3;4-7' (ein Set pro Worker)
+    """
+
+    # Werden von OpenMP/MKL/OpenBLAS nur beim Laden der Bibliothek gelesen
+    BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+    def __init__(self, intra_op_threads: int, inter_op_threads: int = 1,
+                 blas_threads: Optional[int] = None, cpu_sets: Optional[List[Set[int]]] = None):
+        """
+        Args:
+            intra_op_threads: torch-Threads innerhalb einer Operation
+            inter_op_threads: torch-Threads für parallele Operationen
+            blas_threads: Threads für numpy/scipy-BLAS (None = wie intra_op_threads)
+            cpu_sets: Kern-Sets pro Worker-Slot (None = kein Pinning)
+        """
+        self.intra_op_threads = max(1, intra_op_threads)
+        self.inter_op_threads = max(1, inter_op_threads)
+        self.blas_threads = max(1, blas_threads or self.intra_op_threads)
+        self.cpu_sets = cpu_sets
+
+    @classmethod
+    def from_env(cls, workers: int = 1) -> 'RuntimeConfig':
+        """
+        Liest die Konfiguration aus Umgebungsvariablen.
+
+        Args:
+            workers: Anzahl Worker-Prozesse, auf die die Kerne verteilt werden
+        """
+        cpus = sorted(_available_cpus())
+        workers = max(1, workers)
+
+        intra = int(os.environ.get('TORCH_NUM_THREADS') or max(1, len(cpus) // workers))
+        inter = int(os.environ.get('TORCH_INTEROP_THREADS') or 1)
+        blas = int(os.environ.get('BLAS_NUM_THREADS') or intra)
+
+        cpu_sets_spec = os.environ.get('WORKER_CPU_SETS', '').strip()
+        if cpu_sets_spec == 'auto':
+            cpu_sets = _split_cpus(cpus, workers)
+        elif cpu_sets_spec:
+            cpu_sets = [_parse_cpu_list(part) for part in cpu_sets_spec.split(';') if part.strip()]
+        else:
+            cpu_sets = None
+
+        return cls(intra, inter, blas, cpu_sets)
+
+    def configure_environment(self) -> None:
+        """
+        Setzt die BLAS/OpenMP-Umgebungsvariablen.
+        Muss vor dem ersten Import von numpy/torch laufen (im Master vor dem Fork),
+        bereits gesetzte Werte werden nicht überschrieben.
+        """
+        for var in self.BLAS_ENV_VARS:
+            os.environ.setdefault(var, str(self.blas_threads))
+
+    def apply(self, worker_slot: int = 0, defer_torch: bool = False) -> Dict[str, Any]:
+        """
+        Wendet die Konfiguration im aktuellen Prozess an (im Worker nach dem Fork).
+
+        Args:
+            worker_slot: Index des Workers (bestimmt das Kern-Set beim Pinning)
+            defer_torch: torch nicht importieren, falls noch nicht geladen; die
+                Thread-Einstellungen setzt dann apply_deferred_torch() (Warm-up)
+
+        Returns:
+            dict mit den tatsächlich wirksamen Einstellungen
+        """
+        if self.cpu_sets and hasattr(os, 'sched_setaffinity'):
+            cpu_set = self.cpu_sets[worker_slot % len(self.cpu_sets)]
+            os.sched_setaffinity(0, cpu_set)
+
+        global _deferred_torch_config
+        if defer_torch and 'torch' not in sys.modules:
+            _deferred_torch_config = self
+        else:
+            self._apply_torch()
+
+        try:
+            # Optional: BLAS-Pools bereits geladener Bibliotheken nachträglich begrenzen
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(self.blas_threads)
+        except ImportError:
+            pass
+
+        _applied_settings.clear()
+        _applied_settings.update({'worker_slot': worker_slot, 'pid': os.getpid()})
+        return effective_settings()
+
+    def apply_interop_threads(self) -> bool:
+        """
+        Setzt die torch inter-op Threads. torch erlaubt das nur einmal pro Prozess
+        und vor der ersten parallelen Operation; der Wert vererbt sich beim Fork.
+        Unter Gunicorn mit preload_app deshalb im Master direkt nach dem
+        torch-Import aufrufen (api/wsgi.py), die Worker finden ihn dann gesetzt vor.
+
+        Returns:
+            True, wenn der konfigurierte Wert wirksam ist (Details in
+            effective_settings()['torch_inter_op'])
+        """
+        import torch
+        _interop_status.update(requested=self.inter_op_threads, error=None)
+        if torch.get_num_interop_threads() != self.inter_op_threads:
+            try:
+                torch.set_num_interop_threads(self.inter_op_threads)
+            except RuntimeError as e:
+                _interop_status['error'] = str(e)
+        _interop_status['applied'] = torch.get_num_interop_threads() == self.inter_op_threads
+        return _interop_status['applied']
+
+    def _apply_torch(self) -> None:
+        import torch
+        torch.set_num_threads(self.intra_op_threads)
+        self.apply_interop_threads()
+
+
+def apply_deferred_torch() -> None:
+    """Holt die per apply(defer_torch=True) aufgeschobenen torch-Einstellungen nach"""
+    global _deferred_torch_config
+    config, _deferred_torch_config = _deferred_torch_config, None
+    if config is not None:
+        config._apply_torch()
+
+
+# Zuletzt in diesem Prozess angewendete Konfiguration (für /health)
+_applied_settings: Dict[str, Any] = {}
+
+# Ergebnis von apply_interop_threads(): requested, applied, error (für Start-Log, /health, /ready)
+_interop_status: Dict[str, Any] = {}
+
+# Konfiguration, deren torch-Teil noch aussteht (Warm-up im Hintergrund)
+_deferred_torch_config: Optional['RuntimeConfig'] = None
+
+
+def effective_settings() -> Dict[str, Any]:
+    """
+    Gibt die im aktuellen Prozess wirksamen Thread-/CPU-Einstellungen zurück.
+    Importiert torch nicht selbst, falls es noch nicht geladen ist.
+    """
+    settings: Dict[str, Any] = dict(_applied_settings)
+    settings['pid'] = os.getpid()
+
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        settings['torch_intra_op_threads'] = torch.get_num_threads()
+        settings['torch_inter_op_threads'] = torch.get_num_interop_threads()
+    if _interop_status:
+        settings['torch_inter_op'] = dict(_interop_status)
+
+    settings['blas_env'] = {var: os.environ.get(var) for var in RuntimeConfig.BLAS_ENV_VARS}
+    if hasattr(os, 'sched_getaffinity'):
+        settings['cpu_affinity'] = sorted(os.sched_getaffinity(0))
+    return settings
+
+
+def _available_cpus() -> Set[int]:
+    """Kerne, auf denen der Prozess laufen darf"""
+    if hasattr(os, 'sched_getaffinity'):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+
+def _split_cpus(cpus: List[int], workers: int) -> List[Set[int]]:
+    """Teilt die Kerne in gleich große, zusammenhängende Sets auf"""
+    if workers > len(cpus):
+        return [{cpu} for cpu in cpus]
+    size = len(cpus) // workers
+    return [set(cpus[i * size:(i + 1) * size]) for i in range(workers)]
+
+
+def _parse_cpu_list(spec: str) -> Set[int]:
+    """Parst Kern-Listen wie '0-3,6' zu {0, 1, 2, 3, 6}"""
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-')
+            cpus.update(range(int(start), int(end) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
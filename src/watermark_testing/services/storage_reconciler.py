@@ -0,0 +1,278 @@
+"""
+Storage-Abgleich für den Upload-Ordner.
+
+Gleicht den Upload-Ordner mit der Datenbank ab und löscht:
+    - temp_* Dateien, die älter als die Temp-TTL sind (z.B. nach Fehlern in /manipulation/apply)
+    - Dateien ohne DB-Eintrag (Orphans), die älter als die Schonfrist sind.
+      Teil-Dateien offener, nicht abgelaufener Upload-Sessions zählen als registriert,
+      Sidecars (z.B. <datei>.peaks, siehe services/waveform.py) zählen wie ihre Datei.
+
+Ablauf (skaliert auf Millionen Dateien, ohne alle Pfade in Python-Listen zu halten):
+    1. Ein os.scandir()-Durchlauf, die Einträge werden in Blöcken in eine
+       temporäre Tabelle der DB-Verbindung geschrieben
+    2. Eine mengenbasierte Query (NOT EXISTS gegen audio_files und
+       manipulated_audio_files) liefert die Lösch-Kandidaten als Stream
+    3. Kandidaten werden blockweise gelöscht, freigegebener Speicher wird summiert
+
+Beispiel (aus src/watermark_testing):
+    python -m services.storage_reconciler --dry-run
+    python -m services.storage_reconciler --upload-folder /app/uploads --orphan-grace 3600
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Tuple
+
+from sqlalchemy import Table, Column, MetaData, String, BigInteger, Float, Boolean, select, exists, func, and_, or_
+from sqlalchemy.orm import Session
+
+from database.models import AudioFile, ManipulatedAudioFile, UploadSession
+
+# Umgebungsvariablen (Standardwerte für CLI und App)
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', '/app/uploads')
+TEMP_TTL_S = int(os.environ.get('STORAGE_TEMP_TTL_S', 15 * 60))
+ORPHAN_GRACE_S = int(os.environ.get('STORAGE_ORPHAN_GRACE_S', 24 * 60 * 60))
+
+# Präfix temporärer Dateien (siehe /manipulation/apply)
+TEMP_PREFIX = 'temp_'
+
+# Sidecar-Dateien neben einer gespeicherten Datei (Waveform-Pyramiden, siehe services/waveform.py)
+PEAKS_SUFFIX = '.peaks'
+RESIDUAL_PEAKS_SUFFIX = '.residual.peaks'
+RESIDUAL_REF_SUFFIX = '.residual.ref'
+# Längste Endung zuerst
+SIDECAR_SUFFIXES = (RESIDUAL_PEAKS_SUFFIX, RESIDUAL_REF_SUFFIX, PEAKS_SUFFIX)
+
+# Eigene MetaData: die Scan-Tabelle gehört nicht zum App-Schema (init_db)
+_scan_metadata = MetaData()
+_scan_table = Table(
+    'storage_scan', _scan_metadata,
+    Column('file_path', String(500), primary_key=True),
+    # Pfad der zugehörigen Datei (bei Sidecars ohne Endung, sonst file_path)
+    Column('owner_path', String(500), nullable=False),
+    Column('size', BigInteger, nullable=False),
+    Column('mtime', Float, nullable=False),
+    Column('is_temp', Boolean, nullable=False),
+    prefixes=['TEMPORARY']
+)
+
+
+def _owner_path(file_path: str) -> str:
+    """Pfad der Datei, zu der ein Sidecar gehört (sonst der Pfad selbst)"""
+    for suffix in SIDECAR_SUFFIXES:
+        if file_path.endswith(suffix):
+            return file_path[:-len(suffix)]
+    return file_path
+
+
+class StorageReconciler:
+    """
+    Gleicht Upload-Ordner und Datenbank ab und räumt verwaiste Dateien auf.
+    Unterordner werden nicht betrachtet.
+    """
+
+    def __init__(self, db: Session, upload_folder: str = UPLOAD_FOLDER,
+                 temp_ttl_s: int = TEMP_TTL_S, orphan_grace_s: int = ORPHAN_GRACE_S,
+                 batch_size: int = 5000):
+        """
+        Args:
+            db: DB-Session
+            upload_folder: Ordner, in dem die App Dateien ablegt
+            temp_ttl_s: Mindestalter (Sekunden) für temp_* Dateien
+            orphan_grace_s: Mindestalter (Sekunden) für Dateien ohne DB-Eintrag.
+                            Schützt Uploads, deren DB-Eintrag noch nicht committet ist.
+            batch_size: Blockgröße für Inserts in die Scan-Tabelle und Löschungen
+        """
+        self.db = db
+        # Pfade in der DB werden per os.path.join(UPLOAD_FOLDER, filename) gebildet
+        self.upload_folder = os.path.normpath(upload_folder)
+        self.temp_ttl_s = temp_ttl_s
+        self.orphan_grace_s = orphan_grace_s
+        self.batch_size = batch_size
+
+    def reconcile(self, dry_run: bool = False, force: bool = False) -> Dict[str, Any]:
+        """
+        Führt den Abgleich aus.
+
+        Args:
+            dry_run: True -> nichts löschen, nur berichten
+            force: Löschen auch dann, wenn keine einzige Datei einem DB-Eintrag
+                   zugeordnet werden konnte (sonst Abbruch, meist falscher Ordner)
+
+        Returns:
+            dict: Bericht (gescannte/registrierte/verwaiste Dateien, freigegebene Bytes, ...)
+
+        Raises:
+            ValueError: Wenn der Upload-Ordner nicht existiert oder der Abgleich
+                        verdächtig aussieht (siehe force)
+        """
+        if not os.path.isdir(self.upload_folder):
+            raise ValueError(f"Upload-Ordner existiert nicht: {self.upload_folder}")
+
+        start = time.perf_counter()
+        now = time.time()
+        connection = self.db.connection()
+
+        _scan_table.create(connection, checkfirst=True)
+        try:
+            connection.execute(_scan_table.delete())
+            scanned_files, scanned_bytes = self._scan(connection)
+            registered_files = connection.execute(
+                select(func.count()).select_from(_scan_table).where(self._is_registered())
+            ).scalar()
+            missing_files = self._count_missing(connection)
+
+            if scanned_files and registered_files == 0 and missing_files and not force:
+                raise ValueError(
+                    "Keine Datei im Upload-Ordner passt zu einem DB-Eintrag – "
+                    "falscher Ordner? (Abbruch, mit force=True erzwingen)"
+                )
+
+            report = {
+                'upload_folder': self.upload_folder,
+                'dry_run': dry_run,
+                'scanned_files': scanned_files,
+                'scanned_bytes': scanned_bytes,
+                'registered_files': registered_files,
+                'missing_files': missing_files,  # DB-Einträge ohne Datei (werden nicht gelöscht)
+                'deleted_temp_files': 0,
+                'deleted_orphan_files': 0,
+                'reclaimed_bytes': 0,
+                'errors': 0,
+            }
+
+            for batch in self._candidates(connection, now):
+                self._delete_batch(batch, dry_run, report)
+
+            _scan_table.drop(connection)
+        finally:
+            # Bei Fehlern verwirft der Rollback die Scan-Tabelle (bzw. der nächste Lauf leert sie)
+            self.db.rollback()
+
+        report['elapsed_s'] = round(time.perf_counter() - start, 3)
+        return report
+
+    # ==========================================
+    # SCHRITTE
+    # ==========================================
+
+    def _scan(self, connection) -> Tuple[int, int]:
+        """Ein Verzeichnis-Durchlauf, blockweise in die Scan-Tabelle"""
+        scanned_files = scanned_bytes = 0
+        batch: List[dict] = []
+
+        with os.scandir(self.upload_folder) as entries:
+            for entry in entries:
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue  # parallel gelöscht
+
+                file_path = os.path.join(self.upload_folder, entry.name)
+                batch.append({
+                    'file_path': file_path,
+                    'owner_path': _owner_path(file_path),
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'is_temp': entry.name.startswith(TEMP_PREFIX),
+                })
+                scanned_files += 1
+                scanned_bytes += stat.st_size
+
+                if len(batch) >= self.batch_size:
+                    connection.execute(_scan_table.insert(), batch)
+                    batch = []
+
+        if batch:
+            connection.execute(_scan_table.insert(), batch)
+        return scanned_files, scanned_bytes
+
+    @staticmethod
+    def _is_registered():
+        """Bedingung: Datei hat einen Eintrag in einer der Datei-Tabellen (oder gehört zu einem laufenden Upload)"""
+        scan_path = _scan_table.c.owner_path
+        return or_(
+            exists().where(AudioFile.file_path == scan_path),
+            exists().where(ManipulatedAudioFile.file_path == scan_path),
+            exists().where(
+                UploadSession.file_path == scan_path,
+                UploadSession.status == 'open',
+                UploadSession.expires_at > datetime.utcnow()
+            )
+        )
+
+    def _candidates(self, connection, now: float) -> Iterator[List[Any]]:
+        """Mengenbasierte Query über alle Lösch-Kandidaten, blockweise gestreamt"""
+        scan = _scan_table.c
+        query = select(scan.file_path, scan.size, scan.is_temp).where(
+            ~self._is_registered(),
+            or_(
+                and_(scan.is_temp.is_(True), scan.mtime < now - self.temp_ttl_s),
+                and_(scan.is_temp.is_(False), scan.mtime < now - self.orphan_grace_s)
+            )
+        )
+
+        result = connection.execution_options(yield_per=self.batch_size).execute(query)
+        for partition in result.partitions():
+            yield partition
+
+    def _count_missing(self, connection) -> int:
+        """Anzahl DB-Einträge direkt in diesem Ordner, deren Datei fehlt"""
+        prefix = os.path.join(self.upload_folder, '')
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        missing = 0
+        for model in (AudioFile, ManipulatedAudioFile):
+            missing += connection.execute(
+                select(func.count()).select_from(model.__table__).where(
+                    model.file_path.like(escaped + '%', escape='\\'),
+                    ~model.file_path.like(escaped + '%/%', escape='\\'),  # Unterordner
+                    ~exists().where(_scan_table.c.file_path == model.file_path)
+                )
+            ).scalar()
+        return missing
+
+    @staticmethod
+    def _delete_batch(batch: List[Any], dry_run: bool, report: Dict[str, Any]) -> None:
+        """Löscht einen Block Kandidaten und aktualisiert den Bericht"""
+        for file_path, size, is_temp in batch:
+            if not dry_run:
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    print(f"Warnung: Konnte {file_path} nicht löschen: {e}")
+                    report['errors'] += 1
+                    continue
+
+            report['deleted_temp_files' if is_temp else 'deleted_orphan_files'] += 1
+            report['reclaimed_bytes'] += size
+
+
+def main():
+    from database.database import init_db, get_db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--upload-folder', default=UPLOAD_FOLDER)
+    parser.add_argument('--temp-ttl', type=int, default=TEMP_TTL_S, help='Mindestalter temp_* Dateien (Sekunden)')
+    parser.add_argument('--orphan-grace', type=int, default=ORPHAN_GRACE_S,
+                        help='Mindestalter von Dateien ohne DB-Eintrag (Sekunden)')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--dry-run', action='store_true', help='Nur berichten, nichts löschen')
+    parser.add_argument('--force', action='store_true', help='Auch löschen, wenn keine Datei zur DB passt')
+    args = parser.parse_args()
+
+    init_db()
+    with get_db() as db:
+        reconciler = StorageReconciler(db, args.upload_folder, args.temp_ttl, args.orphan_grace, args.batch_size)
+        report = reconciler.reconcile(dry_run=args.dry_run, force=args.force)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
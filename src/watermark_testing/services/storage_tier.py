@@ -0,0 +1,399 @@
+"""
+Komprimierte Ablage (FLAC) für Originale und Ergebnisse.
+
+Uploads und Ausgaben sind meist unkomprimiertes WAV und lassen den
+Upload-Ordner schnell wachsen. compress() wandelt WAV mit Ganzzahl-PCM
+(16/24 bit) nach dem Speichern verlustfrei in FLAC um; gespeichert wird der
+FLAC-Pfad. Leser brauchen keine Anpassung: soundfile/librosa (AudioService,
+Strategien, Manipulationen) dekodieren FLAC direkt.
+
+Beim Download entscheidet Content Negotiation (?format=wav|flac oder
+Accept: audio/flac / audio/wav) über das Format. Ohne Angabe bekommt der
+Client das Format seines Uploads, also weiterhin WAV - dekodiert beim Senden
+(wav_stream(), ohne Zwischendatei, Range per Sprung zum passenden Frame).
+FLAC wird direkt ausgeliefert (sendfile, Range, ETag).
+
+Nicht umgewandelt werden Float-WAV (FLAC kann kein Float), andere Formate
+und Dateien, bei denen das Kodieren fehlschlägt. Zusatz-Chunks im WAV
+(z.B. LIST-Metadaten) gehen verloren, die Samples bleiben bitgenau.
+
+Kompressionsrate, CPU-Zeit fürs Kodieren/Dekodieren und gesparte Bytes
+(Platte und Download) stehen in /metrics (watermark_storage_*,
+watermark_download_*). Bestehende WAV-Dateien umwandeln und berichten
+(aus src/watermark_testing):
+    python -m services.storage_tier --dry-run
+    python -m services.storage_tier
+
+Umgebungsvariablen:
+    STORAGE_FORMAT        'flac' (Standard) oder 'original' (keine Umwandlung)
+    STORAGE_FLAC_LEVEL    Kompressionsstufe 0.0-1.0 (Standard: 0.5, entspricht libFLAC -4)
+"""
+import argparse
+import json
+import os
+import struct
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from services import metrics
+from services.storage_reconciler import TEMP_PREFIX, UPLOAD_FOLDER
+
+STORAGE_FORMAT = os.environ.get('STORAGE_FORMAT', 'flac').lower()
+STORAGE_FLAC_LEVEL = float(os.environ.get('STORAGE_FLAC_LEVEL', 0.5))
+
+# Subtypes, die FLAC verlustfrei speichert -> Bits pro Sample
+LOSSLESS_SUBTYPES = {'PCM_16': 16, 'PCM_24': 24}
+
+# Frames pro Block beim Umkodieren
+BLOCK_FRAMES = 1 << 16
+
+MIMETYPES = {'wav': 'audio/wav', 'flac': 'audio/flac'}
+
+# Accept-Werte -> Format
+ACCEPT_TYPES = {
+    'audio/wav': 'wav', 'audio/x-wav': 'wav', 'audio/wave': 'wav', 'audio/vnd.wave': 'wav',
+    'audio/flac': 'flac', 'audio/x-flac': 'flac',
+}
+
+STORAGE_BYTES = metrics.register(metrics.Counter(
+    'watermark_storage_bytes_total',
+    'Größe umgewandelter Dateien vorher (original) und nachher (stored); Kompressionsrate = stored / original',
+    ('stage',)
+))
+STORAGE_FILES = metrics.register(metrics.Counter(
+    'watermark_storage_files_total',
+    'Gespeicherte Dateien nach Ergebnis (compressed, skipped, failed)',
+    ('result',)
+))
+STORAGE_CPU = metrics.register(metrics.Counter(
+    'watermark_storage_cpu_seconds_total',
+    'CPU-Zeit für FLAC-Kodierung beim Speichern (encode) und WAV-Dekodierung beim Download (decode)',
+    ('operation',)
+))
+DOWNLOAD_BYTES = metrics.register(metrics.Counter(
+    'watermark_download_bytes_total',
+    'Ausgelieferte Audio-Bytes nach Format (ohne Range/304)',
+    ('format',)
+))
+DOWNLOAD_SAVED_BYTES = metrics.register(metrics.Counter(
+    'watermark_download_saved_bytes_total',
+    'Gesparte Bytes durch FLAC-Downloads gegenüber WAV',
+    ()
+))
+
+
+# ==========================================
+# SPEICHERN
+# ==========================================
+
+def compress(path: str, keep_source: bool = False, level: Optional[float] = None) -> str:
+    """
+    Wandelt eine WAV-Datei verlustfrei in FLAC (gleicher Name, Endung .flac)
+    und löscht das WAV.
+
+    Args:
+        path: Gespeicherte Datei
+        keep_source: WAV nicht löschen (z.B. weil ein älterer DB-Eintrag darauf zeigt)
+        level: Kompressionsstufe 0.0-1.0 (Standard: STORAGE_FLAC_LEVEL)
+
+    Returns:
+        Pfad der gespeicherten Datei (FLAC oder unverändert `path`)
+    """
+    if STORAGE_FORMAT != 'flac' or Path(path).suffix.lower() != '.wav':
+        return path
+
+    import soundfile as sf
+
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        STORAGE_FILES.inc(('skipped',))
+        return path
+    if info.format not in ('WAV', 'WAVEX') or info.subtype not in LOSSLESS_SUBTYPES:
+        STORAGE_FILES.inc(('skipped',))
+        return path
+
+    target = str(Path(path).with_suffix('.flac'))
+    # temp_-Präfix: Reste nach Abstürzen räumt der storage_reconciler auf
+    temp_path = os.path.join(os.path.dirname(path), f"{TEMP_PREFIX}{uuid.uuid4().hex}.flac")
+    cpu_start = time.thread_time()
+    try:
+        with metrics.stage_timer('compress'):
+            with sf.SoundFile(path) as source, sf.SoundFile(
+                temp_path, 'w', samplerate=info.samplerate, channels=info.channels,
+                format='FLAC', subtype=info.subtype, compression_level=STORAGE_FLAC_LEVEL if level is None else level
+            ) as encoded:
+                # int32 ist für 16 und 24 bit verlustfrei
+                for block in source.blocks(BLOCK_FRAMES, dtype='int32', always_2d=True):
+                    encoded.write(block)
+            os.replace(temp_path, target)
+    except (RuntimeError, OSError):
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        STORAGE_FILES.inc(('failed',))
+        return path
+    finally:
+        STORAGE_CPU.inc(('encode',), time.thread_time() - cpu_start)
+
+    STORAGE_BYTES.inc(('original',), os.path.getsize(path))
+    STORAGE_BYTES.inc(('stored',), os.path.getsize(target))
+    STORAGE_FILES.inc(('compressed',))
+    if not keep_source:
+        os.remove(path)
+    return target
+
+
+# ==========================================
+# AUSLIEFERN
+# ==========================================
+
+def negotiate_format(requested: Optional[str], accept, default: str) -> str:
+    """
+    Wählt das Download-Format.
+
+    Args:
+        requested: Query-Parameter ?format= (hat Vorrang)
+        accept: request.accept_mimetypes
+        default: Format ohne ausdrückliche Angabe (Endung des Uploads)
+
+    Returns:
+        'wav' oder 'flac'
+    """
+    if requested:
+        requested = requested.lower()
+        if requested not in MIMETYPES:
+            raise ValueError(f"Ungültiges Format '{requested}'. Erlaubt: {', '.join(MIMETYPES)}")
+        return requested
+
+    # Nur ausdrücklich genannte Typen zählen; */* behält das Upload-Format
+    best, best_quality = None, 0.0
+    for mimetype, quality in accept:
+        audio_format = ACCEPT_TYPES.get(mimetype.lower())
+        if audio_format and quality > best_quality:
+            best, best_quality = audio_format, quality
+    return best or default
+
+
+def stored_format(path: str) -> str:
+    """Format der gespeicherten Datei nach Endung ('wav', 'flac', ...)"""
+    return Path(path).suffix.lower().lstrip('.')
+
+
+def wav_header(sample_rate: int, channels: int, bits: int, frames: int) -> bytes:
+    """RIFF/WAVE-Header (PCM) für `frames` Frames"""
+    block_align = channels * bits // 8
+    data_size = frames * block_align
+    return (
+        struct.pack('<4sI4s', b'RIFF', 36 + data_size, b'WAVE')
+        + struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, sample_rate,
+                      sample_rate * block_align, block_align, bits)
+        + struct.pack('<4sI', b'data', data_size)
+    )
+
+
+def wav_stream(path: str) -> Tuple[int, 'WavStream']:
+    """
+    Dekodiert eine FLAC-Datei blockweise zu WAV, ohne Zwischendatei.
+
+    Returns:
+        (Content-Length, WavStream über die WAV-Bytes; seekbar für Range-Requests)
+
+    Raises:
+        ValueError: Subtype ohne verlustfreie WAV-Entsprechung
+    """
+    import soundfile as sf
+
+    info = sf.info(path)
+    bits = LOSSLESS_SUBTYPES.get(info.subtype)
+    if bits is None:
+        raise ValueError(f"Kein WAV-Export für Subtype {info.subtype}")
+    stream = WavStream(path, info.samplerate, info.channels, bits, info.frames)
+    return stream.length, stream
+
+
+class WavStream:
+    """
+    Iterator über die WAV-Bytes einer FLAC-Datei.
+
+    seek()/tell() arbeiten auf Byte-Positionen der WAV-Datei: der Header ist
+    fest (44 Bytes), danach entspricht jede Position einem Frame
+    (Position - Header) // block_align. Werkzeugs Range-Behandlung springt
+    per seek() direkt an den Anfang des Bereichs und dekodiert ab dem
+    passenden Frame - statt alles davor zu dekodieren und zu verwerfen.
+    """
+
+    def __init__(self, path: str, sample_rate: int, channels: int, bits: int, frames: int):
+        self.path = path
+        self.bits = bits
+        self.frames = frames
+        self.header = wav_header(sample_rate, channels, bits, frames)
+        self.block_align = channels * bits // 8
+        self.length = len(self.header) + frames * self.block_align
+        self._position = 0
+        self._source = None
+        self._cpu = 0.0
+
+    def __iter__(self) -> 'WavStream':
+        return self
+
+    def __next__(self) -> bytes:
+        if self._position < len(self.header):
+            data = self.header[self._position:]
+            self._position = len(self.header)
+            return data
+
+        frame, skip = divmod(self._position - len(self.header), self.block_align)
+        if frame >= self.frames:
+            self.close()
+            raise StopIteration
+
+        import numpy as np
+        import soundfile as sf
+
+        start = time.thread_time()
+        if self._source is None:
+            self._source = sf.SoundFile(self.path)
+        if self._source.tell() != frame:
+            self._source.seek(frame)
+        if self.bits == 16:
+            block = self._source.read(BLOCK_FRAMES, dtype='int16', always_2d=True)
+            data = block.astype('<i2', copy=False).tobytes()
+        else:
+            # 24 bit liegen linksbündig im int32: obere drei Bytes (little endian)
+            block = self._source.read(BLOCK_FRAMES, dtype='int32', always_2d=True)
+            data = np.ascontiguousarray(block, dtype='<i4').view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+        self._cpu += time.thread_time() - start
+
+        if not len(block):
+            self.close()
+            raise StopIteration
+        data = data[skip:]
+        self._position += len(data)
+        return data
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, position: int) -> None:
+        self._position = min(max(position, 0), self.length)
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        if self._cpu:
+            STORAGE_CPU.inc(('decode',), self._cpu)
+            self._cpu = 0.0
+
+
+def count_download(audio_format: str, size: int, wav_size: Optional[int] = None) -> None:
+    """Zählt ausgelieferte Bytes; bei FLAC mit `wav_size` auch die gesparten"""
+    DOWNLOAD_BYTES.inc((audio_format,), size)
+    if wav_size is not None and wav_size > size:
+        DOWNLOAD_SAVED_BYTES.inc((), wav_size - size)
+
+
+def wav_size(path: str) -> Optional[int]:
+    """Größe der Datei als WAV (Header + PCM), None wenn nicht bestimmbar"""
+    import soundfile as sf
+
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        return None
+    bits = LOSSLESS_SUBTYPES.get(info.subtype)
+    if bits is None:
+        return None
+    return len(wav_header(info.samplerate, info.channels, bits, 0)) + info.frames * info.channels * bits // 8
+
+
+# ==========================================
+# BESTAND UMWANDELN
+# ==========================================
+
+def compress_existing(db, upload_folder: str = UPLOAD_FOLDER, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Wandelt registrierte WAV-Dateien (Originale, Ergebnisse, Manipulationen)
+    in FLAC um und aktualisiert file_path und file_size aller Einträge.
+
+    Returns:
+        Bericht mit Bytes vorher/nachher, Kompressionsrate und CPU-Zeit
+    """
+    from sqlalchemy import func
+    from database.models import AudioFile, ManipulatedAudioFile
+
+    report = {
+        'upload_folder': upload_folder,
+        'dry_run': dry_run,
+        'candidates': 0,
+        'compressed': 0,
+        'skipped': 0,
+        'original_bytes': 0,
+        'stored_bytes': 0,
+        'encode_cpu_s': 0.0,
+    }
+    start = time.perf_counter()
+
+    paths = set()
+    for model in (AudioFile, ManipulatedAudioFile):
+        paths.update(path for (path,) in db.query(model.file_path).filter(
+            func.lower(model.file_path).like('%.wav')
+        ).distinct())
+
+    folder = os.path.normpath(upload_folder) + os.sep
+    for path in sorted(paths):
+        if not os.path.normpath(path).startswith(folder) or not os.path.exists(path):
+            continue
+        report['candidates'] += 1
+        if dry_run:
+            report['original_bytes'] += os.path.getsize(path)
+            continue
+
+        original_size = os.path.getsize(path)
+        cpu_start = time.process_time()
+        target = compress(path)
+        if target == path:
+            report['skipped'] += 1
+            continue
+        report['encode_cpu_s'] += time.process_time() - cpu_start
+
+        stored_size = os.path.getsize(target)
+        for model in (AudioFile, ManipulatedAudioFile):
+            db.query(model).filter(model.file_path == path).update(
+                {'file_path': target, 'file_size': stored_size}, synchronize_session=False
+            )
+        db.commit()
+        report['compressed'] += 1
+        report['original_bytes'] += original_size
+        report['stored_bytes'] += stored_size
+
+    if report['original_bytes'] and report['stored_bytes']:
+        report['ratio'] = round(report['stored_bytes'] / report['original_bytes'], 3)
+        report['saved_bytes'] = report['original_bytes'] - report['stored_bytes']
+    report['encode_cpu_s'] = round(report['encode_cpu_s'], 2)
+    report['elapsed_s'] = round(time.perf_counter() - start, 2)
+    return report
+
+
+def main():
+    from database.database import init_db, get_db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--upload-folder', default=UPLOAD_FOLDER)
+    parser.add_argument('--dry-run', action='store_true', help='Nur Kandidaten zählen, nichts umwandeln')
+    args = parser.parse_args()
+
+    init_db()
+    with get_db() as db:
+        report = compress_existing(db, args.upload_folder, dry_run=args.dry_run)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Streaming-Ingestion von Audio-Uploads.
+
+Werkzeug puffert Datei-Parts standardmäßig komplett in einem
+SpooledTemporaryFile; erst danach prüft AudioService Format und Größe und
+kopiert die Datei ein zweites Mal in den Upload-Ordner. Mit StreamingRequest
+(app.request_class) schreibt der Multipart-Parser Audio-Parts blockweise direkt
+in eine temp_*-Datei im Upload-Ordner:
+    - Magic Bytes werden mit dem ersten Block geprüft -> 415, bevor der Rest
+      des Bodys verarbeitet wird
+    - jeder Block prüft MAX_FILE_SIZE -> 413 mitten im Stream (auch ohne
+      Content-Length, z.B. bei chunked Transfer-Encoding)
+    - der SHA-256 entsteht beim Schreiben (kein zweites Lesen für das ETag)
+    - AudioService.store_upload() benennt die Datei nur noch um
+
+Nicht übernommene Dateien werden beim Schließen des Requests gelöscht, Reste
+nach Abstürzen räumt der storage_reconciler (temp_*) auf. Archive für die
+Batch-Detection und Parts ohne Audio-Endung laufen weiter über den
+Werkzeug-Standard.
+"""
+import hashlib
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+from services.audio_service import AudioService
+from services.storage_reconciler import TEMP_PREFIX
+
+# Zuschlag auf MAX_FILE_SIZE für Multipart-Header und Formularfelder
+MULTIPART_OVERHEAD = 64 * 1024
+
+# So viele Bytes braucht sniff_audio_format()
+MAGIC_BYTES = 12
+
+
+def sniff_audio_format(head: bytes) -> Optional[str]:
+    """
+    Erkennt das Container-Format an den ersten Bytes.
+
+    Returns:
+        'wav', 'flac', 'ogg', 'mp3', 'm4a' oder None
+    """
+    if head[:4] in (b'RIFF', b'RF64') and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    # ID3-Tag (MP3, selten auch FLAC) oder MPEG-Frame-Sync
+    if head[:3] == b'ID3' or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    if head[4:8] == b'ftyp':
+        return 'm4a'
+    return None
+
+
+def max_request_size() -> int:
+    """Obergrenze für Content-Length bei Einzel-Uploads"""
+    return AudioService.MAX_FILE_SIZE + MULTIPART_OVERHEAD
+
+
+class IngestFile:
+    """
+    Datei-Part, der beim Parsen direkt in den Upload-Ordner geschrieben wird.
+    Verhält sich zum Lesen wie eine normale Datei (FileStorage, soundfile).
+    """
+
+    def __init__(self, upload_folder: str, max_size: int):
+        self.path = os.path.join(upload_folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}.upload")
+        self.max_size = max_size
+        self.size = 0
+        self.format: Optional[str] = None
+        self.committed = False
+        self._head = b''
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'wb+')
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            max_mb = self.max_size / (1024 * 1024)
+            raise RequestEntityTooLarge(f"Datei zu groß. Maximum: {max_mb}MB")
+
+        if self.format is None and len(self._head) < MAGIC_BYTES:
+            self._head += data[:MAGIC_BYTES - len(self._head)]
+            if len(self._head) >= MAGIC_BYTES:
+                self.format = sniff_audio_format(self._head)
+                if self.format is None:
+                    self.discard()
+                    raise UnsupportedMediaType("Datei ist keine unterstützte Audio-Datei (WAV, FLAC, OGG, MP3, M4A)")
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def commit(self, target_path: str) -> str:
+        """
+        Übernimmt die Datei unter `target_path` (Umbenennen, kein Kopieren).
+
+        Returns:
+            SHA-256 des Inhalts
+        """
+        self._file.close()
+        os.replace(self.path, target_path)
+        self.path = target_path
+        self.committed = True
+        return self.sha256
+
+    def discard(self) -> None:
+        """Schließt und löscht die Temp-Datei"""
+        self._file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self) -> None:
+        if not self.committed:
+            self.discard()
+
+    def __getattr__(self, name):
+        # read, seek, tell, closed, ... der zugrundeliegenden Datei
+        return getattr(self._file, name)
+
+
+class StoredUpload:
+    """
+    Datei, die schon vollständig im Upload-Ordner liegt (z.B. aus Chunks
+    geschrieben, siehe services/chunked_upload_service.py). Gleiches
+    Interface wie IngestFile, damit AudioService sie nur umbenennt.
+    """
+
+    def __init__(self, path: str, sha256: Optional[str] = None):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.committed = False
+        self._sha256 = sha256
+        self._file = open(path, 'rb')
+        self.format = sniff_audio_format(self._file.read(MAGIC_BYTES))
+        self._file.seek(0)
+
+    @property
+    def sha256(self) -> Optional[str]:
+        return self._sha256
+
+    def commit(self, target_path: str) -> Optional[str]:
+        self._file.close()
+        os.replace(self.path, target_path)
+        self.path = target_path
+        self.committed = True
+        return self._sha256
+
+    def close(self) -> None:
+        # Die Datei gehört weiter ihrem Besitzer (Upload-Session), nur schließen
+        self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class StreamingRequest(Request):
+    """Request-Klasse, deren Multipart-Parser Audio-Parts über IngestFile schreibt"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ingest_files: List[IngestFile] = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload_folder = current_app.config.get('UPLOAD_FOLDER')
+        if upload_folder and filename and Path(filename).suffix.lower() in AudioService.ALLOWED_EXTENSIONS:
+            stream = IngestFile(upload_folder, AudioService.MAX_FILE_SIZE)
+            self._ingest_files.append(stream)
+            return stream
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def close(self) -> None:
+        # Auch Parts, die nach einem Abbruch nicht in request.files gelandet sind
+        try:
+            super().close()
+        finally:
+            for stream in self._ingest_files:
+                stream.close()
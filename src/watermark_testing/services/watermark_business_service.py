@@ -1,7 +1,10 @@
 import os
-from typing import Tuple, Dict, Any
-from database.repositories import AudioFileRepository
+import time
+from typing import Tuple, Dict, Any, Iterable, Iterator, BinaryIO, List, Optional
+from database.repositories import AudioFileRepository, DetectionResultRepository
+from database.unit_of_work import unit_of_work
 from services.audio_service import AudioService
+from services import storage_tier, waveform
 from services.watermark_strategy import WatermarkStrategyFactory
 
 
@@ -16,12 +19,16 @@ class WatermarkBusinessService:
     - Transaktionale Konsistenz
     """
     
-    def __init__(self, audio_repo: AudioFileRepository):
+    def __init__(self, audio_repo: AudioFileRepository,
+                 detection_repo: Optional[DetectionResultRepository] = None):
         """
         Args:
             audio_repo: Repository für AudioFile-Datenbankzugriffe
+            detection_repo: Repository für Detection-Ergebnisse
+                            (Standard: auf derselben Session wie audio_repo)
         """
         self.audio_repo = audio_repo
+        self.detection_repo = detection_repo or DetectionResultRepository(audio_repo.db)
     
     def embed_watermark_workflow(
         self, 
@@ -34,7 +41,7 @@ class WatermarkBusinessService:
         Kompletter Workflow für Watermark-Embedding:
         1. Original-Datei speichern
         2. Watermark einbetten
-        3. Beide Dateien in Datenbank registrieren
+        3. Beide Dateien in Datenbank registrieren (eine Transaktion)
         
         Args:
             file: Hochgeladene Datei (Werkzeug FileStorage)
@@ -55,7 +62,6 @@ class WatermarkBusinessService:
         
         # 2. Original-Datei speichern
         filename, input_path = AudioService.save_uploaded_file(file, upload_folder)
-        original_metadata = AudioService.get_audio_metadata(input_path)
         
         # 3. Output-Pfad vorbereiten
         output_filename = f"watermarked_{method}_{filename}"
@@ -64,32 +70,38 @@ class WatermarkBusinessService:
         # 4. Watermark einbetten
         strategy.embed(input_path, output_path)
         
-        # 5. Metadaten der watermarked Datei extrahieren
+        # 5. Beide Dateien als FLAC ablegen, Metadaten der gespeicherten Dateien extrahieren
+        input_path = self._store_at_rest(input_path)
+        output_path = self._store_at_rest(output_path)
+        original_metadata = AudioService.get_audio_metadata(input_path)
         watermarked_metadata = AudioService.get_audio_metadata(output_path)
         
-        # 6. Original in DB speichern
-        original_file = self.audio_repo.create(
-            user_id=user_id,
-            filename=filename,
-            file_path=input_path,
-            file_size=original_metadata['file_size'],
-            sample_rate=original_metadata['sample_rate'],
-            duration=original_metadata['duration'],
-            has_watermark=False,
-            watermark_type=None
-        )
+        # Original für das Residuum der Waveform-Vorschau vormerken (berechnet beim ersten Abruf)
+        self._register_residual(output_path, input_path)
         
-        # 7. Watermarked in DB speichern
-        watermarked_file = self.audio_repo.create(
-            user_id=user_id,
-            filename=output_filename,
-            file_path=output_path,
-            file_size=watermarked_metadata['file_size'],
-            sample_rate=watermarked_metadata['sample_rate'],
-            duration=watermarked_metadata['duration'],
-            has_watermark=True,
-            watermark_type=strategy.name
-        )
+        # 6. + 7. Original und Watermarked in einer Transaktion speichern (ein Commit)
+        with unit_of_work(self.audio_repo.db):
+            original_file = self.audio_repo.create(
+                user_id=user_id,
+                filename=filename,
+                file_path=input_path,
+                file_size=original_metadata['file_size'],
+                sample_rate=original_metadata['sample_rate'],
+                duration=original_metadata['duration'],
+                has_watermark=False,
+                watermark_type=None
+            )
+            
+            watermarked_file = self.audio_repo.create(
+                user_id=user_id,
+                filename=output_filename,
+                file_path=output_path,
+                file_size=watermarked_metadata['file_size'],
+                sample_rate=watermarked_metadata['sample_rate'],
+                duration=watermarked_metadata['duration'],
+                has_watermark=True,
+                watermark_type=strategy.name
+            )
         
         return output_path, {
             'original_id': original_file.id,
@@ -103,55 +115,314 @@ class WatermarkBusinessService:
         file, 
         method: str, 
         upload_folder: str, 
-        user_id: int
+        user_id: int,
+        expected_message: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Kompletter Workflow für Watermark-Detection:
         1. Datei speichern
         2. Watermark detektieren
-        3. Datei mit Detection-Ergebnis in DB registrieren
+        3. Datei und Detection-Ergebnis in DB registrieren (eine Transaktion)
         
         Args:
             file: Hochgeladene Datei (Werkzeug FileStorage)
             method: Watermarking-Methode ('audioseal' oder 'perth')
             upload_folder: Ordner für gespeicherte Dateien
             user_id: ID des Users
+            expected_message: Optional eingebettete Bits (z.B. "0101..."), für bit_accuracy
             
         Returns:
             dict: Detection-Ergebnis inkl. DB-ID und Metadaten
             
         Raises:
-            ValueError: Bei ungültiger Methode oder Datei-Problemen
+            ValueError: Bei ungültiger Methode, erwarteter Nachricht oder Datei-Problemen
         """
-        # 1. Strategy holen
+        # 1. Strategy holen, erwartete Nachricht vor Speichern und Inference prüfen
         strategy = WatermarkStrategyFactory.get_strategy(method)
+        expected_message = self.validate_expected_message(strategy, expected_message)
         
         # 2. Datei speichern
         filename, input_path = AudioService.save_uploaded_file(file, upload_folder)
-        metadata = AudioService.get_audio_metadata(input_path)
         
-        # 3. Detection durchführen
+        # 3. Detection durchführen (mit Laufzeitmessung)
+        start = time.perf_counter()
         detection_result = strategy.detect(input_path)
+        latency_ms = (time.perf_counter() - start) * 1000
         
-        # 4. In DB speichern mit Detection-Info
-        audio_file = self.audio_repo.create(
-            user_id=user_id,
-            filename=filename,
-            file_path=input_path,
-            file_size=metadata['file_size'],
-            sample_rate=metadata['sample_rate'],
-            duration=metadata['duration'],
-            has_watermark=detection_result['detected'],
-            watermark_type=detection_result['watermark_type'] if detection_result['detected'] else None
-        )
+        input_path = self._store_at_rest(input_path)
+        metadata = AudioService.get_audio_metadata(input_path)
+        
+        # 4. Datei + Detection-Ergebnis in DB speichern
+        with unit_of_work(self.audio_repo.db):
+            audio_file = self.audio_repo.create(
+                user_id=user_id,
+                filename=filename,
+                file_path=input_path,
+                file_size=metadata['file_size'],
+                sample_rate=metadata['sample_rate'],
+                duration=metadata['duration'],
+                has_watermark=detection_result['detected'],
+                watermark_type=detection_result['watermark_type'] if detection_result['detected'] else None
+            )
+            stored = self.detection_repo.create(**self._detection_entry(
+                strategy, detection_result, user_id, latency_ms, expected_message,
+                audio_file_id=audio_file.id
+            ))
         
         # 5. Ergebnis zusammenstellen
         detection_result['audio_id'] = audio_file.id
+        detection_result['detection_id'] = stored.id
         detection_result['filename'] = filename
         detection_result['method'] = strategy.name
+        if stored.bit_accuracy is not None:
+            detection_result['bit_accuracy'] = stored.bit_accuracy
+        
+        return detection_result
+    
+    def detect_stored_workflow(
+        self,
+        file_path: str,
+        method: str,
+        user_id: int,
+        audio_file_id: Optional[int] = None,
+        manipulated_audio_id: Optional[int] = None,
+        expected_message: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Detection auf einer bereits gespeicherten Datei (z.B. nach einer Manipulation),
+        ohne erneuten Upload. Das Ergebnis wird mit der Datei verknüpft gespeichert.
+        
+        Args:
+            file_path: Pfad der gespeicherten Datei
+            method: Watermarking-Methode ('audioseal' oder 'perth')
+            user_id: ID des Users
+            audio_file_id: ID der AudioFile (falls Original/Upload)
+            manipulated_audio_id: ID der ManipulatedAudioFile (falls manipuliert)
+            expected_message: Optional eingebettete Bits, für bit_accuracy
+            
+        Returns:
+            dict: Detection-Ergebnis inkl. detection_id
+            
+        Raises:
+            ValueError: Bei ungültiger Methode oder erwarteter Nachricht
+        """
+        strategy = WatermarkStrategyFactory.get_strategy(method)
+        expected_message = self.validate_expected_message(strategy, expected_message)
+        
+        start = time.perf_counter()
+        detection_result = strategy.detect(file_path)
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        stored = self.detection_repo.create(**self._detection_entry(
+            strategy, detection_result, user_id, latency_ms, expected_message,
+            audio_file_id=audio_file_id, manipulated_audio_id=manipulated_audio_id
+        ))
+        
+        detection_result['detection_id'] = stored.id
+        detection_result['method'] = strategy.name
+        if stored.bit_accuracy is not None:
+            detection_result['bit_accuracy'] = stored.bit_accuracy
         
         return detection_result
     
+    def detect_batch_workflow(
+        self,
+        entries: Iterable[Tuple[str, BinaryIO]],
+        method: str,
+        upload_folder: str,
+        user_id: int,
+        batch_size: int = 16
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Workflow für Batch-Detection vieler Dateien:
+        1. Einträge nacheinander speichern (Stream, kein komplettes Entpacken)
+        2. Je `batch_size` Dateien gemeinsam detektieren
+        3. Ergebnisse eines Batches mit einem Commit in DB speichern
+        
+        Fehler einzelner Dateien brechen den Batch nicht ab, sondern
+        erscheinen als Ergebnis mit 'error'-Key.
+        
+        Args:
+            entries: (dateiname, stream) Paare, z.B. aus AudioService.iter_archive_entries
+            method: Watermarking-Methode ('audioseal' oder 'perth')
+            upload_folder: Ordner für gespeicherte Dateien
+            user_id: ID des Users
+            batch_size: Anzahl Dateien pro Detection-/DB-Batch
+            
+        Yields:
+            dict: Detection-Ergebnis pro Datei, sobald der jeweilige Batch fertig ist
+            
+        Raises:
+            ValueError: Bei ungültiger Methode oder ungültigem Archiv
+        """
+        strategy = WatermarkStrategyFactory.get_strategy(method)
+        pending: List[Tuple[str, str]] = []
+        
+        for entry_name, stream in entries:
+            try:
+                pending.append(AudioService.save_stream(stream, entry_name, upload_folder))
+            except ValueError as e:
+                yield {'filename': os.path.basename(entry_name), 'error': str(e)}
+                continue
+            
+            if len(pending) >= batch_size:
+                yield from self._detect_and_store(strategy, pending, user_id)
+                pending = []
+        
+        if pending:
+            yield from self._detect_and_store(strategy, pending, user_id)
+    
+    def _detect_and_store(self, strategy, saved_files: List[Tuple[str, str]], user_id: int) -> List[Dict[str, Any]]:
+        """Detektiert einen Batch gespeicherter Dateien und speichert alle Treffer mit einem Commit"""
+        paths = [path for _, path in saved_files]
+        start = time.perf_counter()
+        try:
+            detections = strategy.detect_batch(paths)
+        except Exception:
+            # Eine defekte Datei soll nicht den ganzen Batch kosten: einzeln wiederholen
+            detections = []
+            for path in paths:
+                try:
+                    detections.append(strategy.detect(path))
+                except Exception as e:
+                    detections.append({'error': f'Detection fehlgeschlagen: {e}'})
+        # Batch-Laufzeit anteilig pro Datei
+        latency_ms = (time.perf_counter() - start) * 1000 / len(paths)
+        
+        results = []
+        entries = []
+        for (filename, path), detection in zip(saved_files, detections):
+            if 'error' in detection:
+                results.append({'filename': filename, **detection})
+                continue
+            try:
+                path = self._store_at_rest(path)
+                metadata = AudioService.get_audio_metadata(path)
+            except ValueError as e:
+                results.append({'filename': filename, 'error': str(e)})
+                continue
+            
+            detection.update(filename=filename, method=strategy.name)
+            results.append(detection)
+            entries.append({
+                'user_id': user_id,
+                'filename': filename,
+                'file_path': path,
+                'file_size': metadata['file_size'],
+                'sample_rate': metadata['sample_rate'],
+                'duration': metadata['duration'],
+                'has_watermark': detection['detected'],
+                'watermark_type': detection['watermark_type'] if detection['detected'] else None
+            })
+        
+        # Ein Commit für den ganzen Batch (Dateien + Detection-Ergebnisse)
+        stored_results = [r for r in results if 'error' not in r]
+        with unit_of_work(self.audio_repo.db):
+            stored = self.audio_repo.create_many(entries)
+            self.detection_repo.create_many([
+                self._detection_entry(strategy, detection, user_id, latency_ms,
+                                      audio_file_id=audio_file.id)
+                for detection, audio_file in zip(stored_results, stored)
+            ])
+        for detection, audio_file in zip(stored_results, stored):
+            detection['audio_id'] = audio_file.id
+        
+        return results
+    
+    def _store_at_rest(self, path: str) -> str:
+        """
+        Legt eine gespeicherte Datei komprimiert ab (services/storage_tier.py).
+        Zeigt ein älterer Eintrag auf denselben Pfad (gleichnamiger Upload),
+        bleibt das WAV für ihn liegen.
+        
+        Returns:
+            Pfad der abgelegten Datei (für die DB)
+        """
+        return storage_tier.compress(path, keep_source=self.audio_repo.path_in_use(path))
+    
+    @staticmethod
+    def _register_residual(output_path: str, input_path: str) -> None:
+        """
+        Merkt das Original für die Residuum-Pyramide vor (services/waveform.py).
+        Nur für die Vorschau: Fehler brechen das Embedding nicht ab.
+        """
+        try:
+            waveform.register_residual(output_path, input_path)
+        except Exception as e:
+            print(f"Warnung: Residuum für {output_path} nicht vorgemerkt: {e}")
+    
+    @staticmethod
+    def _detection_entry(strategy, detection: Dict[str, Any], user_id: int, latency_ms: float,
+                         expected_message: Optional[str] = None, **links) -> Dict[str, Any]:
+        """Baut die Felder für DetectionResultRepository.create aus einem Detection-Ergebnis"""
+        message = detection.get('message')
+        return {
+            'user_id': user_id,
+            'method': strategy.name,
+            'detected': bool(detection['detected']),
+            'confidence': detection.get('confidence'),
+            'bit_accuracy': WatermarkBusinessService._bit_accuracy(message, expected_message),
+            'message': message,
+            'latency_ms': latency_ms,
+            'model_version': strategy.model_version,
+            **links
+        }
+    
+    @staticmethod
+    def validate_expected_message(strategy, expected_message: Optional[str]) -> Optional[str]:
+        """
+        Prüft die erwartete Nachricht, bevor eine Datei gespeichert oder ein Modell gerechnet hat.
+        
+        Args:
+            strategy: WatermarkStrategy der Detection
+            expected_message: Bits als String, z.B. "0110..." (None/leer: keine Referenz)
+            
+        Returns:
+            Nachricht ohne Leerzeichen am Rand oder None
+            
+        Raises:
+            ValueError: Methode ohne Nachricht, andere Zeichen als 0/1 oder falsche Länge
+        """
+        if expected_message is None:
+            return None
+        expected_message = expected_message.strip()
+        if not expected_message:
+            return None
+        
+        if strategy.message_bits is None:
+            raise ValueError(f"{strategy.name} bettet keine Nachricht ein (expected_message nicht möglich)")
+        if set(expected_message) - {'0', '1'}:
+            raise ValueError("expected_message darf nur 0 und 1 enthalten")
+        if len(expected_message) != strategy.message_bits:
+            raise ValueError(f"expected_message muss {strategy.message_bits} Bits haben")
+        return expected_message
+    
+    @staticmethod
+    def _bit_accuracy(message, expected_message: Optional[str]) -> Optional[float]:
+        """
+        Anteil korrekt extrahierter Bits (0.0 - 1.0).
+        
+        Args:
+            message: Extrahierte Bits, z.B. [[0, 1, ...]] (AudioSeal)
+            expected_message: Erwartete Bits als String, z.B. "0110..."
+                              (vorab mit validate_expected_message geprüft)
+            
+        Returns:
+            None, wenn keine Nachricht/Referenz vorhanden ist
+        """
+        if message is None or not expected_message:
+            return None
+        
+        bits = message
+        while bits and isinstance(bits[0], list):
+            bits = bits[0]  # [[...]] -> [...]
+        expected = [int(bit) for bit in expected_message]
+        
+        if not bits or len(bits) != len(expected):
+            raise ValueError(f"Erwartete Nachricht muss {len(bits)} Bits haben")
+        
+        return sum(int(a) == b for a, b in zip(bits, expected)) / len(expected)
+    
     def upload_audio_workflow(
         self,
         file,
@@ -172,8 +443,9 @@ class WatermarkBusinessService:
         Returns:
             dict: Metadaten und DB-ID
         """
-        # 1. Datei speichern
+        # 1. Datei speichern (als FLAC, falls verlustfrei möglich)
         filename, filepath = AudioService.save_uploaded_file(file, upload_folder)
+        filepath = self._store_at_rest(filepath)
         
         # 2. Metadaten extrahieren
         metadata = AudioService.get_audio_metadata(filepath)
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
-import numpy as np
-import torch
+import sys
+from typing import Dict, Any, List, Optional
+from services.metrics import stage_timer
+
+# numpy/torch werden erst in den Methoden importiert, damit der API-Start
+# (und z.B. /health) nicht auf die ML-Bibliotheken wartet
 
 
 class WatermarkStrategy(ABC):
@@ -37,11 +40,52 @@ class WatermarkStrategy(ABC):
         """
         pass
     
+    def detect_batch(self, input_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        Detektiert Watermarks in mehreren Audio-Dateien.
+        Standard: nacheinander mit dem gecachten Modell, Methoden können
+        echtes Batching überschreiben.
+        
+        Args:
+            input_paths: Pfade zu den Audio-Dateien
+            
+        Returns:
+            Liste von Detection-Ergebnissen (gleiche Reihenfolge wie input_paths)
+        """
+        return [self.detect(path) for path in input_paths]
+    
     @property
     @abstractmethod
     def name(self) -> str:
         """Name der Watermarking-Methode"""
         pass
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Kennung des verwendeten Modells (wird mit Detection-Ergebnissen gespeichert)"""
+        return None
+    
+    @property
+    def message_bits(self) -> Optional[int]:
+        """Länge der eingebetteten Nachricht in Bits (None: Methode trägt keine Nachricht)"""
+        return None
+    
+    def warm_up(self) -> None:
+        """
+        Lädt die Modelle der Methode vorab in den Prozess-Cache.
+        Wird im Production-Server vor dem Forken der Worker aufgerufen,
+        damit sich alle Worker die Gewichte copy-on-write teilen.
+        Standard: nichts zu laden.
+        """
+        pass
+    
+    def is_loaded(self) -> bool:
+        """
+        Ob die Modelle der Methode bereits im Prozess geladen sind (für /ready).
+        Darf selbst nichts importieren oder laden.
+        Standard: nichts zu laden, also immer True.
+        """
+        return True
 
 
 class AudioSealStrategy(WatermarkStrategy):
@@ -54,17 +98,41 @@ class AudioSealStrategy(WatermarkStrategy):
     def name(self) -> str:
         return "AudioSeal"
     
+    @property
+    def message_bits(self) -> int:
+        return 16
+    
+    @property
+    def model_version(self) -> str:
+        from aimodels.AudioSeal.audioseal_handler import model_version
+        return model_version()
+    
+    def warm_up(self) -> None:
+        from aimodels.AudioSeal.audioseal_handler import get_generator, get_detector
+        
+        get_generator()
+        get_detector()
+    
+    def is_loaded(self) -> bool:
+        handler = sys.modules.get('aimodels.AudioSeal.audioseal_handler')
+        return handler is not None and all(
+            getter.cache_info().currsize > 0 for getter in (handler.get_generator, handler.get_detector)
+        )
+    
     def embed(self, input_path: str, output_path: str) -> str:
         from aimodels.AudioSeal.audioseal_handler import prepare_audio, embed_watermark, save_audio
         
         # 1. Audio vorbereiten
-        audio_tensor, sr = prepare_audio(input_path)
+        with stage_timer('load_audio'):
+            audio_tensor, sr = prepare_audio(input_path)
         
         # 2. Watermark einbetten
-        watermarked_audio = embed_watermark(audio_tensor, sr)
+        with stage_timer('inference'):
+            watermarked_audio = embed_watermark(audio_tensor, sr)
         
         # 3. Speichern
-        save_audio(watermarked_audio, sr, output_path)
+        with stage_timer('write_audio'):
+            save_audio(watermarked_audio, sr, output_path)
         
         return output_path
     
@@ -72,12 +140,42 @@ class AudioSealStrategy(WatermarkStrategy):
         from aimodels.AudioSeal.audioseal_handler import prepare_audio, detect_watermark
         
         # 1. Audio vorbereiten
-        audio_tensor, sr = prepare_audio(input_path)
+        with stage_timer('load_audio'):
+            audio_tensor, sr = prepare_audio(input_path)
         
         # 2. Detection durchführen
-        confidence, message = detect_watermark(audio_tensor, sr)
+        with stage_timer('inference'):
+            confidence, message = detect_watermark(audio_tensor, sr)
+        
+        return self._build_result(confidence, message)
+    
+    def detect_batch(self, input_paths: List[str]) -> List[Dict[str, Any]]:
+        from aimodels.AudioSeal.audioseal_handler import prepare_audio, detect_watermark_batch
+        import torch
+        
+        # 1. Audio laden und nach Länge gruppieren: nur gleich lange Clips werden
+        #    gestapelt, damit kein Padding die Frame-Auswertung verfälscht
+        groups = {}
+        sr = None
+        for index, path in enumerate(input_paths):
+            with stage_timer('load_audio'):
+                audio_tensor, sr = prepare_audio(path)
+            groups.setdefault(audio_tensor.shape[-1], []).append((index, audio_tensor))
+        
+        # 2. Ein Forward-Pass pro Gruppe
+        results = [None] * len(input_paths)
+        for items in groups.values():
+            batch = torch.cat([tensor for _, tensor in items], dim=0)
+            with stage_timer('inference'):
+                confidences, messages = detect_watermark_batch(batch, sr)
+            for row, (index, _) in enumerate(items):
+                results[index] = self._build_result(confidences[row], messages[row:row + 1])
         
-        # 3. Tensor zu Python-Typen konvertieren
+        return results
+    
+    def _build_result(self, confidence, message) -> Dict[str, Any]:
+        """Wandelt Modell-Output in ein JSON-serialisierbares Detection-Ergebnis"""
+        # Tensor zu Python-Typen konvertieren
         if hasattr(confidence, 'cpu'):
             confidence = float(confidence.cpu().detach().numpy())
         else:
@@ -86,7 +184,7 @@ class AudioSealStrategy(WatermarkStrategy):
         if hasattr(message, 'cpu'):
             message = message.cpu().detach().numpy().tolist()
         
-        # 4. Confidence in Prozent
+        # Confidence in Prozent
         confidence_percent = confidence * 100
         detected = bool(confidence_percent >= 50)  # Threshold: 50%
         
@@ -108,19 +206,48 @@ class PerthStrategy(WatermarkStrategy):
     def name(self) -> str:
         return "PerTh"
     
+    @property
+    def model_version(self) -> str:
+        from aimodels.PerTh.perth_handler import model_version
+        return model_version()
+    
+    def warm_up(self) -> None:
+        from aimodels.PerTh.perth_handler import get_watermarker
+        
+        get_watermarker()
+    
+    def is_loaded(self) -> bool:
+        handler = sys.modules.get('aimodels.PerTh.perth_handler')
+        return handler is not None and handler.get_watermarker.cache_info().currsize > 0
+    
     def embed(self, input_path: str, output_path: str) -> str:
-        from aimodels.PerTh.perth_handler import embed_perth_watermark
+        from aimodels.PerTh.perth_handler import load_audio, embed_perth_array
+        import soundfile as sf
         
-        # Watermark einbetten und speichern
-        embed_perth_watermark(input_path, output_path)
+        # 1. Audio laden
+        with stage_timer('load_audio'):
+            wav, sr = load_audio(input_path)
+        
+        # 2. Watermark einbetten
+        with stage_timer('inference'):
+            watermarked_audio = embed_perth_array(wav, sr)
+        
+        # 3. Speichern
+        with stage_timer('write_audio'):
+            sf.write(output_path, watermarked_audio, sr)
         
         return output_path
     
     def detect(self, input_path: str) -> Dict[str, Any]:
-        from aimodels.PerTh.perth_handler import detect_perth_watermark
+        from aimodels.PerTh.perth_handler import load_audio, detect_perth_array
+        
+        # 1. Audio laden
+        with stage_timer('load_audio'):
+            wav, sr = load_audio(input_path)
         
-        # Detection durchführen
-        watermark, detected = detect_perth_watermark(input_path)
+        # 2. Detection durchführen
+        with stage_timer('inference'):
+            watermark, detected = detect_perth_array(wav, sr)
         
         result = {
             'detected': bool(detected),
@@ -129,6 +256,7 @@ class PerthStrategy(WatermarkStrategy):
         
         # Watermark-Daten hinzufügen falls vorhanden
         if watermark is not None:
+            import numpy as np
             if isinstance(watermark, np.ndarray):
                 result['watermark'] = watermark.tolist()
             else:
@@ -186,6 +314,25 @@ class WatermarkStrategyFactory:
         
         cls._strategies[name.lower()] = strategy_class
     
+    @classmethod
+    def warm_up_all(cls) -> Dict[str, str]:
+        """
+        Lädt die Modelle aller registrierten Methoden vorab.
+        Fehler einzelner Methoden brechen den Start nicht ab.
+        
+        Returns:
+            dict: Methode -> 'loaded' oder Fehlermeldung
+        """
+        status = {}
+        for method, strategy_class in cls._strategies.items():
+            try:
+                strategy_class().warm_up()
+                status[method] = 'loaded'
+            except Exception as e:
+                print(f"⚠️ Modell für '{method}' konnte nicht vorgeladen werden: {e}")
+                status[method] = f'error: {e}'
+        return status
+    
     @classmethod
     def available_methods(cls) -> list:
         """Gibt Liste aller verfügbaren Methoden zurück"""
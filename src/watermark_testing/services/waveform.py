@@ -0,0 +1,352 @@
+"""
+Waveform-Vorschau über Peak-Pyramiden.
+
+Für jede gespeicherte Datei wird einmal eine Min/Max-Pyramide berechnet und
+als Sidecar neben der Datei abgelegt (<datei>.peaks). Stufe 0 fasst je
+BASE_SAMPLES_PER_PEAK Samples (Kanäle zusammen) zu einem (min, max)-Paar
+zusammen, jede weitere Stufe je zwei Paare der vorigen, bis höchstens
+MIN_LEVEL_PEAKS Paare übrig sind. Die Sidecar-Datei ist etwa 1,6 % eines
+16-bit-Mono-WAVs groß.
+
+read_peaks() liefert einen beliebigen Ausschnitt in `width` Pixeln: gelesen
+werden nur die Paare der passenden Stufe im Ausschnitt (höchstens etwa
+2 × width), unabhängig von der Dateilänge. Unterhalb der feinsten Stufe
+werden die Samples des Ausschnitts direkt gelesen (höchstens
+width × BASE_SAMPLES_PER_PEAK).
+
+Für Watermark-Ergebnisse gibt es zusätzlich die Pyramide des Residuums
+Watermarked − Original (<datei>.residual.peaks), damit die UI das
+eingebettete Signal als eigene Spur zeigen kann. Das Embedding merkt nur
+das Original vor (<datei>.residual.ref, register_residual()); berechnet
+wird das Residuum blockweise beim ersten Abruf der Spur. Es ist sehr leise
+und wird deshalb auf seinen Spitzenwert skaliert gespeichert (`scale`).
+
+Format (little endian):
+    Header  HEADER_FORMAT: Magic, Sample-Rate, Frames, Samples pro Paar (Stufe 0),
+            Anzahl Stufen, scale (Amplitude von 32767), Größe und mtime_ns der Quelldatei
+    Daten   pro Stufe ceil(frames / samples_pro_paar) Paare (min, max) als int16
+
+Stimmen Größe oder mtime der Datei nicht mehr mit dem Header überein (z.B.
+gleichnamiger Upload), wird die Pyramide neu berechnet bzw. das Residuum
+verworfen. Sidecars registrierter Dateien lässt der storage_reconciler stehen.
+"""
+import json
+import os
+import struct
+import uuid
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from services.metrics import stage_timer
+from services.storage_reconciler import TEMP_PREFIX, PEAKS_SUFFIX, RESIDUAL_PEAKS_SUFFIX, RESIDUAL_REF_SUFFIX
+
+MAGIC = b'WPK1'
+HEADER_FORMAT = '<4sIQIHfQq'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+BASE_SAMPLES_PER_PEAK = 256
+MIN_LEVEL_PEAKS = 256
+
+# Obergrenze für die Breite eines Ausschnitts in Pixeln
+MAX_WIDTH = 8192
+
+# Frames pro Leseblock beim Berechnen (Vielfaches von BASE_SAMPLES_PER_PEAK)
+BLOCK_FRAMES = BASE_SAMPLES_PER_PEAK * 1024
+
+TRACKS = ('audio', 'residual')
+
+
+def sidecar_path(file_path: str, track: str = 'audio') -> str:
+    """Pfad der Pyramide einer Datei"""
+    return file_path + (RESIDUAL_PEAKS_SUFFIX if track == 'residual' else PEAKS_SUFFIX)
+
+
+def remove_sidecars(file_path: str) -> None:
+    """Löscht die Pyramiden einer Datei (beim Löschen der Datei)"""
+    for path in [sidecar_path(file_path, track) for track in TRACKS] + [file_path + RESIDUAL_REF_SUFFIX]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ==========================================
+# BERECHNEN
+# ==========================================
+
+def _level_counts(frames: int, levels: int):
+    counts = []
+    samples_per_peak = BASE_SAMPLES_PER_PEAK
+    for _ in range(levels):
+        counts.append(max(1, -(-frames // samples_per_peak)))
+        samples_per_peak *= 2
+    return counts
+
+
+def _base_peaks(blocks: Iterator['np.ndarray']) -> Tuple['np.ndarray', 'np.ndarray', int]:
+    """(min, max) je BASE_SAMPLES_PER_PEAK Samples aus Mono-Blöcken (float32)"""
+    import numpy as np
+
+    minima, maxima, frames = [], [], 0
+    for block in blocks:
+        frames += len(block)
+        pad = -len(block) % BASE_SAMPLES_PER_PEAK
+        if pad:
+            # Letzter Block: mit dem letzten Wert auffüllen, damit min/max unverändert bleiben
+            block = np.concatenate([block, np.full(pad, block[-1], dtype=block.dtype)])
+        groups = block.reshape(-1, BASE_SAMPLES_PER_PEAK)
+        minima.append(groups.min(axis=1))
+        maxima.append(groups.max(axis=1))
+    if not frames:
+        return np.zeros(1, np.float32), np.zeros(1, np.float32), 0
+    return np.concatenate(minima), np.concatenate(maxima), frames
+
+
+def _write_pyramid(target: str, source_path: str, sample_rate: int, frames: int,
+                   minima: 'np.ndarray', maxima: 'np.ndarray', scale: float) -> None:
+    import numpy as np
+
+    levels = [(minima, maxima)]
+    while len(levels[-1][0]) > MIN_LEVEL_PEAKS:
+        low, high = levels[-1]
+        if len(low) % 2:
+            low, high = np.append(low, low[-1]), np.append(high, high[-1])
+        levels.append((low.reshape(-1, 2).min(axis=1), high.reshape(-1, 2).max(axis=1)))
+
+    stat = os.stat(source_path)
+    header = struct.pack(HEADER_FORMAT, MAGIC, sample_rate, frames, BASE_SAMPLES_PER_PEAK,
+                         len(levels), scale, stat.st_size, stat.st_mtime_ns)
+
+    # Atomar ersetzen: parallele Berechnungen derselben Datei überschreiben sich nur
+    temp_path = os.path.join(os.path.dirname(target), f"{TEMP_PREFIX}{uuid.uuid4().hex}.peaks")
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            for low, high in levels:
+                pairs = np.empty((len(low), 2), dtype='<i2')
+                pairs[:, 0] = np.clip(np.round(low / scale * 32767), -32768, 32767)
+                pairs[:, 1] = np.clip(np.round(high / scale * 32767), -32768, 32767)
+                f.write(pairs.tobytes())
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _mono_blocks(path: str, start: int = 0, frames: int = -1) -> Iterator['np.ndarray']:
+    """Mono-Blöcke (Mittel der Kanäle) als float32"""
+    import soundfile as sf
+
+    with sf.SoundFile(path) as source:
+        if start:
+            source.seek(start)
+        for block in source.blocks(BLOCK_FRAMES, frames=frames, dtype='float32', always_2d=True):
+            yield block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+
+def build_pyramid(file_path: str) -> str:
+    """
+    Berechnet die Pyramide einer Audio-Datei (ein Durchlauf, blockweise).
+
+    Returns:
+        Pfad der Sidecar-Datei
+    """
+    import soundfile as sf
+
+    with stage_timer('peaks'):
+        sample_rate = sf.info(file_path).samplerate
+        minima, maxima, frames = _base_peaks(_mono_blocks(file_path))
+        target = sidecar_path(file_path)
+        _write_pyramid(target, file_path, sample_rate, frames, minima, maxima, 1.0)
+    return target
+
+
+def register_residual(file_path: str, reference_path: str) -> str:
+    """
+    Merkt `reference_path` als Original für das Residuum von `file_path` vor
+    (kostet nur eine kleine Datei). Berechnet wird beim ersten Abruf der Spur.
+
+    Returns:
+        Pfad der Sidecar-Datei
+    """
+    target = file_path + RESIDUAL_REF_SUFFIX
+    temp_path = os.path.join(os.path.dirname(target), f"{TEMP_PREFIX}{uuid.uuid4().hex}.ref")
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump({'reference': reference_path}, f)
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    # Residuum eines früheren gleichnamigen Ergebnisses gilt nicht mehr
+    try:
+        os.remove(sidecar_path(file_path, 'residual'))
+    except FileNotFoundError:
+        pass
+    return target
+
+
+def _residual_reference(file_path: str) -> Optional[str]:
+    """Vorgemerktes Original einer Datei (None ohne Vormerkung)"""
+    try:
+        with open(file_path + RESIDUAL_REF_SUFFIX) as f:
+            return json.load(f)['reference']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _residual_blocks(file_path: str, reference_path: str, sample_rate: int) -> Iterator['np.ndarray']:
+    """Mono-Blöcke von `file_path` − `reference_path` (bis zum Ende der kürzeren Datei)"""
+    import soundfile as sf
+
+    with sf.SoundFile(reference_path) as reference:
+        if reference.samplerate == sample_rate:
+            def read(frames: int) -> 'np.ndarray':
+                return reference.read(frames, dtype='float32', always_2d=True).mean(axis=1)
+        else:
+            # Resampling braucht das ganze Signal (nur beim ersten Abruf, nicht im Embedding)
+            import librosa
+            resampled, _ = librosa.load(reference_path, sr=sample_rate, mono=True)
+            position = 0
+
+            def read(frames: int) -> 'np.ndarray':
+                nonlocal position
+                block = resampled[position:position + frames]
+                position += len(block)
+                return block
+
+        for block in _mono_blocks(file_path):
+            reference_block = read(len(block))
+            if not len(reference_block):
+                return
+            yield block[:len(reference_block)] - reference_block
+
+
+def build_residual(file_path: str, reference_path: str) -> str:
+    """
+    Berechnet die Pyramide von `file_path` − `reference_path` (z.B. Watermarked
+    − Original) blockweise. Die Referenz wird bei abweichender Sample-Rate auf
+    die von `file_path` resampelt (AudioSeal arbeitet mit 44.1 kHz).
+
+    Returns:
+        Pfad der Sidecar-Datei
+    """
+    import numpy as np
+    import soundfile as sf
+
+    with stage_timer('peaks'):
+        sample_rate = sf.info(file_path).samplerate
+        minima, maxima, frames = _base_peaks(_residual_blocks(file_path, reference_path, sample_rate))
+        scale = float(max(-minima.min(), maxima.max())) if frames else 0.0
+        target = sidecar_path(file_path, 'residual')
+        _write_pyramid(target, file_path, sample_rate, frames, minima, maxima, scale or 1.0)
+    return target
+
+
+# ==========================================
+# LESEN
+# ==========================================
+
+def _read_header(path: str, source_path: str) -> Optional[tuple]:
+    """Header der Pyramide, None wenn sie fehlt oder nicht mehr zur Datei passt"""
+    try:
+        with open(path, 'rb') as f:
+            header = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        stat = os.stat(source_path)
+    except (OSError, struct.error):
+        return None
+    if header[0] != MAGIC or header[6:] != (stat.st_size, stat.st_mtime_ns):
+        return None
+    return header
+
+
+def _reduce(low: 'np.ndarray', high: 'np.ndarray', width: int) -> Tuple['np.ndarray', 'np.ndarray']:
+    """Fasst Paare bzw. Samples auf höchstens `width` Pixel zusammen"""
+    import numpy as np
+
+    if len(low) <= width:
+        return low, high
+    edges = (np.arange(width) * len(low)) // width
+    return np.minimum.reduceat(low, edges), np.maximum.reduceat(high, edges)
+
+
+def read_peaks(file_path: str, track: str = 'audio', start: float = 0.0,
+               end: Optional[float] = None, width: int = 1000) -> Dict[str, Any]:
+    """
+    Min/Max-Werte eines Ausschnitts in höchstens `width` Pixeln.
+
+    Args:
+        file_path: Gespeicherte Audio-Datei
+        track: 'audio' oder 'residual' (nur für Watermark-Ergebnisse, beim ersten Abruf berechnet)
+        start, end: Ausschnitt in Sekunden (end=None: bis zum Ende)
+        width: Anzahl Pixel
+
+    Returns:
+        dict mit sample_rate, duration, start, end, samples_per_peak, scale
+        und min/max als int16-Listen (32767 entspricht `scale`)
+
+    Raises:
+        ValueError: Ungültige Parameter
+        FileNotFoundError: Kein Residuum für diese Datei
+    """
+    import numpy as np
+
+    if track not in TRACKS:
+        raise ValueError(f"Ungültige Spur '{track}'. Erlaubt: {', '.join(TRACKS)}")
+    if not 1 <= width <= MAX_WIDTH:
+        raise ValueError(f"width muss zwischen 1 und {MAX_WIDTH} liegen")
+
+    path = sidecar_path(file_path, track)
+    header = _read_header(path, file_path)
+    if header is None:
+        if track == 'residual':
+            reference = _residual_reference(file_path)
+            if reference is None or not os.path.exists(reference):
+                raise FileNotFoundError("Kein Residuum für diese Datei (nur für Watermark-Ergebnisse)")
+            build_residual(file_path, reference)
+        else:
+            build_pyramid(file_path)
+        header = _read_header(path, file_path)
+    _, sample_rate, frames, base, levels, scale = header[:6]
+
+    duration = frames / sample_rate
+    end = duration if end is None else min(end, duration)
+    start = max(0.0, start)
+    if end <= start:
+        raise ValueError("end muss größer als start sein")
+    first, last = int(start * sample_rate), int(np.ceil(end * sample_rate))
+
+    samples_per_pixel = (last - first) / width
+    if samples_per_pixel < base and track == 'audio':
+        # Feiner als Stufe 0: Samples des Ausschnitts direkt lesen
+        samples = np.concatenate(list(_mono_blocks(file_path, first, last - first)) or [np.zeros(0, np.float32)])
+        samples = np.clip(np.round(samples * 32767), -32768, 32767).astype(np.int16)
+        low, high = _reduce(samples, samples, width)
+        samples_per_peak = 1
+    else:
+        # Gröbste Stufe, die noch mindestens ein Paar pro Pixel liefert
+        level = 0
+        while level + 1 < levels and base * 2 ** (level + 1) <= samples_per_pixel:
+            level += 1
+        samples_per_peak = base * 2 ** level
+        counts = _level_counts(frames, levels)
+        offset = HEADER_SIZE + 4 * sum(counts[:level])
+        index_first = first // samples_per_peak
+        index_last = min(counts[level], -(-last // samples_per_peak))
+
+        with open(path, 'rb') as f:
+            f.seek(offset + 4 * index_first)
+            pairs = np.fromfile(f, dtype='<i2', count=2 * (index_last - index_first)).reshape(-1, 2)
+        low, high = _reduce(pairs[:, 0], pairs[:, 1], width)
+
+    return {
+        'track': track,
+        'sample_rate': sample_rate,
+        'duration': duration,
+        'start': first / sample_rate,
+        'end': last / sample_rate,
+        'samples_per_peak': samples_per_peak,
+        'scale': scale,
+        'min': low.tolist(),
+        'max': high.tolist(),
+    }
@@ -0,0 +1,52 @@
+"""
+Gemeinsame Fixtures: Flask-Testclient mit eigener SQLite-DB, eigenem
+Upload-Ordner und Stand-in-Modellen (keine Checkpoints nötig).
+
+Aufruf (aus src/watermark_testing):
+    python -m pytest -q tests
+"""
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+# Vor dem Import der App setzen: DB-URL, Upload-Ordner und Chunk-Größe werden beim Import gelesen
+_workdir = tempfile.mkdtemp(prefix='watermark_tests_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault('UPLOAD_FOLDER', os.path.join(_workdir, 'uploads'))
+os.environ.setdefault('WATERMARK_STAND_IN_MODELS', '1')
+os.environ.setdefault('UPLOAD_CHUNK_SIZE', str(64 * 1024))
+
+sys.path[:0] = [str(PACKAGE_ROOT), str(PACKAGE_ROOT / 'api')]
+
+
+@pytest.fixture(scope='session')
+def app():
+    from api.app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_wav():
+    """Fabrik für 16-bit-Mono-WAVs (Rauschen, `seed` macht Inhalte unterscheidbar)"""
+    import numpy as np
+    import soundfile as sf
+
+    def make(seconds: float = 5.0, sample_rate: int = 16000, seed: int = 0) -> bytes:
+        buffer = io.BytesIO()
+        samples = np.random.RandomState(seed).randn(int(seconds * sample_rate)) * 0.1
+        sf.write(buffer, samples, sample_rate, format='WAV', subtype='PCM_16')
+        return buffer.getvalue()
+
+    return make
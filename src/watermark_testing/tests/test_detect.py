@@ -0,0 +1,38 @@
+"""Detection: ungültige expected_message wird vor Speichern und Inference abgelehnt"""
+import io
+import os
+
+import pytest
+
+from services.watermark_strategy import WatermarkStrategyFactory
+
+
+@pytest.mark.parametrize('expected_message, method', [
+    ('01x0101010101010', 'audioseal'),   # andere Zeichen
+    ('0101', 'audioseal'),               # falsche Länge
+    ('0101010101010101', 'perth'),       # Methode ohne Nachricht
+])
+def test_invalid_expected_message_is_rejected_before_saving(client, make_wav, monkeypatch, expected_message, method):
+    strategy_class = type(WatermarkStrategyFactory.get_strategy(method))
+    monkeypatch.setattr(strategy_class, 'detect', lambda self, path: pytest.fail('Inference trotz ungültiger Nachricht'))
+    before = set(os.listdir(os.environ['UPLOAD_FOLDER']))
+
+    response = client.post('/watermark/detect', data={
+        'audio': (io.BytesIO(make_wav(seconds=1)), 'probe.wav'),
+        'method': method,
+        'expected_message': expected_message,
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert set(os.listdir(os.environ['UPLOAD_FOLDER'])) == before
+
+
+def test_valid_expected_message_yields_bit_accuracy(client, make_wav):
+    response = client.post('/watermark/detect', data={
+        'audio': (io.BytesIO(make_wav(seconds=1)), 'probe.wav'),
+        'method': 'audioseal',
+        'expected_message': '0101010101010101',
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert 0.0 <= response.json['bit_accuracy'] <= 1.0
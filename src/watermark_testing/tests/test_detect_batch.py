@@ -0,0 +1,107 @@
+"""
+Batch-Detection: gleichnamige Archiv-Einträge dürfen sich nicht überschreiben,
+die Gesamtgröße eines Batches ist begrenzt (413).
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from database.database import get_db
+from database.repositories import AudioFileRepository
+from services.audio_service import AudioService
+
+
+def test_archive_entries_with_same_name_are_stored_separately(client, make_wav):
+    first, second = make_wav(seed=1), make_wav(seed=2)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('a/x.wav', first)
+        zf.writestr('b/x.wav', second)
+    archive.seek(0)
+
+    response = client.post('/watermark/detect/batch', data={'archive': (archive, 'set.zip'), 'method': 'audioseal'},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [r.get('error') for r in results] == [None, None]
+
+    with get_db() as db:
+        repo = AudioFileRepository(db)
+        stored = [repo.get_by_id(r['audio_id']) for r in results]
+        assert [f.filename for f in stored] == ['x.wav', 'x.wav']
+        assert stored[0].file_path != stored[1].file_path
+        paths = [f.file_path for f in stored]
+
+    for path, original in zip(paths, (first, second)):
+        expected, _ = sf.read(io.BytesIO(original), dtype='int16')
+        actual, _ = sf.read(path, dtype='int16')
+        assert np.array_equal(expected, actual)
+
+
+def _zip(*entries: bytes) -> io.BytesIO:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i, data in enumerate(entries):
+            zf.writestr(f'clip_{i}.wav', data)
+    archive.seek(0)
+    return archive
+
+
+def _tar(*entries: bytes) -> io.BytesIO:
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode='w:gz') as tf:
+        for i, data in enumerate(entries):
+            info = tarfile.TarInfo(f'clip_{i}.wav')
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    archive.seek(0)
+    return archive
+
+
+@pytest.fixture
+def batch_limit(monkeypatch):
+    """Batch-Limit 80 KB: zwei 1-s-Clips (je ~32 KB) passen, drei nicht"""
+    monkeypatch.setattr(AudioService, 'MAX_BATCH_SIZE', 80 * 1024)
+
+
+# TAR-Größen stehen erst beim Lesen fest: Einträge unter dem Limit sind dann schon gespeichert
+@pytest.mark.parametrize('make_data, max_stored', [
+    (lambda clips: {'audio': [(io.BytesIO(c), f'{i}.wav') for i, c in enumerate(clips)]}, 0),
+    (lambda clips: {'archive': (_zip(*clips), 'set.zip')}, 0),
+    (lambda clips: {'archive': (_tar(*clips), 'set.tar.gz')}, 2),
+], ids=['uploads', 'zip', 'tar'])
+def test_batch_over_total_size_is_rejected(client, make_wav, batch_limit, make_data, max_stored):
+    clips = [make_wav(seconds=1, seed=i) for i in range(3)]
+    before = set(os.listdir(os.environ['UPLOAD_FOLDER']))
+
+    response = client.post('/watermark/detect/batch', data={**make_data(clips), 'method': 'audioseal'},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 413
+    assert 'Batch zu groß' in response.json['error']
+    assert len(set(os.listdir(os.environ['UPLOAD_FOLDER'])) - before) <= max_stored
+
+
+def test_batch_body_over_limit_is_rejected_before_parsing(client, make_wav, monkeypatch):
+    monkeypatch.setattr(AudioService, 'MAX_BATCH_SIZE', 1024)
+    clips = [(io.BytesIO(make_wav(seconds=1, seed=i)), f'{i}.wav') for i in range(3)]
+
+    response = client.post('/watermark/detect/batch', data={'audio': clips, 'method': 'audioseal'},
+                           content_type='multipart/form-data')
+
+    assert response.status_code == 413
+
+
+def test_batch_under_total_size_is_accepted(client, make_wav, batch_limit):
+    response = client.post('/watermark/detect/batch', data={
+        'archive': (_zip(make_wav(seconds=1, seed=1), make_wav(seconds=1, seed=2)), 'set.zip'),
+        'method': 'audioseal',
+    }, content_type='multipart/form-data')
+
+    assert response.status_code == 200
+    assert response.json['count'] == 2
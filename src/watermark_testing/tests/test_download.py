@@ -0,0 +1,42 @@
+"""Download als FLAC gespeicherter Dateien: WAV-Dekodierung mit Range-Support"""
+import io
+
+import pytest
+
+
+@pytest.fixture
+def flac_stored(client, make_wav):
+    """Lädt ein 16-bit-WAV hoch (als FLAC gespeichert); liefert (audio_id, WAV-Bytes am Stück)"""
+    response = client.post('/upload', data={'audio': (io.BytesIO(make_wav(seconds=2, seed=3)), 'range.wav')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    audio_id = response.json['audio_id']
+
+    full = client.get(f'/download/{audio_id}')
+    assert full.status_code == 200
+    assert full.mimetype == 'audio/wav'
+    assert full.headers['ETag'].endswith('.wav"')  # beim Senden aus FLAC dekodiert
+    assert full.headers['Accept-Ranges'] == 'bytes'
+    return audio_id, full.data
+
+
+@pytest.mark.parametrize('byte_range', ['0-99', '30-1000', '44-44', '1001-'])
+def test_wav_range_on_flac_stored_file(client, flac_stored, byte_range):
+    audio_id, full = flac_stored
+    start, _, end = byte_range.partition('-')
+    start, end = int(start), int(end) if end else len(full) - 1
+
+    response = client.get(f'/download/{audio_id}', headers={'Range': f'bytes={byte_range}'})
+
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes {start}-{end}/{len(full)}'
+    assert response.data == full[start:end + 1]
+
+
+def test_wav_range_with_stale_if_range_returns_full_body(client, flac_stored):
+    audio_id, full = flac_stored
+
+    response = client.get(f'/download/{audio_id}', headers={'Range': 'bytes=0-99', 'If-Range': '"veraltet"'})
+
+    assert response.status_code == 200
+    assert response.data == full
@@ -0,0 +1,26 @@
+"""Manipulationen: MP3-Kompression behält das Kanal-Layout (Datei- und Array-Pfad)"""
+import shutil
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from services.audio_manipulation_service import AudioManipulationService
+
+pytestmark = pytest.mark.skipif(shutil.which('ffmpeg') is None, reason='MP3-Encoding braucht ffmpeg')
+
+
+@pytest.mark.parametrize('channels', [1, 2])
+def test_compression_keeps_channel_layout(tmp_path, channels):
+    pytest.importorskip('pydub')
+    rng = np.random.RandomState(0)
+    audio = (rng.randn(16000, channels) * 0.1).astype(np.float32)
+    audio = audio[:, 0] if channels == 1 else audio
+    input_path, output_path = str(tmp_path / 'in.wav'), str(tmp_path / 'out.mp3')
+    sf.write(input_path, audio, 16000, subtype='PCM_16')
+
+    compressed = AudioManipulationService.apply_compression_array(audio, 16000, 128)
+    AudioManipulationService.apply_compression(input_path, output_path, 128)
+
+    assert compressed.ndim == audio.ndim
+    assert sf.info(output_path).channels == channels
@@ -0,0 +1,43 @@
+"""
+Speicher-Regression (benchmarks/memory_check.py) als Test: ohne feste Zugabe,
+auf einem Clip, bei dem der Faktor pro Stage die längenunabhängigen Puffer
+überwiegt. Läuft in einem eigenen Prozess, weil MEMORY_TRACKING beim Import
+von services.metrics gelesen wird und tracemalloc prozessweit ist.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+# 120 s @ 44.1 kHz = 20 MB dekodiert; timestretch liegt hier bei ~13.5x (Limit 16x)
+DURATION_S = 120
+
+
+def test_stage_peaks_stay_below_their_factor(tmp_path):
+    output = tmp_path / 'memory.json'
+    # Ohne Stand-in-Modelle: nur installierte Watermarking-Methoden werden gemessen
+    env = {key: value for key, value in os.environ.items() if key != 'WATERMARK_STAND_IN_MODELS'}
+
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.memory_check', '--duration', str(DURATION_S),
+         '--allowance-mb', '0', '--output', str(output)],
+        cwd=PACKAGE_ROOT, env=env, capture_output=True, text=True, timeout=600
+    )
+
+    assert output.exists(), completed.stderr
+    report = json.loads(output.read_text())
+    assert report['allowance_bytes'] == 0
+    cases = {result['case']: result['stages'] for result in report['results']}
+    assert {'manipulation:lowpass', 'manipulation:timestretch'} <= set(cases)
+
+    over = [
+        f"{case}/{stage}: {values['factor']}x"
+        for case, stages in cases.items()
+        for stage, values in stages.items()
+        if values['peak_bytes'] > values['limit_bytes']
+    ]
+    assert not over, completed.stdout
+    assert completed.returncode == 0, completed.stdout
@@ -0,0 +1,56 @@
+"""
+Request-Profiling: Profil-IDs sind serverseitig eindeutig, eine wiederholte
+X-Request-ID überschreibt kein vorhandenes Profil.
+"""
+import pytest
+
+from services import profiling
+
+TOKEN = 'test-admin-token'
+
+
+@pytest.fixture
+def profile_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'ADMIN_TOKEN', TOKEN)
+    monkeypatch.setattr(profiling, 'PROFILE_FOLDER', str(tmp_path))
+    monkeypatch.setattr(profiling, '_rate_limiter', profiling._RateLimiter(10))
+    return tmp_path
+
+
+def test_repeated_request_id_keeps_both_profiles(client, profile_folder):
+    headers = {'X-Profile': TOKEN, 'X-Request-ID': 'same-id'}
+    profile_ids = [client.get('/health', headers=headers).headers['X-Profile-Id'] for _ in range(2)]
+
+    assert profile_ids[0] != profile_ids[1]
+    assert all(profile_id.startswith('same-id_') for profile_id in profile_ids)
+
+    response = client.get('/admin/profiles', headers={'X-Admin-Token': TOKEN})
+    listed = {p['profile_id']: p for p in response.get_json()['profiles']}
+    assert set(listed) == set(profile_ids)
+    assert all(p['request_id'] == 'same-id' for p in listed.values())
+
+    for profile_id in profile_ids:
+        response = client.get(f'/admin/profiles/{profile_id}', headers={'X-Admin-Token': TOKEN})
+        assert response.status_code == 200
+
+
+def test_save_refuses_to_overwrite(profile_folder):
+    profiler = profiling.RequestProfiler('deterministic')
+    assert profiler.start()
+    profiler.save('fixed-id', {})
+
+    with pytest.raises(FileExistsError):
+        profiling.RequestProfiler('deterministic').save('fixed-id', {})
+
+
+@pytest.mark.parametrize('error', [PermissionError(13, 'Permission denied'), FileExistsError(17, 'File exists'),
+                                   OSError(28, 'No space left on device')])
+def test_failing_save_keeps_response(client, profile_folder, monkeypatch, error):
+    def fail(self, profile_id, meta):
+        raise error
+    monkeypatch.setattr(profiling.RequestProfiler, 'save', fail)
+
+    response = client.get('/health', headers={'X-Profile': TOKEN})
+
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
@@ -0,0 +1,53 @@
+"""
+torch inter-op Threads: im Master gesetzt, vom Worker übernommen; ein
+gescheiterter Versuch steht in den Einstellungen statt nur im Log. Läuft in
+eigenen Prozessen, weil torch den Wert nur einmal pro Prozess annimmt.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+SCRIPT = """
+import json, os, torch
+from services import runtime_config
+if {preload}:
+    runtime_config.RuntimeConfig.from_env().apply_interop_threads()
+else:
+    torch.set_num_interop_threads(2)
+torch.ones(64, 64) @ torch.ones(64, 64)
+pid = os.fork()
+if pid == 0:
+    settings = runtime_config.RuntimeConfig.from_env(workers=2).apply(0)
+    print(json.dumps(settings['torch_inter_op']))
+    os._exit(0)
+os.waitpid(pid, 0)
+"""
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='braucht fork()')
+@pytest.mark.parametrize('preload, applied', [(True, True), (False, False)])
+def test_interop_threads_are_reported(preload, applied):
+    pytest.importorskip('torch')
+    completed = subprocess.run(
+        [sys.executable, '-c', SCRIPT.format(preload=preload)],
+        cwd=PACKAGE_ROOT, env={**os.environ, 'TORCH_INTEROP_THREADS': '3'},
+        capture_output=True, text=True, timeout=120
+    )
+    assert completed.returncode == 0, completed.stderr
+
+    status = json.loads(completed.stdout.strip().splitlines()[-1])
+    assert status['requested'] == 3
+    assert status['applied'] is applied
+    assert (status['error'] is None) is applied
+
+
+def test_ready_reports_runtime(client):
+    response = client.get('/ready')
+    assert 'runtime' in response.json
+    assert response.json['runtime']['pid'] == os.getpid()
@@ -0,0 +1,70 @@
+"""Waveform-Vorschau: Residuum wird beim ersten Abruf berechnet, nicht im Embedding"""
+import io
+import os
+
+import numpy as np
+import soundfile as sf
+
+from services import waveform
+
+
+def _embed(client, make_wav, filename: str):
+    response = client.post('/watermark/embed', data={
+        'audio': (io.BytesIO(make_wav(seconds=2, seed=5)), filename),
+        'method': 'audioseal',
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    return int(response.headers['X-Audio-Id'])
+
+
+def _file_path(audio_id: int) -> str:
+    from database.database import get_db
+    from database.repositories import AudioFileRepository
+
+    with get_db() as db:
+        return AudioFileRepository(db).get_by_id(audio_id).file_path
+
+
+def test_residual_is_built_on_first_request(client, make_wav):
+    audio_id = _embed(client, make_wav, 'residual_lazy.wav')
+    file_path = _file_path(audio_id)
+    assert not os.path.exists(waveform.sidecar_path(file_path, 'residual'))
+
+    response = client.get(f'/audio/{audio_id}/peaks?track=residual&width=100')
+
+    assert response.status_code == 200
+    assert response.json['track'] == 'residual'
+    assert os.path.exists(waveform.sidecar_path(file_path, 'residual'))
+
+
+def test_failing_residual_registration_keeps_embed(client, make_wav, monkeypatch):
+    def fail(file_path, reference_path):
+        raise MemoryError
+    monkeypatch.setattr(waveform, 'register_residual', fail)
+
+    audio_id = _embed(client, make_wav, 'residual_failed.wav')
+
+    assert client.get(f'/audio/{audio_id}/peaks?track=residual').status_code == 404
+
+
+def test_streamed_residual_matches_full_difference(tmp_path, monkeypatch):
+    # Kleine Blöcke: Residuum über mehrere Blöcke mit ungleichem Rest
+    monkeypatch.setattr(waveform, 'BLOCK_FRAMES', waveform.BASE_SAMPLES_PER_PEAK * 4)
+    rng = np.random.RandomState(7)
+    original = rng.randn(10_000) * 0.1
+    watermarked = original + rng.randn(10_000) * 0.001
+    original_path, watermarked_path = str(tmp_path / 'o.wav'), str(tmp_path / 'w.wav')
+    sf.write(original_path, original[:9_000], 16000, subtype='FLOAT')
+    sf.write(watermarked_path, watermarked, 16000, subtype='FLOAT')
+
+    waveform.register_residual(watermarked_path, original_path)
+    peaks = waveform.read_peaks(watermarked_path, 'residual', width=8192)
+
+    residual = watermarked[:9_000].astype(np.float32) - original[:9_000].astype(np.float32)
+    scale = np.abs(residual).max()
+    groups = np.pad(residual, (0, -len(residual) % 256), mode='edge').reshape(-1, 256)
+    assert peaks['duration'] == 9_000 / 16000
+    assert peaks['samples_per_peak'] == 256
+    assert np.isclose(peaks['scale'], scale)
+    assert peaks['min'] == np.round(groups.min(axis=1) / np.float32(peaks['scale']) * 32767).astype(int).tolist()
+    assert peaks['max'] == np.round(groups.max(axis=1) / np.float32(peaks['scale']) * 32767).astype(int).tolist()